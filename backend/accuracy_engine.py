@@ -0,0 +1,306 @@
+"""
+Accuracy, precision, recall, F1 and confusion matrix of the reviewed images, kept up to
+date as feedback arrives instead of being recomputed from every Annotation.
+
+An annotation's prediction is the label of the image's most confident bounding box (for
+object detection) or classification (for image classification), and every annotation of
+an image is counted separately. Feedback marking the annotation classified counts it as
+correct for that label; feedback marking it misclassified counts it as wrong, against the
+correct label when one was given. For every batch the graph holds:
+
+- (:ConfusionCell {batch_id, predicted, actual, count}): reviewed images per pair of
+  predicted and correct label, with UNKNOWN_LABEL as the actual label of misclassified
+  images without a correction
+- (:LabelAccuracy {batch_id, label, tp, fp, fn}): true positives, false positives and
+  false negatives per label, so the metrics of a batch are read in O(labels)
+
+store_feedback applies the difference between each annotation's old and new outcome to
+both in the same transaction as the annotation update. rebuild() recomputes them from
+the annotations, e.g. after feedback was written by other means:
+
+    python accuracy_engine.py --rebuild
+"""
+import os
+from collections import Counter
+
+# Actual label of a misclassified image whose correct label is not known
+UNKNOWN_LABEL = ""
+
+
+def feedback_cell(predicted, classified, misclassified, correct_label=None):
+    """
+    Return the (predicted, actual) confusion matrix cell an annotation counts in, or None
+    if it is not counted: without a prediction, or neither classified nor misclassified.
+    """
+    if predicted is None:
+        return None
+    if misclassified:
+        return predicted, correct_label or UNKNOWN_LABEL
+    if classified:
+        return predicted, predicted
+    return None
+
+
+def label_counts(cell):
+    """Return the {label: (tp, fp, fn)} increments of one image counted in a cell."""
+    predicted, actual = cell
+    if actual == predicted:
+        return {predicted: (1, 0, 0)}
+    counts = {predicted: (0, 1, 0)}
+    if actual != UNKNOWN_LABEL:
+        counts[actual] = (0, 0, 1)
+    return counts
+
+
+def counter_changes(old_cell, new_cell, batch_ids):
+    """
+    Return the cell and label counter rows that replace an image's old outcome with its
+    new one in each of its batches, as the parameters of apply_changes.
+    """
+    cells, labels = Counter(), {}
+    for cell, sign in ((old_cell, -1), (new_cell, 1)):
+        if cell is None:
+            continue
+        cells[cell] += sign
+        for label, counts in label_counts(cell).items():
+            total = labels.get(label, (0, 0, 0))
+            labels[label] = tuple(value + sign * count for value, count in zip(total, counts))
+    cell_rows = [
+        {"batch_id": batch_id, "predicted": predicted, "actual": actual, "delta": delta}
+        for batch_id in batch_ids
+        for (predicted, actual), delta in cells.items() if delta
+    ]
+    label_rows = [
+        {"batch_id": batch_id, "label": label, "tp": tp, "fp": fp, "fn": fn}
+        for batch_id in batch_ids
+        for label, (tp, fp, fn) in labels.items() if tp or fp or fn
+    ]
+    return cell_rows, label_rows
+
+
+def _annotations_query(match):
+    """
+    Return a query for the matched (i:Image)-[:HAS_ANNOTATION]->(a:Annotation), one row per
+    annotation, with its batches and predicted label: the most confident label of the
+    image's bounding boxes for object detection, or of its classifications for image
+    classification.
+    """
+    return match + """
+WITH i, a
+OPTIONAL MATCH (i)-[:BELONGS_TO]->(b:BatchNode)
+WITH i, a, collect(DISTINCT b.batch_id) AS batch_ids
+OPTIONAL MATCH (i)-[r:HAS_BOUNDING_BOX|HAS_CLASSIFICATION]->(p)-[:HAS_LABEL]->(l:Label)
+WHERE (a.task_type = "object_detection" AND type(r) = "HAS_BOUNDING_BOX")
+   OR (a.task_type = "image_classification" AND type(r) = "HAS_CLASSIFICATION")
+WITH i, a, batch_ids, l.name AS label, p.confidence AS confidence
+ORDER BY confidence DESC, label
+RETURN elementId(a) AS annotation_id, i.image_url AS image_url, a.task_type AS task_type,
+    a.classified AS classified, a.misclassified AS misclassified, a.correct_label AS correct_label,
+    batch_ids, collect(label)[0] AS predicted
+"""
+
+
+# SET takes the write lock on the annotation, so concurrent feedback on one image is counted in turn
+ANNOTATION_QUERY = _annotations_query("""
+MATCH (i:Image {image_url: $image_url})-[:HAS_ANNOTATION]->(a:Annotation)
+SET a.reviewed = a.reviewed""")
+
+REVIEWED_ANNOTATIONS_QUERY = _annotations_query("""
+MATCH (i:Image)-[:HAS_ANNOTATION]->(a:Annotation)
+WHERE a.classified OR a.misclassified""")
+
+UPDATE_ANNOTATION_QUERY = """
+MATCH (i:Image {image_url: $image_url})-[:HAS_ANNOTATION]->(a:Annotation)
+SET a.reviewed = COALESCE($reviewed, a.reviewed),
+    a.classified = COALESCE($classified, a.classified),
+    a.misclassified = COALESCE($misclassified, a.misclassified),
+    a.correct_label = COALESCE($correct_label, a.correct_label)
+RETURN COUNT(a) AS updatedCount
+"""
+
+APPLY_CELLS_QUERY = """
+UNWIND $rows AS row
+MERGE (c:ConfusionCell {batch_id: row.batch_id, predicted: row.predicted, actual: row.actual})
+ON CREATE SET c.count = 0
+SET c.count = c.count + row.delta
+"""
+
+APPLY_LABELS_QUERY = """
+UNWIND $rows AS row
+MERGE (s:LabelAccuracy {batch_id: row.batch_id, label: row.label})
+ON CREATE SET s.tp = 0, s.fp = 0, s.fn = 0
+SET s.tp = s.tp + row.tp, s.fp = s.fp + row.fp, s.fn = s.fn + row.fn
+"""
+
+
+def apply_changes(tx, cell_rows, label_rows):
+    """Add the rows of counter_changes to the counters in the graph."""
+    if cell_rows:
+        tx.run(APPLY_CELLS_QUERY, rows=cell_rows)
+    if label_rows:
+        tx.run(APPLY_LABELS_QUERY, rows=label_rows)
+
+
+def update_feedback(tx, image_url, reviewed=None, classified=None, misclassified=None, correct_label=None):
+    """
+    Update the annotations of an image with feedback and their batches' accuracy counters,
+    in the transaction tx (e.g. from session.execute_write). Every annotation, e.g. one per
+    task type, is counted with its own prediction. Arguments left as None keep their
+    current value.
+    Returns:
+        int: The number of annotations updated, or None if the image has no annotation.
+    """
+    records = list(tx.run(ANNOTATION_QUERY, image_url=image_url))
+    if not records:
+        return None
+
+    cell_rows, label_rows = [], []
+    for record in records:
+        old_cell = feedback_cell(record["predicted"], record["classified"], record["misclassified"], record["correct_label"])
+        new_cell = feedback_cell(
+            record["predicted"],
+            record["classified"] if classified is None else classified,
+            record["misclassified"] if misclassified is None else misclassified,
+            record["correct_label"] if correct_label is None else correct_label,
+        )
+        if old_cell != new_cell:
+            cells, labels = counter_changes(old_cell, new_cell, record["batch_ids"])
+            cell_rows.extend(cells)
+            label_rows.extend(labels)
+
+    updated_count = tx.run(
+        UPDATE_ANNOTATION_QUERY, image_url=image_url, reviewed=reviewed, classified=classified,
+        misclassified=misclassified, correct_label=correct_label
+    ).single()["updatedCount"]
+    apply_changes(tx, cell_rows, label_rows)
+    return updated_count
+
+
+def rebuild(tx):
+    """
+    Recompute every batch's accuracy counters from the annotations in the graph.
+    Returns:
+        int: The number of counted annotations.
+    """
+    tx.run("MATCH (c:ConfusionCell) DETACH DELETE c")
+    tx.run("MATCH (s:LabelAccuracy) DETACH DELETE s")
+    result = tx.run(REVIEWED_ANNOTATIONS_QUERY)
+    cells, labels, annotations = Counter(), {}, 0
+    for record in result:
+        cell = feedback_cell(record["predicted"], record["classified"], record["misclassified"], record["correct_label"])
+        if cell is None:
+            continue
+        annotations += 1
+        for batch_id in record["batch_ids"]:
+            cells[(batch_id, *cell)] += 1
+            for label, counts in label_counts(cell).items():
+                total = labels.get((batch_id, label), (0, 0, 0))
+                labels[(batch_id, label)] = tuple(value + count for value, count in zip(total, counts))
+    apply_changes(
+        tx,
+        [{"batch_id": batch_id, "predicted": predicted, "actual": actual, "delta": count}
+         for (batch_id, predicted, actual), count in cells.items()],
+        [{"batch_id": batch_id, "label": label, "tp": tp, "fp": fp, "fn": fn}
+         for (batch_id, label), (tp, fp, fn) in labels.items()],
+    )
+    return annotations
+
+
+def _ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else 0.0
+
+
+def calculate_accuracy(label_rows, cell_rows):
+    """
+    Calculate the metrics of summed counters.
+    Args:
+        label_rows (list): {"label", "tp", "fp", "fn"} per label.
+        cell_rows (list): {"predicted", "actual", "count"} per confusion matrix cell.
+    Returns:
+        dict: reviewed images, correct images, accuracy, macro-averaged precision, recall
+        and F1 over the labels with any count, per-label metrics and the confusion matrix
+        as {predicted: {actual: count}}.
+    """
+    labels = {}
+    for row in label_rows:
+        tp, fp, fn = labels.get(row["label"], (0, 0, 0))
+        labels[row["label"]] = (tp + row["tp"], fp + row["fp"], fn + row["fn"])
+
+    per_label = {}
+    for label, (tp, fp, fn) in sorted(labels.items()):
+        if not (tp or fp or fn):
+            continue
+        precision, recall = _ratio(tp, tp + fp), _ratio(tp, tp + fn)
+        per_label[label] = {
+            "true_positives": tp,
+            "false_positives": fp,
+            "false_negatives": fn,
+            "precision": precision,
+            "recall": recall,
+            "f1": _ratio(2 * tp, 2 * tp + fp + fn),
+        }
+
+    confusion_matrix = {}
+    for row in cell_rows:
+        if row["count"]:
+            actual_counts = confusion_matrix.setdefault(row["predicted"], {})
+            actual_counts[row["actual"]] = actual_counts.get(row["actual"], 0) + row["count"]
+
+    # Every counted image is one true or one false positive of its predicted label
+    correct = sum(metrics["true_positives"] for metrics in per_label.values())
+    reviewed = correct + sum(metrics["false_positives"] for metrics in per_label.values())
+    count = len(per_label)
+    return {
+        "reviewed": reviewed,
+        "correct": correct,
+        "accuracy": _ratio(correct, reviewed),
+        "precision": round(sum(m["precision"] for m in per_label.values()) / count, 4) if count else 0.0,
+        "recall": round(sum(m["recall"] for m in per_label.values()) / count, 4) if count else 0.0,
+        "f1": round(sum(m["f1"] for m in per_label.values()) / count, 4) if count else 0.0,
+        "labels": per_label,
+        "confusion_matrix": confusion_matrix,
+    }
+
+
+def get_accuracy(session, batch_id=None):
+    """
+    Read the counters of one batch, or of every batch when batch_id is None, and calculate
+    their metrics with calculate_accuracy.
+    """
+    label_rows = session.run(
+        """
+        MATCH (s:LabelAccuracy)
+        WHERE $batch_id IS NULL OR s.batch_id = $batch_id
+        RETURN s.label AS label, sum(s.tp) AS tp, sum(s.fp) AS fp, sum(s.fn) AS fn
+        """,
+        batch_id=batch_id,
+    )
+    label_rows = [dict(record) for record in label_rows]
+    cell_rows = session.run(
+        """
+        MATCH (c:ConfusionCell)
+        WHERE $batch_id IS NULL OR c.batch_id = $batch_id
+        RETURN c.predicted AS predicted, c.actual AS actual, sum(c.count) AS count
+        """,
+        batch_id=batch_id,
+    )
+    return calculate_accuracy(label_rows, [dict(record) for record in cell_rows])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the accuracy counters of the reviewed images.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the counters of every batch from the annotations.")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from neo4j import GraphDatabase
+
+        driver = GraphDatabase.driver(os.getenv("NEO4J_URI", "bolt://localhost:7687"), auth=("neo4j", "password"))
+        with driver.session() as session:
+            annotations = session.execute_write(rebuild)
+        driver.close()
+        print(f"Rebuilt the accuracy counters of {annotations} reviewed annotations")
+    else:
+        parser.print_help()
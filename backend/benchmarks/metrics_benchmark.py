@@ -0,0 +1,91 @@
+"""
+Compare the columnar metrics engine (metrics_engine.py) with the per-metric functions of
+metrics.py on synthetic detections, and check that both give the same stats.
+
+Run from the backend folder:
+
+    python benchmarks/metrics_benchmark.py --detections 1000000
+
+The exit code is 1 if the two stats dicts differ.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+import metrics
+import metrics_engine
+from model_client import add_to_metrics_data, new_metrics_data
+
+
+def make_metrics_data(detections, per_image=10, labels=80, seed=0):
+    """
+    Return the collected metrics values of a batch of detection results, as model_client
+    gathers them. Images get between 0 and 2 * per_image detections of labels random labels.
+    """
+    rng = random.Random(seed)
+    names = [f"label_{i}" for i in range(labels)]
+    data = new_metrics_data()
+    remaining = detections
+    while remaining > 0:
+        count = min(rng.randint(0, 2 * per_image), remaining)
+        remaining -= count
+        width, height = rng.choice([(640, 480), (1280, 720), (4000, 3000)])
+        bboxes, proportions = [], []
+        for _ in range(count):
+            x1, y1 = rng.uniform(0, width - 2), rng.uniform(0, height - 2)
+            x2, y2 = rng.uniform(x1 + 1, width), rng.uniform(y1 + 1, height)
+            bboxes.append([x1, y1, x2, y2])
+            proportions.append(round((x2 - x1) * (y2 - y1) / (width * height), 4))
+        add_to_metrics_data(data, (
+            [rng.choice(names) for _ in range(count)],
+            [rng.random() for _ in range(count)],
+            bboxes,
+            [rng.uniform(0.5, 5.0)],
+            [rng.uniform(5.0, 40.0)],
+            [rng.uniform(0.2, 3.0)],
+            proportions,
+            (height, width),
+        ))
+    return data
+
+
+def timed(func, data, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stats = func(data)
+        best = min(best, time.perf_counter() - start)
+    return stats, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the metrics engine against metrics.py.")
+    parser.add_argument("--detections", type=int, default=1_000_000)
+    parser.add_argument("--per-image", type=int, default=10, help="Average detections per image.")
+    parser.add_argument("--labels", type=int, default=80, help="Number of distinct labels.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs; the fastest is reported.")
+    args = parser.parse_args()
+
+    data = make_metrics_data(args.detections, args.per_image, args.labels)
+    print(f"{args.detections} detections in {len(data['detections'])} images, {args.labels} labels")
+
+    reference, reference_s = timed(metrics.calculate_stats, data, args.repeat)
+    engine, engine_s = timed(metrics_engine.calculate_stats, data, args.repeat)
+
+    print(f"metrics.py        {reference_s * 1000:>10.1f} ms")
+    print(f"metrics_engine.py {engine_s * 1000:>10.1f} ms  ({reference_s / engine_s:.1f}x)")
+
+    differences = [key for key in reference if reference[key] != engine.get(key)]
+    if differences or list(reference) != list(engine):
+        print(f"Stats differ: {differences or 'key order'}")
+        sys.exit(1)
+    print("Stats are identical.")
+
+
+if __name__ == "__main__":
+    main()
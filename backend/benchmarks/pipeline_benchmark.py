@@ -0,0 +1,274 @@
+"""
+End-to-end throughput benchmark: model_client.run -> ModelService.StoreResults -> Neo4jService.StoreImageResults.
+
+Both gRPC services run in this process on free ports, with in-memory stand-ins for Blob
+Storage, Cosmos DB and Neo4j (see stand_ins.py), and the client processes synthetic
+images with a synthetic model (or a real one with --model yolo/efficientnet). The report
+lists images/sec, latency percentiles of every stage and the peak RSS of the process:
+
+- upload, decode, inference, stream: one call of each client pipeline stage (inference
+  handles a whole batch per call)
+- store_results: from ModelService receiving a result until it answers it, including the
+  Neo4j and Cosmos DB writes
+- neo4j_store_image_results: from Neo4jService receiving an image with all its detections
+  until it answers it
+
+Run from the backend folder:
+
+    python benchmarks/pipeline_benchmark.py --images 500 --save-baseline benchmarks/baseline.json
+    python benchmarks/pipeline_benchmark.py --images 500 --baseline benchmarks/baseline.json
+
+With --baseline, the run is compared with a saved report and the exit code is 1 when
+throughput, a stage's p95 latency or the peak RSS regressed by more than --tolerance.
+"""
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent import futures
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import grpc
+import model_client
+import model_service_pb2_grpc
+import neo4j_service_pb2_grpc
+from blob_uploader import BlobUploader
+from model_service import ModelService
+from neo4j_service import Neo4jService
+from throughput_stats import ThroughputStats
+from stand_ins import (
+    FakeCosmosContainer, InMemoryContainerClient, InMemoryGraphDriver, SyntheticModel, make_synthetic_images,
+)
+
+CLIENT_STAGES = ("upload", "decode", "inference", "stream")
+
+
+def timed_stream(handler, stats):
+    """
+    Wrap a streaming servicer method so that stats records, for every request, the time
+    from the request being read until the response to it is yielded.
+    """
+
+    def wrapper(request_iterator, context):
+        received = collections.deque()
+
+        def stamped():
+            for request in request_iterator:
+                received.append(time.perf_counter())
+                yield request
+
+        for response in handler(stamped(), context):
+            if received:
+                stats.record(time.perf_counter() - received.popleft())
+            yield response
+
+    return wrapper
+
+
+def start_server(add_servicer, servicer, max_workers=10):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    add_servicer(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_benchmark(images=200, image_size=(640, 480), batch_size=8, model_name="synthetic", detections=3,
+                  inference_ms=(5.0, 1.0), blob_ms=0.0, cosmos_ms=0.0, graph_ms=0.0, verbose=False, **processor_options):
+    """
+    Run one batch through the whole pipeline and return the report.
+    Args:
+        images (int): Number of synthetic images.
+        image_size (tuple): (width, height) of the images.
+        batch_size (int): Images per inference batch.
+        model_name (str): "synthetic", or a model known to ModelFactory.
+        detections (int): Detections the synthetic model returns per image.
+        inference_ms (tuple): Synthetic model latency per batch and per image, in ms.
+        blob_ms, cosmos_ms, graph_ms (float): Simulated latency of each call to the stand-ins, in ms.
+        verbose (bool): Show the output of the client and the services.
+        processor_options: Passed on to the ImageProcessor, e.g. upload_workers.
+    Returns:
+        dict: The report.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = os.path.join(temp_dir, "images")
+        make_synthetic_images(folder, images, image_size)
+
+        graph = InMemoryGraphDriver(latency=graph_ms / 1000)
+        cosmos = FakeCosmosContainer(latency=cosmos_ms / 1000)
+        container = InMemoryContainerClient(latency=blob_ms / 1000)
+        server_stats = {"store_results": ThroughputStats(window=float("inf")), "neo4j_store_image_results": ThroughputStats(window=float("inf"))}
+
+        neo4j_service = Neo4jService(driver=graph)
+        neo4j_service.StoreImageResults = timed_stream(neo4j_service.StoreImageResults, server_stats["neo4j_store_image_results"])
+        neo4j_server, neo4j_target = start_server(neo4j_service_pb2_grpc.add_Neo4jServiceServicer_to_server, neo4j_service)
+
+        model_service = ModelService(neo4j_target=neo4j_target, cosmos_container=cosmos)
+        model_service.StoreResults = timed_stream(model_service.StoreResults, server_stats["store_results"])
+        model_server, model_target = start_server(model_service_pb2_grpc.add_ModelServiceServicer_to_server, model_service)
+
+        if model_name == "synthetic":
+            processor_options["model"] = SyntheticModel(detections, inference_ms[0] / 1000, inference_ms[1] / 1000)
+        upload_workers = processor_options.get("upload_workers", 4)
+
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        try:
+            with output:
+                start = time.perf_counter()
+                summary = model_client.run(
+                    model_name, max_images=images, batch_size=batch_size, folder=folder, server=model_target,
+                    journal_dir=os.path.join(temp_dir, "journals"),
+                    uploader=BlobUploader(container, max_concurrency=upload_workers),
+                    index_path=None, result_cache_path=None, **processor_options
+                )
+                elapsed = time.perf_counter() - start
+        finally:
+            model_server.stop(None)
+            neo4j_server.stop(None)
+
+    if summary is None:
+        raise RuntimeError("The benchmark batch failed; run with --verbose to see why.")
+
+    stages = {}
+    for name in CLIENT_STAGES:
+        stage = summary["pipeline"][name]
+        stages[name] = {
+            "calls": stage["processed"] if name != "inference" else None,
+            "p50_ms": stage["latency_p50_ms"],
+            "p95_ms": stage["latency_p95_ms"],
+            "p99_ms": stage["latency_p99_ms"],
+        }
+    stages["inference"]["calls"] = -(-images // batch_size)
+    for name, stats in server_stats.items():
+        snapshot = stats.snapshot()
+        stages[name] = {
+            "calls": snapshot["total"],
+            "p50_ms": snapshot["latency_p50_ms"],
+            "p95_ms": snapshot["latency_p95_ms"],
+            "p99_ms": snapshot["latency_p99_ms"],
+        }
+
+    return {
+        "config": {
+            "images": images,
+            "image_size": list(image_size),
+            "batch_size": batch_size,
+            "model": model_name,
+            "detections": detections,
+            "inference_ms": list(inference_ms),
+            "blob_ms": blob_ms,
+            "cosmos_ms": cosmos_ms,
+            "graph_ms": graph_ms,
+            **{key: value for key, value in processor_options.items() if key != "model"},
+        },
+        "elapsed_s": round(elapsed, 3),
+        "images_per_sec": round(images / elapsed, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+        "stored": {
+            "blobs": len(container.blobs),
+            "cosmos_items": len(cosmos.items),
+            "graph_images": len(graph.images),
+            "graph_queries": graph.queries,
+        },
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance=0.10, min_latency_ms=1.0):
+    """
+    Return a description of every regression of report against baseline: throughput or
+    peak RSS worse by more than tolerance (a fraction), or a stage's p95 latency higher by
+    more than tolerance and by at least min_latency_ms, which keeps timer noise out.
+    """
+    regressions = []
+    if report["images_per_sec"] < baseline["images_per_sec"] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['images_per_sec']} -> {report['images_per_sec']} images/sec")
+    if report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {baseline['peak_rss_mb']} -> {report['peak_rss_mb']} MB")
+    for name, stage in report["stages"].items():
+        before = baseline["stages"].get(name)
+        if before is None:
+            continue
+        if stage["p95_ms"] > before["p95_ms"] * (1 + tolerance) and stage["p95_ms"] - before["p95_ms"] >= min_latency_ms:
+            regressions.append(f"{name} p95 {before['p95_ms']} -> {stage['p95_ms']} ms")
+    return regressions
+
+
+def print_report(report):
+    print(f"\n{report['config']['images']} images in {report['elapsed_s']:.2f}s: {report['images_per_sec']:.1f} images/sec, peak RSS {report['peak_rss_mb']:.0f} MB")
+    print(f"{'stage':<28}{'calls':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stage in report["stages"].items():
+        print(f"{name:<28}{stage['calls']:>8}{stage['p50_ms']:>8.2f}ms{stage['p95_ms']:>8.2f}ms{stage['p99_ms']:>8.2f}ms")
+    print(f"Stored: {report['stored']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline end to end with local stand-ins for Azure and Neo4j.")
+    parser.add_argument("--images", type=int, default=200, help="Number of synthetic images.")
+    parser.add_argument("--image-size", type=int, nargs=2, default=[640, 480], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--model", choices=["synthetic", "yolo", "efficientnet"], default="synthetic", help="Model to run; the real models need torch and their weights.")
+    parser.add_argument("--detections", type=int, default=3, help="Detections per image of the synthetic model.")
+    parser.add_argument("--inference-ms", type=float, nargs=2, default=[5.0, 1.0], metavar=("PER_BATCH", "PER_IMAGE"), help="Latency of the synthetic model.")
+    parser.add_argument("--blob-ms", type=float, default=0.0, help="Simulated latency of each blob upload.")
+    parser.add_argument("--cosmos-ms", type=float, default=0.0, help="Simulated latency of each Cosmos DB call.")
+    parser.add_argument("--graph-ms", type=float, default=0.0, help="Simulated latency of each Neo4j query.")
+    parser.add_argument("--upload-workers", type=int, default=4)
+    parser.add_argument("--decode-workers", type=int, default=2)
+    parser.add_argument("--inference-workers", type=int, default=1)
+    parser.add_argument("--stream-workers", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the client and the services.")
+    parser.add_argument("--save-baseline", type=str, default=None, metavar="PATH", help="Save the report as a baseline JSON file.")
+    parser.add_argument("--baseline", type=str, default=None, metavar="PATH", help="Compare the run with a saved baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative change that counts as a regression.")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.images, tuple(args.image_size), args.batch_size, args.model, args.detections, tuple(args.inference_ms),
+        args.blob_ms, args.cosmos_ms, args.graph_ms, args.verbose,
+        upload_workers=args.upload_workers,
+        decode_workers=args.decode_workers,
+        inference_workers=args.inference_workers,
+        stream_workers=args.stream_workers,
+        queue_size=args.queue_size,
+    )
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["config"] != report["config"]:
+            print("Warning: the baseline was run with a different configuration")
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
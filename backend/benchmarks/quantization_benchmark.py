@@ -0,0 +1,118 @@
+"""
+Compare the statically quantized INT8 models (--quantize) with their FP32 versions.
+
+For each model, both versions run on the same images from unprocessed_images and the
+report lists:
+
+- the median per-image latency of process_batch, after one warm-up pass
+- top-label agreement: how often both versions give the same most confident label
+  (no detections counts as a label of its own)
+- label-set agreement: how often both versions find the same set of labels with at
+  least --min-confidence (only meaningful for detection)
+
+Quantization is calibrated on a sample of the same folder, so with few images the
+evaluation overlaps the calibration set.
+
+Run from the backend folder:
+
+    python benchmarks/quantization_benchmark.py --models yolo efficientnet --fp32-backend onnx
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+from models.export_utils import IMAGE_EXTENSIONS, UNPROCESSED_IMAGES
+from models.model_factory import ModelFactory
+from models.base_model import BaseModel
+
+
+def load_images(limit):
+    names = sorted(name for name in os.listdir(UNPROCESSED_IMAGES) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [BaseModel.load_image(os.path.join(UNPROCESSED_IMAGES, name)) for name in names[:limit]]
+
+
+def run_model(model, images, batch_size, repeat):
+    """Return the results of one pass and the median per-image latency in ms over repeat passes."""
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    results = [result for batch in batches for result in model.process_batch(batch)]  # Warm-up
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for batch in batches:
+            model.process_batch(batch)
+        timings.append((time.perf_counter() - start) * 1000 / len(images))
+    return results, statistics.median(timings)
+
+
+def top_label(result):
+    labels, confs = result[0], result[1]
+    if not labels:
+        return None
+    return max(zip(confs, labels))[1]
+
+
+def label_set(result, min_confidence):
+    return {label for label, conf in zip(result[0], result[1]) if conf >= min_confidence}
+
+
+def agreement(reference, candidate, key):
+    return sum(key(a) == key(b) for a, b in zip(reference, candidate)) / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare INT8 quantized models with FP32.")
+    parser.add_argument("--models", nargs="+", choices=["yolo", "efficientnet"], default=["yolo", "efficientnet"])
+    parser.add_argument("--fp32-backend", choices=["torch", "onnx", "torchscript"], default="torch", help="Backend of the FP32 baseline.")
+    parser.add_argument("--images", type=int, default=100, help="Maximum number of images to evaluate on.")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed passes the latency is the median of.")
+    parser.add_argument("--min-confidence", type=float, default=0.5, help="Confidence a label needs to count for label-set agreement.")
+    parser.add_argument("--json", type=str, default=None, help="Also write the report to this JSON file.")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    if not images:
+        parser.error(f"No images to evaluate on in {UNPROCESSED_IMAGES}")
+
+    report = {}
+    for model_name in args.models:
+        fp32_results, fp32_latency = run_model(
+            ModelFactory.create_model(model_name, backend=args.fp32_backend), images, args.batch_size, args.repeat
+        )
+        int8_results, int8_latency = run_model(
+            ModelFactory.create_model(model_name, quantize=True), images, args.batch_size, args.repeat
+        )
+        report[model_name] = {
+            "images": len(images),
+            "fp32_backend": args.fp32_backend,
+            "fp32_latency_ms": round(fp32_latency, 2),
+            "int8_latency_ms": round(int8_latency, 2),
+            "speedup": round(fp32_latency / int8_latency, 2),
+            "top_label_agreement": round(agreement(fp32_results, int8_results, top_label), 4),
+            "label_set_agreement": round(
+                agreement(fp32_results, int8_results, lambda result: label_set(result, args.min_confidence)), 4
+            ),
+        }
+
+    print(f"\n{'model':<14}{'FP32 ms':>10}{'INT8 ms':>10}{'speedup':>10}{'top label':>12}{'label set':>12}")
+    for model_name, row in report.items():
+        print(
+            f"{model_name:<14}{row['fp32_latency_ms']:>10.2f}{row['int8_latency_ms']:>10.2f}{row['speedup']:>9.2f}x"
+            f"{row['top_label_agreement']:>12.1%}{row['label_set_agreement']:>12.1%}"
+        )
+    print(f"\nLatency is per image with batches of {args.batch_size}, FP32 on the {args.fp32_backend} backend.")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
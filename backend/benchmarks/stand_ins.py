@@ -0,0 +1,191 @@
+"""
+In-process stand-ins for the external services, so the whole pipeline can be benchmarked
+without Azure, Cosmos DB, Neo4j or model weights. Each stand-in can add a fixed delay per
+call to simulate the round trip to the service it replaces.
+"""
+import os
+import random
+import threading
+import time
+import numpy as np
+from PIL import Image
+from azure.core.exceptions import ResourceExistsError
+from models.base_model import BaseModel
+
+LABELS = ["bottle", "can", "carton", "glass", "plastic_bag"]
+
+
+def make_synthetic_images(folder, count, size=(640, 480), seed=0):
+    """Write count JPEG images of random noise with a few solid rectangles to folder and return their names."""
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    width, height = size
+    names = []
+    for index in range(count):
+        pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        for _ in range(3):
+            x1, y1 = rng.integers(0, width // 2), rng.integers(0, height // 2)
+            pixels[y1:y1 + height // 4, x1:x1 + width // 4] = rng.integers(0, 256, size=3, dtype=np.uint8)
+        name = f"synthetic_{index:05d}.jpg"
+        Image.fromarray(pixels).save(os.path.join(folder, name), quality=90)
+        names.append(name)
+    return names
+
+
+class SyntheticModel(BaseModel):
+    """
+    A detector that returns a fixed number of made-up detections of random size per image.
+    A batch takes batch_latency seconds plus image_latency seconds per image, to simulate
+    a real model. Times are reported in ms, like YOLO's.
+    """
+
+    def __init__(self, detections=3, batch_latency=0.0, image_latency=0.0, seed=0):
+        self.model_name = "synthetic"
+        self.weights_version = "synthetic"
+        self.detections = detections
+        self.batch_latency = batch_latency
+        self.image_latency = image_latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def get_task_type(self):
+        return "object_detection"
+
+    def process_image(self, image_path):
+        return self.process_batch([image_path])[0]
+
+    def process_batch(self, image_paths):
+        start = time.perf_counter()
+        images = [self.load_image(image) for image in image_paths]
+        preprocess_time = (time.perf_counter() - start) * 1000 / max(len(images), 1)
+
+        start = time.perf_counter()
+        time.sleep(self.batch_latency + self.image_latency * len(images))
+        inference_time = (time.perf_counter() - start) * 1000 / max(len(images), 1)
+
+        results = []
+        for image in images:
+            start = time.perf_counter()
+            width, height = image.size
+            labels, confs, bboxes, proportions = [], [], [], []
+            for index in range(self.detections):
+                with self._lock:
+                    scale, confidence = self._random.uniform(0.1, 0.5), self._random.uniform(0.3, 0.99)
+                x1, y1 = width * index / (self.detections + 1), height * index / (self.detections + 1)
+                x2, y2 = min(x1 + width * scale, width), min(y1 + height * scale, height)
+                labels.append(LABELS[index % len(LABELS)])
+                confs.append(confidence)
+                bboxes.append([x1, y1, x2, y2])
+                proportions.append(round((x2 - x1) * (y2 - y1) / (width * height), 4))
+            postprocess_time = (time.perf_counter() - start) * 1000
+            results.append((
+                labels, confs, bboxes, [preprocess_time], [inference_time], [postprocess_time],
+                proportions, (height, width), self.get_task_type()
+            ))
+        return results
+
+
+class InMemoryContainerClient:
+    """
+    A stand-in for azure.storage.blob.ContainerClient that keeps blobs in a dict.
+    It follows the same conditional-create contract, so BlobUploader can be tested and
+    benchmarked without an Azure account or an Azurite emulator. Each upload can be delayed
+    by latency seconds to simulate the round trip to the storage account.
+    """
+
+    def __init__(self, container_name="images", account_url="http://127.0.0.1:10000/devstoreaccount1", latency=0.0):
+        self.url = f"{account_url}/{container_name}"
+        self.latency = latency
+        self.blobs = {}
+        self.upload_calls = 0
+        self._lock = threading.Lock()
+
+    def upload_blob(self, name, data, overwrite=False, **kwargs):
+        try:
+            content = memoryview(data).tobytes()
+        except TypeError:
+            content = data.read()
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.upload_calls += 1
+            if name in self.blobs and not overwrite:
+                raise ResourceExistsError(message=f"The specified blob already exists: {name}")
+            self.blobs[name] = bytes(content)
+
+
+class FakeCosmosContainer:
+    """A stand-in for a Cosmos DB ContainerProxy supporting the duplicate check and create_item of ModelService."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.items = []
+        self._by_image_url = {}
+        self._lock = threading.Lock()
+
+    def query_items(self, query, parameters=None, enable_cross_partition_query=False):
+        if self.latency:
+            time.sleep(self.latency)
+        values = {parameter["name"]: parameter["value"] for parameter in parameters or []}
+        with self._lock:
+            items = list(self._by_image_url.get(values.get("@image_url"), []))
+        if "@labels" in values:
+            items = [item for item in items if item["labels"] == values["@labels"]]
+        return iter(items)
+
+    def create_item(self, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.items.append(body)
+            self._by_image_url.setdefault(body["image_url"], []).append(body)
+        return body
+
+
+class InMemoryGraphDriver:
+    """
+    A stand-in for the neo4j driver used by Neo4jService. Queries are not executed; their
+    parameters are collected into the sets of batches, images and labels they would merge.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.queries = 0
+        self.batches = set()
+        self.images = set()
+        self.labels = set()
+        self._lock = threading.Lock()
+
+    def session(self):
+        return _GraphSession(self)
+
+    def close(self):
+        pass
+
+    def _run(self, query, parameters):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.queries += 1
+            if "batch_id" in parameters:
+                self.batches.add(parameters["batch_id"])
+            if "image_url" in parameters:
+                self.images.add(parameters["image_url"])
+            if "class_label" in parameters:
+                self.labels.add(parameters["class_label"])
+            for detection in parameters.get("detections", []):
+                self.labels.add(detection["class_label"])
+
+
+class _GraphSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        self.driver._run(query, dict(parameters or {}, **kwargs))
@@ -0,0 +1,123 @@
+"""
+Measure the startup cost of model_client and of the modules it can load.
+
+Every measurement runs in a fresh interpreter, so nothing is cached between them:
+
+- `model_client.py --help` wall time
+- the cumulative import time of each module (python -X importtime), including
+  whether importing model_client pulls in any of the heavy modules
+- optionally (--init), the time to create each model and to fetch the storage secrets
+
+Run from the backend folder:
+
+    python benchmarks/startup_benchmark.py --repeat 5 --init
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY_MODULES = [
+    "torch",
+    "ultralytics",
+    "efficientnet_pytorch",
+    "PIL.Image",
+    "numpy",
+    "azure.storage.blob",
+    "azure.identity",
+    "azure.keyvault.secrets",
+    "kaggle",
+]
+
+CLIENT_MODULES = [
+    "grpc",
+    "model_service_pb2_grpc",
+    "result_stream",
+    "image_handle",
+    "blob_uploader",
+    "zip_source",
+    "model_client",
+]
+
+INIT_STEPS = {
+    "yolo model": "from models.model_factory import ModelFactory; ModelFactory.create_model('yolo')",
+    "efficientnet model": "from models.model_factory import ModelFactory; ModelFactory.create_model('efficientnet')",
+    "storage secrets": "import model_client; model_client.get_storage_settings()",
+}
+
+
+def run_python(args, env=None):
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, capture_output=True, text=True, env=env
+    )
+    return time.perf_counter() - start, completed
+
+
+def import_time(module):
+    """Return the cumulative import time of a module in seconds, or None if it cannot be imported."""
+    _, completed = run_python(["-X", "importtime", "-c", f"import {module}"])
+    if completed.returncode != 0:
+        return None
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    for line in reversed(completed.stderr.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def loaded_heavy_modules(module):
+    """Return the heavy modules that importing a module loads as a side effect."""
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    _, completed = run_python(["-c", code])
+    if completed.returncode != 0:
+        return None
+    return [name for name in completed.stdout.strip().split(",") if name]
+
+
+def median_time(args, repeat):
+    return statistics.median(run_python(args)[0] for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model_client startup time.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs each timing is the median of.")
+    parser.add_argument("--init", action="store_true", help="Also time model creation and secret resolution.")
+    args = parser.parse_args()
+
+    help_time = median_time(["model_client.py", "--help"], args.repeat)
+    print(f"model_client.py --help: {help_time * 1000:.0f} ms (median of {args.repeat})")
+    print(f"Python startup alone: {median_time(['-c', 'pass'], args.repeat) * 1000:.0f} ms")
+
+    print(f"\n{'module':<28}{'import':>12}")
+    for module in CLIENT_MODULES + HEAVY_MODULES:
+        times = [import_time(module) for _ in range(args.repeat)]
+        if None in times:
+            print(f"{module:<28}{'unavailable':>12}")
+        else:
+            print(f"{module:<28}{statistics.median(times) * 1000:>10.0f} ms")
+
+    heavy = loaded_heavy_modules("model_client")
+    print(f"\nHeavy modules loaded by 'import model_client': {', '.join(heavy) if heavy else 'none'}")
+
+    if args.init:
+        print(f"\n{'initialisation step':<28}{'time':>12}")
+        for name, code in INIT_STEPS.items():
+            elapsed, completed = run_python(["-c", code])
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+                print(f"{name:<28}{'failed':>12}  ({error})")
+            else:
+                print(f"{name:<28}{elapsed * 1000:>10.0f} ms  (including interpreter start)")
+
+
+if __name__ == "__main__":
+    main()
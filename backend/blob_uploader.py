@@ -0,0 +1,81 @@
+import threading
+from concurrent import futures
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core.exceptions import ResourceExistsError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient
+
+
+class BlobUploader:
+    """
+    Uploads images to one Azure Blob Storage container through a single shared client.
+
+    The underlying HTTP session is reused across uploads and its connection pool is sized
+    to max_concurrency, which is also the maximum number of uploads in flight at once.
+    Blobs are created with a conditional write (If-None-Match: *), so an existing blob is
+    detected by the upload itself instead of a separate exists() round trip.
+    """
+
+    def __init__(self, container_client, max_concurrency=8):
+        self.container_client = container_client
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.uploaded = 0
+        self.already_present = 0
+
+    @classmethod
+    def from_connection_string(cls, connection_string, container_name, max_concurrency=8):
+        """Create an uploader whose connection pool holds max_concurrency connections."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)  # Azurite and other local emulators use plain http
+
+        blob_service_client = BlobServiceClient.from_connection_string(
+            connection_string, transport=RequestsTransport(session=session, session_owner=False)
+        )
+        return cls(blob_service_client.get_container_client(container_name), max_concurrency)
+
+    def blob_url(self, blob_name):
+        return f"{self.container_client.url}/{blob_name}"
+
+    def upload(self, blob_name, data):
+        """
+        Create the blob unless it already exists.
+        Args:
+            blob_name (str): Name of the blob in the container.
+            data (bytes or file-like): Content to upload.
+        Returns:
+            tuple: (blob URL, True if the blob was uploaded or False if it already existed).
+        """
+        with self._slots:
+            try:
+                self.container_client.upload_blob(blob_name, data, overwrite=False)
+                created = True
+            except ResourceExistsError:
+                created = False
+
+        with self._lock:
+            if created:
+                self.uploaded += 1
+            else:
+                self.already_present += 1
+
+        if created:
+            print(f"Image uploaded to Azure Blob Storage: {blob_name}")
+        else:
+            print(f"Image already exists in Azure Blob Storage: {blob_name}")
+        return self.blob_url(blob_name), created
+
+    def upload_many(self, blobs):
+        """
+        Upload several blobs concurrently.
+        Args:
+            blobs (iterable): (blob_name, data) pairs.
+        Returns:
+            list: The result of upload() for each pair, in input order.
+        """
+        with futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(lambda blob: self.upload(*blob), blobs))
@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent import futures
+from fair_queue import DEFAULT_WEIGHTS, WeightedFairQueue
+from throughput_stats import ThroughputStats
+
+
+class DynamicBatcher:
+    """
+    Groups concurrent requests into batches for one model.
+
+    Callers submit single items with a priority class (interactive, bulk or backfill) and
+    get a Future back. A background thread takes batches of up to max_batch_size from a
+    WeightedFairQueue and runs each with one call to process_batch. Bulk and backfill items
+    wait up to max_wait seconds for a batch to fill, while interactive items wait at most
+    interactive_wait. Batches are formed one at a time, so lower priority work yields to
+    interactive requests between batches. Each Future resolves to (result, batch size),
+    or to the exception process_batch raised.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait=0.01, name="batcher", weights=None, interactive_wait=0.0):
+        if max_batch_size < 1:
+            raise ValueError("The batcher needs a batch size of at least one.")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        max_waits = {priority: max_wait for priority in weights}
+        if "interactive" in max_waits:
+            max_waits["interactive"] = min(interactive_wait, max_wait)
+        self.queue = WeightedFairQueue(weights, max_waits)
+        self.stats = ThroughputStats()
+        self.class_stats = {priority: ThroughputStats() for priority in self.queue.weights}
+        self.batches = 0
+        self.batched_items = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item, priority="bulk"):
+        """Queue one item in a priority class and return a Future for its result."""
+        if self._stop.is_set():
+            raise RuntimeError(f"Batcher '{self.name}' is closed.")
+        future = futures.Future()
+        self.queue.put(priority, (item, future, time.monotonic()))
+        return future
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self.queue.get_batch(self.max_batch_size, timeout=0.1)
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            results = self.process_batch([item for _, (item, _, _) in batch])
+        except Exception as e:
+            print(f"Batch of {len(batch)} failed in '{self.name}': {e}")
+            for _, (_, future, _) in batch:
+                future.set_exception(e)
+            return
+
+        finished = time.monotonic()
+        with self._lock:
+            self.batches += 1
+            self.batched_items += len(batch)
+        for (priority, (_, future, submitted)), result in zip(batch, results):
+            self.stats.record(finished - submitted)
+            self.class_stats[priority].record(finished - submitted)
+            future.set_result((result, len(batch)))
+
+    def snapshot(self):
+        """Return overall and per priority class latency and throughput, with the average batch size."""
+        snapshot = self.stats.snapshot()
+        with self._lock:
+            snapshot["batches"] = self.batches
+            snapshot["avg_batch_size"] = round(self.batched_items / self.batches, 2) if self.batches else 0.0
+        snapshot["queued"] = self.queue.qsize()
+        snapshot["classes"] = {
+            priority: dict(stats.snapshot(), queued=self.queue.qsize(priority))
+            for priority, stats in self.class_stats.items()
+        }
+        return snapshot
+
+    def close(self):
+        """Stop the batcher and fail any requests still waiting in the queue."""
+        self._stop.set()
+        self._thread.join()
+        while self.queue.qsize():
+            for _, (_, future, _) in self.queue.get_batch(self.max_batch_size, timeout=0):
+                future.set_exception(RuntimeError(f"Batcher '{self.name}' is closed."))
@@ -0,0 +1,82 @@
+import collections
+import threading
+import time
+
+PRIORITY_CLASSES = ("interactive", "bulk", "backfill")
+DEFAULT_WEIGHTS = {"interactive": 16, "bulk": 4, "backfill": 1}
+
+
+class WeightedFairQueue:
+    """
+    A thread-safe queue with one FIFO per priority class, served by weighted fair queuing.
+
+    Every item gets a virtual finish time of max(virtual time, finish time of the previous
+    item of its class) + 1 / weight, and items are dequeued in finish time order, with
+    the virtual time following the last item dequeued (self-clocked fair queuing). While
+    every class has work, each gets a share of the items proportional to its weight; an
+    idle class does not bank credit, and a class on its own gets all of the capacity.
+
+    Batches are formed one at a time from whatever is queued, so a newly queued
+    interactive item goes into the next batch rather than behind the bulk backlog. Each
+    class has its own max_wait: a batch is handed out once it is full or once the oldest
+    item at the head of any class has waited that class's max_wait.
+    """
+
+    def __init__(self, weights=None, max_waits=None):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        for priority, weight in self.weights.items():
+            if weight <= 0:
+                raise ValueError(f"Priority class '{priority}' needs a positive weight.")
+        self.max_waits = dict(max_waits or {})
+        self._queues = {priority: collections.deque() for priority in self.weights}
+        self._last_finish = {priority: 0.0 for priority in self.weights}
+        self._virtual_time = 0.0
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def put(self, priority, item):
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority class '{priority}', expected one of: {', '.join(self._queues)}")
+        with self._cond:
+            finish = max(self._virtual_time, self._last_finish[priority]) + 1.0 / self.weights[priority]
+            self._last_finish[priority] = finish
+            self._queues[priority].append((finish, time.monotonic(), item))
+            self._size += 1
+            self._cond.notify_all()
+
+    def qsize(self, priority=None):
+        with self._cond:
+            if priority is None:
+                return self._size
+            return len(self._queues[priority])
+
+    def _deadline(self):
+        """Time at which the oldest queued item of any class has waited its class's max_wait."""
+        return min(
+            entries[0][1] + self.max_waits.get(priority, 0.0)
+            for priority, entries in self._queues.items() if entries
+        )
+
+    def _pop(self):
+        priority = min((entries[0][0], priority) for priority, entries in self._queues.items() if entries)[1]
+        finish, _, item = self._queues[priority].popleft()
+        self._virtual_time = finish
+        self._size -= 1
+        return priority, item
+
+    def get_batch(self, max_size, timeout=None):
+        """
+        Return up to max_size (priority, item) pairs in fair queuing order.
+        Blocks up to timeout (forever when None) for the first item, and returns an empty
+        list if nothing arrives in time.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size > 0, timeout):
+                return []
+            # Keep filling the batch until it is full or an item has waited long enough
+            while self._size < max_size:
+                remaining = self._deadline() - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._pop() for _ in range(min(max_size, self._size))]
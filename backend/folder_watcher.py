@@ -0,0 +1,127 @@
+import os
+import queue
+import threading
+import time
+from zip_source import IMAGE_EXTENSIONS
+
+try:
+    import watchfiles
+except ImportError:  # Fall back to polling the folder
+    watchfiles = None
+
+
+class FolderWatcher:
+    """
+    Watches a folder for new or changed image files on a background thread.
+
+    Each image that is ready to be read is put on self.queue as an (absolute path,
+    detected_at) pair, where detected_at is the time.monotonic() value at which it was
+    found. Filesystem events (inotify on Linux) are used through watchfiles, which only
+    reports a change once writes to the file have settled. Without watchfiles, or with
+    force_polling=True, the folder is scanned every poll_interval seconds and a file is
+    reported once its size and modification time have not changed for a whole interval.
+
+    A file is reported again only if its size or modification time change. Files already
+    in the folder when the watcher starts are reported only when include_existing is set.
+    """
+
+    def __init__(self, folder, extensions=IMAGE_EXTENSIONS, poll_interval=1.0, include_existing=False, force_polling=False):
+        self.folder = os.path.abspath(folder)
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.poll_interval = poll_interval
+        self.include_existing = include_existing
+        self.use_polling = force_polling or watchfiles is None
+        self.queue = queue.Queue()
+        self._seen = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        existing = self._scan()
+        if self.include_existing:
+            for path in sorted(existing):
+                self._emit(path, existing[path])
+        else:
+            self._seen.update(existing)
+
+        target = self._poll if self.use_polling else self._watch
+        self._thread = threading.Thread(target=target, name="folder-watcher", daemon=True)
+        self._thread.start()
+        print(f"Watching {self.folder} for new images ({'polling' if self.use_polling else 'filesystem events'})")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _is_image(self, path):
+        return path.lower().endswith(self.extensions)
+
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _scan(self):
+        """Return the (size, mtime_ns) of every image file currently in the folder."""
+        images = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and self._is_image(entry.name):
+                    stat = entry.stat()
+                    images[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return images
+
+    def _emit(self, path, signature):
+        if self._seen.get(path) != signature:
+            self._seen[path] = signature
+            self.queue.put((path, time.monotonic()))
+
+    def _poll(self):
+        pending = {}
+        while not self._stop.wait(self.poll_interval):
+            try:
+                current = self._scan()
+            except OSError as e:
+                print(f"Could not scan {self.folder}: {e}")
+                continue
+
+            for path, signature in current.items():
+                if self._seen.get(path) == signature:
+                    continue
+                # A file still being written changes between scans, so wait until it holds still
+                if pending.get(path) == signature:
+                    del pending[path]
+                    self._emit(path, signature)
+                else:
+                    pending[path] = signature
+
+            for path in set(self._seen) - current.keys():
+                del self._seen[path]
+            for path in set(pending) - current.keys():
+                del pending[path]
+
+    def _watch(self):
+        for changes in watchfiles.watch(
+            self.folder, stop_event=self._stop, recursive=False,
+            rust_timeout=int(self.poll_interval * 1000)
+        ):
+            for change, path in changes:
+                if not self._is_image(path):
+                    continue
+                if change == watchfiles.Change.deleted:
+                    self._seen.pop(path, None)
+                    continue
+                signature = self._signature(path)
+                if signature is not None:
+                    self._emit(path, signature)
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import mmap
+import os
+import threading
+import time
+import numpy as np
+from PIL import Image
+from image_index import MMAP_THRESHOLD
+
+
+class ImageHandle:
+    """
+    One image shared by every pipeline step: hashing, upload, metadata and inference.
+
+    The file is read at most once, memory-mapped when it is at least MMAP_THRESHOLD bytes,
+    and decoded to RGB at most once per size. Both happen lazily, so a step that only needs
+    the header (e.g. width, height and format) never decodes the pixels, and an image whose
+    upload is skipped is only read when it is decoded for inference. A model that only needs
+    a small input can ask for a reduced decode (see pil_image), which for JPEGs skips most
+    of the decoding work.
+    """
+
+    def __init__(self, path=None, data=None, name=None):
+        if path is None and data is None:
+            raise ValueError("An ImageHandle needs a path or image bytes.")
+        if path is None and not name:
+            raise ValueError("An ImageHandle created from image bytes needs a name.")
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self._data = data
+        self._file = None
+        self._mmap = None
+        self._hashes = {}
+        self._image = None
+        self._draft = None
+        self._metadata = None
+        self._lock = threading.RLock()
+        # Time spent opening and reading the file (for a memory map, only mapping it)
+        self.read_ns = 0
+
+    @classmethod
+    def from_bytes(cls, data, name):
+        return cls(data=data, name=name)
+
+    @property
+    def extension(self):
+        return self.name.split('.')[-1]
+
+    @property
+    def data(self):
+        """The raw file content, as bytes or as a read-only memory map for large files."""
+        with self._lock:
+            if self._data is None:
+                start = time.perf_counter_ns()
+                self._file = open(self.path, "rb")
+                size = os.fstat(self._file.fileno()).st_size
+                if size >= MMAP_THRESHOLD:
+                    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._data = self._mmap
+                else:
+                    self._data = self._file.read()
+                    self._file.close()
+                    self._file = None
+                self.read_ns += time.perf_counter_ns() - start
+            return self._data
+
+    def _reader(self):
+        """Return a file-like view of the content positioned at its start."""
+        data = self.data
+        if isinstance(data, mmap.mmap):
+            data.seek(0)
+            return data
+        return io.BytesIO(data)
+
+    def hash(self, hash_algorithm="sha256"):
+        """Hash the content, reusing the buffer that is uploaded and decoded."""
+        with self._lock:
+            if hash_algorithm not in self._hashes:
+                hash_func = hashlib.new(hash_algorithm)
+                hash_func.update(self.data)
+                self._hashes[hash_algorithm] = hash_func.hexdigest()
+            return self._hashes[hash_algorithm]
+
+    def metadata(self):
+        """Return (width, height, format), reading only the image header if not yet decoded."""
+        with self._lock:
+            if self._metadata is None:
+                with Image.open(self._reader()) as img:
+                    self._metadata = (img.size[0], img.size[1], img.format)
+            return self._metadata
+
+    def pil_image(self, draft_size=None):
+        """
+        Return the image decoded to RGB, decoding it on first use.
+        Args:
+            draft_size (tuple): Optional (width, height) the image is only needed at. JPEGs are
+                then decoded in draft mode, scaled down by 1/2, 1/4 or 1/8 in the DCT to the
+                smallest size that is still at least draft_size in both dimensions. Other
+                formats, and images already decoded in full, are returned at full size.
+        Returns:
+            PIL.Image: The decoded image. metadata() still reports the full size.
+        """
+        with self._lock:
+            if self._image is not None:
+                return self._image
+            if draft_size is None:
+                self._image = self._decode()
+                return self._image
+            if self._draft is None or self._draft[0] != tuple(draft_size):
+                self._draft = (tuple(draft_size), self._decode(draft_size))
+            return self._draft[1]
+
+    def _decode(self, draft_size=None):
+        with Image.open(self._reader()) as img:
+            self._metadata = (img.size[0], img.size[1], img.format)
+            if draft_size is not None:
+                img.draft("RGB", tuple(draft_size))
+            return img.convert("RGB")
+
+    def array(self):
+        """Return the decoded image as an RGB uint8 array of shape (height, width, 3)."""
+        return np.asarray(self.pil_image())
+
+    def release(self):
+        """Drop the buffer and decoded image once every step is done with them."""
+        with self._lock:
+            self._image = None
+            self._draft = None
+            if self.path is not None:
+                self._data = None
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,125 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+
+def compute_file_hash(file_path, hash_algorithm="sha256"):
+    """Compute the hash of a file using the specified algorithm."""
+
+    hash_func = hashlib.new(hash_algorithm)
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            # Large files are hashed straight from the page cache without copying into Python
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hash_func.update(mm)
+        else:
+            buffer = bytearray(HASH_CHUNK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                hash_func.update(view[:read])
+    return hash_func.hexdigest()
+
+
+class ImageIndex:
+    """
+    A persistent SQLite index of local image files.
+
+    Each file is recorded with the size and modification time it had when it was hashed,
+    along with its content hash, its blob URL and whether it is known to be in Blob
+    Storage. While the size and modification time are unchanged, reruns over the same
+    folder take the hash and upload state from the index instead of rereading the file
+    or asking Blob Storage.
+    """
+
+    def __init__(self, db_path="image_index.sqlite"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                blob_url TEXT,
+                uploaded INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.commit()
+        self.hash_hits = 0
+        self.hash_misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def lookup(self, image_path):
+        """
+        Return the index entry for a file, or None if the file is not indexed or has
+        changed size or modification time since it was indexed.
+        """
+        path = os.path.abspath(image_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, blob_url, uploaded FROM images WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "blob_url": row[1], "uploaded": bool(row[2])}
+
+    def get_hash(self, image_path, handle=None):
+        """
+        Return the content hash of a file, hashing it only if the index has no current entry.
+        When an ImageHandle for the file is given, its already loaded buffer is hashed.
+        """
+        entry = self.lookup(image_path)
+        if entry is not None:
+            with self._lock:
+                self.hash_hits += 1
+            return entry["content_hash"]
+
+        path = os.path.abspath(image_path)
+        stat = os.stat(path)
+        content_hash = handle.hash() if handle is not None else compute_file_hash(path)
+        with self._lock:
+            self.hash_misses += 1
+            # A changed file invalidates its upload state along with its hash
+            self._conn.execute(
+                """
+                INSERT INTO images (path, size, mtime_ns, content_hash, blob_url, uploaded)
+                VALUES (?, ?, ?, ?, NULL, 0)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    content_hash = excluded.content_hash,
+                    blob_url = NULL,
+                    uploaded = 0
+                """,
+                (path, stat.st_size, stat.st_mtime_ns, content_hash)
+            )
+            self._conn.commit()
+        return content_hash
+
+    def mark_uploaded(self, image_path, blob_url):
+        """Record that a file is present in Blob Storage at blob_url."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE images SET blob_url = ?, uploaded = 1 WHERE path = ?",
+                (blob_url, os.path.abspath(image_path))
+            )
+            self._conn.commit()
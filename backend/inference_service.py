@@ -0,0 +1,166 @@
+import grpc
+from concurrent import futures
+import inference_service_pb2
+import inference_service_pb2_grpc
+import requests
+from dynamic_batcher import DynamicBatcher
+from image_handle import ImageHandle
+from throughput_stats import start_stats_server
+
+# Classification results have a single empty box and box proportion
+PLACEHOLDER = ""
+
+# Requests that do not set a priority are treated as bulk work
+PRIORITY_CLASSES = {
+    inference_service_pb2.PRIORITY_UNSPECIFIED: "bulk",
+    inference_service_pb2.INTERACTIVE: "interactive",
+    inference_service_pb2.BULK: "bulk",
+    inference_service_pb2.BACKFILL: "backfill",
+}
+
+
+class InferenceService(inference_service_pb2_grpc.InferenceServiceServicer):
+    """
+    Hosts one or more ModelFactory models behind gRPC.
+
+    Every model has its own DynamicBatcher, so concurrent Infer calls from any number of
+    producers are grouped into shared forward passes. Requests are scheduled by priority
+    class with weighted fair queuing, so interactive requests are not stuck behind a bulk
+    backlog. The first model is the default for requests that do not name one.
+    """
+
+    def __init__(self, models, max_batch_size=8, max_wait=0.01, download_timeout=30, weights=None, interactive_wait=0.0):
+        if not models:
+            raise ValueError("The inference service needs at least one model.")
+        self.models = models
+        self.default_model = next(iter(models))
+        self.download_timeout = download_timeout
+        self.session = requests.Session()
+        self.batchers = {
+            name: DynamicBatcher(
+                model.process_batch, max_batch_size, max_wait, name=f"{name}-batcher",
+                weights=weights, interactive_wait=interactive_wait
+            )
+            for name, model in models.items()
+        }
+
+    def _resolve_model(self, requested, context):
+        name = requested or self.default_model
+        if name not in self.models:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Unknown model '{name}', available: {', '.join(self.models)}")
+            return None
+        return name
+
+    def _load_handle(self, request):
+        if request.WhichOneof("image") == "image_url":
+            response = self.session.get(request.image_url, timeout=self.download_timeout)
+            response.raise_for_status()
+            name = request.image_name or request.image_url.rsplit("/", 1)[-1]
+            return ImageHandle.from_bytes(response.content, name)
+        return ImageHandle.from_bytes(request.image_bytes, request.image_name or "image")
+
+    def Infer(self, request, context):
+        name = self._resolve_model(request.model, context)
+        if name is None:
+            return inference_service_pb2.InferResponse(success=False, message=f"Unknown model: {request.model}")
+
+        try:
+            handle = self._load_handle(request)
+            priority = PRIORITY_CLASSES[request.priority]
+            result, batch_size = self.batchers[name].submit(handle, priority).result()
+
+            labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape, task_type = result
+            return inference_service_pb2.InferResponse(
+                success=True,
+                message="Inference completed.",
+                class_labels=labels,
+                confidences=confs,
+                # Classification results have a single empty box and box proportion, which are not sent
+                bboxes=[
+                    inference_service_pb2.BoundingBox(x1=x1, y1=y1, x2=x2, y2=y2)
+                    for x1, y1, x2, y2 in (bbox for bbox in bboxes if bbox != PLACEHOLDER)
+                ],
+                box_proportions=[proportion for proportion in proportions if proportion != PLACEHOLDER],
+                preprocessing_time=pre_times[0],
+                inference_time=inf_times[0],
+                postprocessing_time=post_times[0],
+                image_width=orig_shape[1],
+                image_height=orig_shape[0],
+                task_type=task_type,
+                batch_size=batch_size
+            )
+        except Exception as e:
+            print(f"Inference failed for {request.image_name or request.image_url}: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(str(e))
+            return inference_service_pb2.InferResponse(success=False, message=f"Inference failed: {str(e)}")
+
+    def GetModelInfo(self, request, context):
+        name = self._resolve_model(request.model, context)
+        if name is None:
+            return inference_service_pb2.ModelInfo(available_models=list(self.models))
+
+        model = self.models[name]
+        return inference_service_pb2.ModelInfo(
+            model=name,
+            model_name=model.model_name or name,
+            weights_version=model.weights_version or "",
+            quantized=model.quantized,
+            task_type=model.get_task_type(),
+            available_models=list(self.models),
+            backend=model.backend
+        )
+
+    def stats(self):
+        return {name: batcher.snapshot() for name, batcher in self.batchers.items()}
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+
+
+def serve(model_names=("yolo",), quantize=False, port=50053, max_batch_size=8, max_wait=0.01, max_workers=32, stats_port=None,
+          weights=None, interactive_wait=0.0, backend="torch"):
+    # Only the server loads the model libraries; its clients need just gRPC
+    from models.model_factory import ModelFactory
+
+    models = {name: ModelFactory.create_model(name, quantize, backend) for name in model_names}
+    service = InferenceService(models, max_batch_size, max_wait, weights=weights, interactive_wait=interactive_wait)
+
+    # The thread pool bounds how many requests can wait in a batch at once
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    inference_service_pb2_grpc.add_InferenceServiceServicer_to_server(service, server)
+    server.add_insecure_port(f"[::]:{port}")
+    if stats_port is not None:
+        start_stats_server(service.stats, stats_port)
+    print(f"Server started, listening on [::]:{port}")
+    server.start()
+    try:
+        server.wait_for_termination()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the inference service.")
+    parser.add_argument("--models", nargs="+", choices=["yolo", "efficientnet"], default=["yolo"], help="Models to load; the first one is the default.")
+    parser.add_argument("--quantize", action="store_true", help="Quantize the models for lower energy consumption.")
+    parser.add_argument("--backend", type=str, choices=["torch", "onnx", "torchscript"], default="torch", help="Run the models eagerly in PyTorch, or through verified ONNX Runtime or TorchScript exports.")
+    parser.add_argument("--port", type=int, default=50053, help="Port to listen on.")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Maximum number of requests run in one forward pass.")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="Milliseconds a request may wait for its batch to fill up.")
+    parser.add_argument("--interactive-wait-ms", type=float, default=0, help="Milliseconds an interactive request may wait for its batch to fill up.")
+    parser.add_argument("--class-weights", type=float, nargs=3, default=[16, 4, 1], metavar=("INTERACTIVE", "BULK", "BACKFILL"), help="Weighted fair queuing weights of the priority classes.")
+    parser.add_argument("--max-workers", type=int, default=32, help="Number of gRPC threads, i.e. requests that can be in flight at once.")
+    parser.add_argument("--stats-port", type=int, default=None, help="Serve per-model and per-priority throughput, latency and batch size stats as JSON on this port.")
+    args = parser.parse_args()
+
+    serve(
+        args.models, args.quantize, args.port, args.max_batch_size, args.max_wait_ms / 1000, args.max_workers, args.stats_port,
+        weights=dict(zip(("interactive", "bulk", "backfill"), args.class_weights)),
+        interactive_wait=args.interactive_wait_ms / 1000,
+        backend=args.backend
+    )
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: inference_service.proto
+# Protobuf Python Version: 5.29.0
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    5,
+    29,
+    0,
+    '',
+    'inference_service.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x17inference_service.proto\"\x83\x01\n\x0cInferRequest\x12\r\n\x05model\x18\x01 \x01(\t\x12\x15\n\x0bimage_bytes\x18\x02 \x01(\x0cH\x00\x12\x13\n\timage_url\x18\x03 \x01(\tH\x00\x12\x12\n\nimage_name\x18\x04 \x01(\t\x12\x1b\n\x08priority\x18\x05 \x01(\x0e\x32\t.PriorityB\x07\n\x05image\"=\n\x0b\x42oundingBox\x12\n\n\x02x1\x18\x01 \x01(\x02\x12\n\n\x02y1\x18\x02 \x01(\x02\x12\n\n\x02x2\x18\x03 \x01(\x02\x12\n\n\x02y2\x18\x04 \x01(\x02\"\xb6\x02\n\rInferResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x14\n\x0c\x63lass_labels\x18\x03 \x03(\t\x12\x13\n\x0b\x63onfidences\x18\x04 \x03(\x02\x12\x1c\n\x06\x62\x62oxes\x18\x05 \x03(\x0b\x32\x0c.BoundingBox\x12\x17\n\x0f\x62ox_proportions\x18\x06 \x03(\x02\x12\x1a\n\x12preprocessing_time\x18\x07 \x01(\x02\x12\x16\n\x0einference_time\x18\x08 \x01(\x02\x12\x1b\n\x13postprocessing_time\x18\t \x01(\x02\x12\x13\n\x0bimage_width\x18\n \x01(\x05\x12\x14\n\x0cimage_height\x18\x0b \x01(\x05\x12\x11\n\ttask_type\x18\x0c \x01(\t\x12\x12\n\nbatch_size\x18\r \x01(\x05\"!\n\x10ModelInfoRequest\x12\r\n\x05model\x18\x01 \x01(\t\"\x98\x01\n\tModelInfo\x12\r\n\x05model\x18\x01 \x01(\t\x12\x12\n\nmodel_name\x18\x02 \x01(\t\x12\x17\n\x0fweights_version\x18\x03 \x01(\t\x12\x11\n\tquantized\x18\x04 \x01(\x08\x12\x11\n\ttask_type\x18\x05 \x01(\t\x12\x18\n\x10\x61vailable_models\x18\x06 \x03(\t\x12\x0f\n\x07\x62\x61\x63kend\x18\x07 \x01(\t*M\n\x08Priority\x12\x18\n\x14PRIORITY_UNSPECIFIED\x10\x00\x12\x0f\n\x0bINTERACTIVE\x10\x01\x12\x08\n\x04\x42ULK\x10\x02\x12\x0c\n\x08\x42\x41\x43KFILL\x10\x03\x32i\n\x10InferenceService\x12&\n\x05Infer\x12\r.InferRequest\x1a\x0e.InferResponse\x12-\n\x0cGetModelInfo\x12\x11.ModelInfoRequest\x1a\n.ModelInfob\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'inference_service_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_PRIORITY']._serialized_start=727
+  _globals['_PRIORITY']._serialized_end=804
+  _globals['_INFERREQUEST']._serialized_start=28
+  _globals['_INFERREQUEST']._serialized_end=159
+  _globals['_BOUNDINGBOX']._serialized_start=161
+  _globals['_BOUNDINGBOX']._serialized_end=222
+  _globals['_INFERRESPONSE']._serialized_start=225
+  _globals['_INFERRESPONSE']._serialized_end=535
+  _globals['_MODELINFOREQUEST']._serialized_start=537
+  _globals['_MODELINFOREQUEST']._serialized_end=570
+  _globals['_MODELINFO']._serialized_start=573
+  _globals['_MODELINFO']._serialized_end=725
+  _globals['_INFERENCESERVICE']._serialized_start=806
+  _globals['_INFERENCESERVICE']._serialized_end=911
+# @@protoc_insertion_point(module_scope)
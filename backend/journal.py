@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+
+
+class BatchJournal:
+    """
+    An append-only journal of one batch, stored as one JSON record per line.
+
+    The journal starts with a "start" record holding the batch settings and the images
+    planned for the batch. A "result" record is written when an image's result is ready
+    and an "ack" record when the server has stored it. Records are flushed as they are
+    written, so after a crash the journal tells which images are done and which of their
+    results still have to be sent. A partly written last line is ignored when reading.
+
+    While a batch runs only the keys of the completed and acknowledged images are kept in
+    memory. The full results are only loaded from an existing journal, in results, so
+    that a resumed batch can send them again and count them in its metrics.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.settings = None
+        self.images = []
+        self.results = {}
+        self.completed = set()
+        self.acknowledged = set()
+        self._file = None
+        if os.path.exists(path):
+            self._replay()
+
+    @classmethod
+    def for_batch(cls, batch_id, journal_dir="journals"):
+        os.makedirs(journal_dir, exist_ok=True)
+        return cls(os.path.join(journal_dir, f"{batch_id}.jsonl"))
+
+    def _replay(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn write from a crash
+                if record["type"] == "start":
+                    self.settings = record["settings"]
+                    self.images = record["images"]
+                elif record["type"] == "result":
+                    self.results[record["image"]] = record["result"]
+                    self.completed.add(record["image"])
+                elif record["type"] == "ack":
+                    self.acknowledged.add(record["image"])
+
+    def _append(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._file is None:
+                # The file is only created once there is something to record
+                torn = False
+                if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                    with open(self.path, "rb") as f:
+                        f.seek(-1, os.SEEK_END)
+                        torn = f.read(1) != b"\n"
+                self._file = open(self.path, "a", encoding="utf-8")
+                if torn:
+                    self._file.write("\n")  # End a torn last line so the next record starts cleanly
+            self._file.write(line)
+            self._file.flush()
+
+    def start(self, settings, images):
+        """Record the batch settings and the keys of the images planned for the batch."""
+        self.settings = settings
+        self.images = list(images)
+        self._append({"type": "start", "settings": settings, "images": self.images})
+
+    def record_result(self, image, result):
+        """Record the result of an image; result must be JSON serialisable."""
+        with self._lock:
+            self.completed.add(image)
+        self._append({"type": "result", "image": image, "result": result})
+
+    def record_ack(self, image):
+        """Record that the server has stored the result of an image."""
+        with self._lock:
+            self.acknowledged.add(image)
+        self._append({"type": "ack", "image": image})
+
+    def remaining(self):
+        """Return the planned images that have no result yet, in their planned order."""
+        with self._lock:
+            return [image for image in self.images if image not in self.completed]
+
+    def unacknowledged(self):
+        """Return the images whose results were recorded but not stored by the server, in their planned order."""
+        with self._lock:
+            return [image for image in self.images if image in self.completed and image not in self.acknowledged]
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
@@ -1,9 +1,227 @@
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
+import base64
+import json
+import os
+import threading
+import time
+from concurrent import futures
+from dotenv import dotenv_values
+
+KEY_VAULT_URL = "https://sweng25group06keyvault.vault.azure.net/"
+DEFAULT_TTL = 3600
+
+
+def secret_env_name(secret_name):
+    """Return the environment variable a secret is read from, e.g. COSMOS-KEY -> COSMOS_KEY."""
+    return secret_name.replace("-", "_").upper()
+
+
+class EnvConfigProvider:
+    """
+    Reads secrets from environment variables, and optionally from a .env or JSON file,
+    without any network access. A secret such as COSMOS-KEY is looked up as COSMOS_KEY
+    (or under its own name). Values in the environment take precedence over the file.
+    """
+
+    def __init__(self, path=None, environ=None):
+        self.values = {}
+        if path:
+            if path.endswith(".json"):
+                with open(path, "r", encoding="utf-8") as f:
+                    self.values.update(json.load(f))
+            else:
+                self.values.update(dotenv_values(path))
+        self.values.update(os.environ if environ is None else environ)
+
+    def get_secrets(self, names):
+        secrets = {}
+        for name in names:
+            value = self.values.get(secret_env_name(name)) or self.values.get(name)
+            if value:
+                secrets[name] = value
+        missing = [name for name in names if name not in secrets]
+        if missing:
+            raise ValueError(f"Missing one or more required secrets: {', '.join(missing)} (set {', '.join(secret_env_name(name) for name in missing)})")
+        return secrets
+
+    def get_secret(self, name):
+        return self.get_secrets([name])[name]
+
+
+class EncryptedDiskCache:
+    """
+    Secrets persisted to one file encrypted with Fernet, for warm restarts without Key Vault calls.
+    Each entry keeps the wall clock time it expires at.
+    """
+
+    def __init__(self, path, key):
+        from cryptography.fernet import Fernet
+
+        self.path = path
+        self._fernet = Fernet(key)
+
+    @staticmethod
+    def derive_key(secret):
+        """Derive a Fernet key from a secret the process already holds, e.g. the client secret."""
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"keyvault-config-cache")
+        return base64.urlsafe_b64encode(hkdf.derive(secret.encode("utf-8")))
+
+    def load(self):
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self.path, "rb") as f:
+                entries = json.loads(self._fernet.decrypt(f.read()))
+        except (OSError, ValueError, InvalidToken):
+            return {}  # Missing, corrupt or encrypted with another key
+        now = time.time()
+        return {name: (value, expires) for name, (value, expires) in entries.items() if expires > now}
+
+    def save(self, entries):
+        token = self._fernet.encrypt(json.dumps(entries).encode("utf-8"))
+        temp_path = f"{self.path}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(token)
+        os.replace(temp_path, self.path)
+
+
+class KeyVaultConfigProvider:
+    """
+    Reads secrets from Azure Key Vault through one shared credential and SecretClient.
+
+    Secrets are cached in memory for ttl seconds, and the secrets missing from the cache are
+    fetched concurrently. With a disk_cache, fetched secrets are also kept in an encrypted
+    file, so a restart within the TTL needs no Key Vault calls at all.
+
+    The credential is a ClientSecretCredential when AZURE_TENANT_ID, AZURE_CLIENT_ID and
+    AZURE_CLIENT_SECRET are set, and DefaultAzureCredential (e.g. az login) otherwise.
+    """
+
+    def __init__(self, vault_url=KEY_VAULT_URL, ttl=DEFAULT_TTL, max_workers=8, disk_cache=None, secret_client=None):
+        self.vault_url = vault_url
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.disk_cache = disk_cache
+        self._secret_client = secret_client
+        self._cache = disk_cache.load() if disk_cache is not None else {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    @property
+    def secret_client(self):
+        with self._lock:
+            if self._secret_client is None:
+                from azure.keyvault.secrets import SecretClient
+
+                self._secret_client = SecretClient(vault_url=self.vault_url, credential=self._credential())
+            return self._secret_client
+
+    @staticmethod
+    def _credential():
+        tenant_id = os.getenv("AZURE_TENANT_ID")
+        client_id = os.getenv("AZURE_CLIENT_ID")
+        client_secret = os.getenv("AZURE_CLIENT_SECRET")
+        if all([tenant_id, client_id, client_secret]):
+            from azure.identity import ClientSecretCredential
+            return ClientSecretCredential(tenant_id, client_id, client_secret)
+
+        from azure.identity import DefaultAzureCredential
+        return DefaultAzureCredential()
+
+    def get_secrets(self, names):
+        now = time.time()
+        with self._lock:
+            secrets = {name: self._cache[name][0] for name in names if name in self._cache and self._cache[name][1] > now}
+        missing = [name for name in names if name not in secrets]
+        if not missing:
+            return secrets
+
+        secret_client = self.secret_client
+        with futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+            fetched = dict(zip(missing, executor.map(lambda name: secret_client.get_secret(name).value, missing)))
+
+        expires = time.time() + self.ttl
+        with self._lock:
+            self.fetches += len(fetched)
+            for name, value in fetched.items():
+                self._cache[name] = (value, expires)
+            if self.disk_cache is not None:
+                self.disk_cache.save(self._cache)
+
+        secrets.update(fetched)
+        empty = [name for name in names if not secrets.get(name)]
+        if empty:
+            raise ValueError(f"Missing one or more required secrets: {', '.join(empty)}")
+        return secrets
+
+    def get_secret(self, name):
+        return self.get_secrets([name])[name]
+
+    def invalidate(self, names=None):
+        """Drop cached secrets, e.g. after a rotation, so they are fetched again."""
+        with self._lock:
+            for name in list(self._cache if names is None else names):
+                self._cache.pop(name, None)
+            if self.disk_cache is not None:
+                self.disk_cache.save(self._cache)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def create_config_provider():
+    """
+    Create the provider selected by the environment:
+    CONFIG_PROVIDER=env (or CONFIG_FILE set) reads secrets from the environment and CONFIG_FILE
+    without network access. Otherwise secrets come from Key Vault (KEY_VAULT_URL overrides the
+    default vault), cached for CONFIG_CACHE_TTL seconds, and also on disk when CONFIG_CACHE_PATH
+    is set. The disk cache is encrypted with CONFIG_CACHE_KEY, or with a key derived from
+    AZURE_CLIENT_SECRET.
+    """
+    if os.getenv("CONFIG_PROVIDER", "").lower() == "env" or os.getenv("CONFIG_FILE"):
+        return EnvConfigProvider(os.getenv("CONFIG_FILE"))
+
+    disk_cache = None
+    cache_path = os.getenv("CONFIG_CACHE_PATH")
+    if cache_path:
+        key = os.getenv("CONFIG_CACHE_KEY")
+        if not key and os.getenv("AZURE_CLIENT_SECRET"):
+            key = EncryptedDiskCache.derive_key(os.getenv("AZURE_CLIENT_SECRET"))
+        if key:
+            disk_cache = EncryptedDiskCache(cache_path, key)
+        else:
+            print("Warning: CONFIG_CACHE_PATH is set but there is no key to encrypt it with; the disk cache is disabled")
+
+    return KeyVaultConfigProvider(
+        os.getenv("KEY_VAULT_URL", KEY_VAULT_URL),
+        ttl=float(os.getenv("CONFIG_CACHE_TTL", DEFAULT_TTL)),
+        disk_cache=disk_cache
+    )
+
+
+def get_config_provider():
+    """Return the process-wide config provider, creating it on first use."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_config_provider()
+        return _provider
+
+
+def set_config_provider(provider):
+    """Replace the process-wide config provider, e.g. with an EnvConfigProvider in tests."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def get_secrets(secret_names):
+    return get_config_provider().get_secrets(secret_names)
+
 
 def get_secret(secret_name):
-    key_vault_url = "https://sweng25group06-keyvault.vault.azure.net/"
-    credential = DefaultAzureCredential()
-    secret_client = SecretClient(vault_url=key_vault_url, credential=credential)
-    retrieved_secret = secret_client.get_secret(secret_name)
-    return retrieved_secret.value
\ No newline at end of file
+    return get_config_provider().get_secret(secret_name)
@@ -10,8 +10,9 @@ import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from azure.identity import ClientSecretCredential
-from azure.keyvault.secrets import SecretClient
+from keyvault_utils import get_secrets
+from metric_accumulators import MetricsAccumulator
+import accuracy_engine
 
 env_path = Path("/app/.env")  # Docker container path
 if not env_path.exists():
@@ -22,28 +23,17 @@ if env_path.exists():
 else:
     print("Warning: .env file not found")
 
-# cosmosDB access
-TENANT_ID = os.getenv("AZURE_TENANT_ID")
-CLIENT_ID = os.getenv("AZURE_CLIENT_ID")
-CLIENT_SECRET = os.getenv("AZURE_CLIENT_SECRET")
-
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 if os.getenv("DOCKER_CONTAINER") == "true" and not os.getenv("NEO4J_URI"):
     NEO4J_URI = "bolt://host.docker.internal:7687"
 
 
-KEY_VAULT_URL = "https://sweng25group06keyvault.vault.azure.net/"
-credential = ClientSecretCredential(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
-secret_client = SecretClient(vault_url=KEY_VAULT_URL, credential=credential)
-
-secret = secret_client.get_secret("COSMOS-ENDPOINT")
-COSMOS_ENDPOINT = secret.value
-secret = secret_client.get_secret("COSMOS-KEY")
-COSMOS_KEY = secret.value
-secret = secret_client.get_secret("COSMOS-DATABASE-NAME")
-DATABASE_NAME = secret.value
-secret = secret_client.get_secret("COSMOS-CONTAINER-NAME")
-CONTAINER_NAME = secret.value
+# cosmosDB access, with the secrets fetched together from the shared config provider
+secrets = get_secrets(["COSMOS-ENDPOINT", "COSMOS-KEY", "COSMOS-DATABASE-NAME", "COSMOS-CONTAINER-NAME"])
+COSMOS_ENDPOINT = secrets["COSMOS-ENDPOINT"]
+COSMOS_KEY = secrets["COSMOS-KEY"]
+DATABASE_NAME = secrets["COSMOS-DATABASE-NAME"]
+CONTAINER_NAME = secrets["COSMOS-CONTAINER-NAME"]
 #print("COSMOS_ENDPOINT:", COSMOS_ENDPOINT)
 #print("COSMOS_KEY:", COSMOS_KEY)
 
@@ -132,6 +122,52 @@ class MetricsType:
     preprocess_time_distribution: str  
     postprocess_time_distribution: str  
 
+# Define GraphQL types for metrics merged across batches
+@strawberry.type
+class DistributionSummaryType:
+    count: int
+    average: float
+    std_dev: float
+    min: float | None
+    max: float | None
+    p50: float | None
+    p95: float | None
+    p99: float | None
+    distribution: str  # JSON of the counts in equal-width bins between min and max
+
+@strawberry.type
+class MetricsRollupType:
+    batch_ids: List[str]
+    total_images: int
+    preprocess_time: DistributionSummaryType
+    inference_time: DistributionSummaryType
+    postprocess_time: DistributionSummaryType
+    box_size: DistributionSummaryType
+    metrics: str  # JSON of the merged batch metrics, with the same fields as a single batch
+
+# Define GraphQL types for the accuracy of the reviewed images
+@strawberry.type
+class LabelAccuracyType:
+    label: str
+    true_positives: int
+    false_positives: int
+    false_negatives: int
+    precision: float
+    recall: float
+    f1: float
+
+@strawberry.type
+class AccuracyMetricsType:
+    batch_id: str | None = strawberry.field(name="batchId")
+    reviewed: int
+    correct: int
+    accuracy: float
+    precision: float  # macro-averaged over the labels
+    recall: float
+    f1: float
+    labels: List[LabelAccuracyType]
+    confusion_matrix: str  # JSON of {predicted label: {correct label: count}}
+
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "password"
 
@@ -263,39 +299,93 @@ def get_metrics() -> List[MetricsType]:
             for record in result
         ]
 
-def store_feedback(image_url: str, reviewed: bool = None, classified: bool = None, misclassified: bool = None) -> str:
+def get_metrics_sketches(batch_ids: List[str] = None, since: datetime = None, until: datetime = None) -> List[Dict[str, Any]]:
+    """
+    Queries the Neo4j database for the mergeable metrics sketches stored with each batch,
+    optionally only those of the given batches or created in [since, until).
+    """
+    with driver.session() as session:
+        result = session.run(
+            """
+            MATCH (s:MetricsSketch)
+            WHERE ($batch_ids IS NULL OR s.batch_id IN $batch_ids)
+              AND ($since IS NULL OR s.created_at >= datetime($since))
+              AND ($until IS NULL OR s.created_at < datetime($until))
+            RETURN s.batch_id AS batch_id, s.sketches AS sketches
+            ORDER BY s.created_at
+            """,
+            batch_ids=batch_ids,
+            since=since.isoformat() if since else None,
+            until=until.isoformat() if until else None,
+        )
+        return [{"batch_id": record["batch_id"], "sketches": json.loads(record["sketches"])} for record in result]
+
+def get_metrics_rollup(batch_ids: List[str] = None, since: datetime = None, until: datetime = None, bins: int = 10) -> MetricsRollupType:
+    """
+    Merges the metrics sketches of a set of batches or a time window into the metrics of
+    all their images, with the p50/p95/p99 of the times and box sizes.
+    """
+    if bins < 1:
+        raise ValueError("bins must be at least 1")
+    sketches = get_metrics_sketches(batch_ids, since, until)
+    accumulator = MetricsAccumulator.merged(sketch["sketches"] for sketch in sketches)
+
+    def summary(name):
+        values = accumulator.summary(name, bins)
+        values["distribution"] = json.dumps(values["distribution"])
+        return DistributionSummaryType(**values)
+
+    return MetricsRollupType(
+        batch_ids=[sketch["batch_id"] for sketch in sketches],
+        total_images=len(accumulator),
+        preprocess_time=summary("preprocess"),
+        inference_time=summary("inference"),
+        postprocess_time=summary("postprocess"),
+        box_size=summary("box_size"),
+        metrics=json.dumps(accumulator.stats()),
+    )
+
+def get_accuracy_metrics(batch_id: str = None) -> AccuracyMetricsType:
+    """
+    Reads the accuracy counters maintained from feedback and returns the accuracy,
+    precision, recall, F1 and confusion matrix of one batch, or of every batch.
     """
-    Updates the Annotation node's properties based on feedback.
+    with driver.session() as session:
+        accuracy = accuracy_engine.get_accuracy(session, batch_id)
+    return AccuracyMetricsType(
+        batch_id=batch_id,
+        reviewed=accuracy["reviewed"],
+        correct=accuracy["correct"],
+        accuracy=accuracy["accuracy"],
+        precision=accuracy["precision"],
+        recall=accuracy["recall"],
+        f1=accuracy["f1"],
+        labels=[LabelAccuracyType(label=label, **metrics) for label, metrics in accuracy["labels"].items()],
+        confusion_matrix=json.dumps(accuracy["confusion_matrix"]),
+    )
+
+def store_feedback(image_url: str, reviewed: bool = None, classified: bool = None, misclassified: bool = None,
+                   correct_label: str = None) -> str:
+    """
+    Updates the Annotation node's properties based on feedback, and the accuracy counters
+    of the image's batches in the same transaction.
     
     :param image_url: The URL of the image whose annotation needs updating.
     :param reviewed: Boolean flag to update the 'reviewed' field.
     :param classified: Boolean flag to update the 'classified' field.
     :param misclassified: Boolean flag to update the 'misclassified' field.
+    :param correct_label: The correct label of a misclassified image, if known.
     :return: A confirmation message indicating the update status.
     """
     try:
         with driver.session() as session:
-            # ✅ First, check if the Image exists and has an Annotation
-            check_query = """
-            MATCH (i:Image {image_url: $image_url})-[:HAS_ANNOTATION]->(a:Annotation)
-            RETURN a
-            """
-            check_result = session.run(check_query, image_url=image_url)
+            updated_count = session.execute_write(
+                accuracy_engine.update_feedback, image_url, reviewed, classified, misclassified, correct_label
+            )
 
-            if check_result.single() is None:
+            if updated_count is None:
                 return f"⚠️ Image found, but no annotation exists for: {image_url}"
 
-            # ✅ If annotation exists, update it
-            query = """
-            MATCH (i:Image {image_url: $image_url})-[:HAS_ANNOTATION]->(a:Annotation)
-            SET a.reviewed = COALESCE($reviewed, a.reviewed),
-                a.classified = COALESCE($classified, a.classified),
-                a.misclassified = COALESCE($misclassified, a.misclassified)
-            RETURN COUNT(a) AS updatedCount
-            """
-            result = session.run(query, image_url=image_url, reviewed=reviewed, classified=classified, misclassified=misclassified)
-            updated_count = result.single()["updatedCount"]
-
             if updated_count > 0:
                 return f"✅ Successfully updated {updated_count} annotation(s) for image: {image_url}"
             else:
@@ -319,17 +409,33 @@ class Query:
     @strawberry.field
     def image_metrics(self, batch_id: str = None) -> List[ImageMetricsType]:
         return get_image_metrics(batch_id=batch_id)
+
+    @strawberry.field
+    def metrics_rollup(
+        self, batch_ids: List[str] = None, since: datetime = None, until: datetime = None, bins: int = 10
+    ) -> MetricsRollupType:
+        """
+        Merges the metrics of the given batches, or of the batches stored in [since, until),
+        or of every batch when neither is given.
+        """
+        return get_metrics_rollup(batch_ids=batch_ids, since=since, until=until, bins=bins)
+
+    @strawberry.field
+    def accuracy_metrics(self, batch_id: str = None) -> AccuracyMetricsType:
+        """Accuracy, precision, recall, F1 and confusion matrix of the reviewed images of a batch, or of every batch."""
+        return get_accuracy_metrics(batch_id=batch_id)
     
 @strawberry.type
 class Mutation:
     @strawberry.mutation
     def store_feedback(
-        self, image_url: str, reviewed: bool = None, classified: bool = None, misclassified: bool = None
+        self, image_url: str, reviewed: bool = None, classified: bool = None, misclassified: bool = None,
+        correct_label: str = None
     ) -> str:
         """
-        Updates an annotation node's properties (reviewed, classified, misclassified).
+        Updates an annotation node's properties (reviewed, classified, misclassified, correct_label).
         """
-        return store_feedback(image_url, reviewed, classified, misclassified)
+        return store_feedback(image_url, reviewed, classified, misclassified, correct_label)
 
 
 schema = strawberry.Schema(query=Query, mutation=Mutation)
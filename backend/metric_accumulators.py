@@ -0,0 +1,489 @@
+"""
+Streaming batch metrics that update per image in constant memory.
+
+metrics.py and metrics_engine.py need every time, confidence and box of the batch in
+memory. MetricsAccumulator instead folds each result into fixed-size summaries:
+
+- RunningStats: count, exact sum, min, max and Welford's mean and variance
+- BinnedCounts: counts in fixed-width bins, e.g. tenths of a confidence or whole ms
+- QuantileSketch: counts in logarithmic bins with a bounded relative error, for quantiles
+  and for distributions whose bins depend on the batch min and max
+- LabelStats: detections and summed confidence per label
+
+Every summary can be merged with another of its kind, so accumulators filled in separate
+processes (they pickle) or separate batches add up to the accumulator of all their images.
+to_dict() gives a JSON form, which is stored with each batch's metrics so that any set of
+batches can be merged later.
+
+MetricsAccumulator.stats() returns the same fields as metrics_engine.calculate_stats. The
+totals, counts and fixed-bin distributions are exact. Averages are sums divided by counts,
+so they can differ from the exact mean in the last rounded digit. The preprocess,
+postprocess and box size distributions are rebuilt from the sketches: their bins are the
+same, but values within the sketch's relative accuracy of a bin edge are split between
+the two bins as if spread evenly, so those counts are approximate.
+"""
+import math
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Version of the MetricsAccumulator.to_dict() format stored with the batch metrics
+SERIALIZATION_VERSION = 1
+# Classification results have a single empty box and box proportion
+PLACEHOLDER = ""
+
+
+class RunningStats:
+    """Count, sum, min, max, mean and variance of a stream of numbers (Welford's algorithm)."""
+
+    __slots__ = ("count", "total", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add the values summarised by other (Chan et al.'s parallel variance)."""
+        if not other.count:
+            return self
+        if not self.count:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def average(self, digits=2):
+        """The rounded mean, or 0 without values, like the averages of metrics.py."""
+        return round(self.total / self.count, digits) if self.count else 0
+
+    @property
+    def variance(self):
+        """Population variance."""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, values):
+        stats = cls()
+        for name in cls.__slots__:
+            setattr(stats, name, values[name])
+        return stats
+
+
+class BinnedCounts:
+    """
+    Counts of values in bins of fixed width: a value goes into bin int(value * scale),
+    capped at max_index. Only bins that were hit are stored.
+    """
+
+    __slots__ = ("scale", "max_index", "counts")
+
+    def __init__(self, scale=1, max_index=None):
+        self.scale = scale
+        self.max_index = max_index
+        self.counts = {}
+
+    def add(self, value):
+        index = int(value * self.scale)
+        if self.max_index is not None:
+            index = min(index, self.max_index)
+        self.counts[index] = self.counts.get(index, 0) + 1
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        return self
+
+    def get(self, index):
+        return self.counts.get(index, 0)
+
+    def to_dict(self):
+        # JSON object keys are strings
+        return {"scale": self.scale, "max_index": self.max_index, "counts": {str(index): count for index, count in self.counts.items()}}
+
+    @classmethod
+    def from_dict(cls, values):
+        binned = cls(values["scale"], values["max_index"])
+        binned.counts = {int(index): count for index, count in values["counts"].items()}
+        return binned
+
+
+class QuantileSketch:
+    """
+    A mergeable quantile sketch for non-negative values (a DDSketch): positive values are
+    counted in bins whose bounds grow by a factor gamma, so every quantile is returned
+    within relative_accuracy of a value of that rank. The number of bins grows with the
+    log of the ratio between the largest and smallest value, not with the count.
+    """
+
+    __slots__ = ("relative_accuracy", "gamma", "log_gamma", "bins", "zeros", "count", "min", "max")
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value < 0:
+            raise ValueError(f"QuantileSketch only holds non-negative values, got {value}")
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value == 0:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def items(self):
+        """Yield (value, count) for every bin in increasing order, each value clamped to [min, max]."""
+        if self.zeros:
+            yield 0, self.zeros
+        for index in sorted(self.bins):
+            # The bin (gamma^(index-1), gamma^index] is represented by the value with equal relative error to both bounds
+            value = 2 * self.gamma ** index / (self.gamma + 1)
+            yield min(max(value, self.min), self.max), self.bins[index]
+
+    def ranges(self):
+        """Yield (lower, upper, count) for every bin in increasing order, with the bounds clamped to [min, max]."""
+        if self.zeros:
+            yield 0, 0, self.zeros
+        for index in sorted(self.bins):
+            lower = min(max(self.gamma ** (index - 1), self.min), self.max)
+            upper = min(max(self.gamma ** index, self.min), self.max)
+            yield lower, upper, self.bins[index]
+
+    def quantile(self, fraction):
+        """Return the value of the nearest-rank quantile, e.g. 0.95 for the p95, or None when empty."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for value, count in self.items():
+            seen += count
+            if seen >= rank:
+                return value
+        return self.max
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "zeros": self.zeros,
+            "min": self.min,
+            "max": self.max,
+            "bins": {str(index): count for index, count in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        sketch = cls(values["relative_accuracy"])
+        sketch.count, sketch.zeros, sketch.min, sketch.max = values["count"], values["zeros"], values["min"], values["max"]
+        sketch.bins = {int(index): count for index, count in values["bins"].items()}
+        return sketch
+
+
+class LabelStats:
+    """Detections and summed confidence of every label, in order of first appearance."""
+
+    __slots__ = ("counts", "confidence_totals")
+
+    def __init__(self):
+        self.counts = {}
+        self.confidence_totals = {}
+
+    def add(self, label, confidence):
+        self.counts[label] = self.counts.get(label, 0) + 1
+        self.confidence_totals[label] = self.confidence_totals.get(label, 0) + confidence
+
+    def merge(self, other):
+        for label, count in other.counts.items():
+            self.counts[label] = self.counts.get(label, 0) + count
+            self.confidence_totals[label] = self.confidence_totals.get(label, 0) + other.confidence_totals[label]
+        return self
+
+    def average_confidences(self, digits=2):
+        return {label: round(self.confidence_totals[label] / count, digits) for label, count in self.counts.items()}
+
+    def to_dict(self):
+        return {"counts": dict(self.counts), "confidence_totals": dict(self.confidence_totals)}
+
+    @classmethod
+    def from_dict(cls, values):
+        labels = cls()
+        labels.counts = dict(values["counts"])
+        labels.confidence_totals = dict(values["confidence_totals"])
+        return labels
+
+
+def sketch_equal_width_bins(sketch, num_bins, key_format):
+    """
+    Count the values of a sketch into num_bins equal-width bins between its min and max,
+    with the same keys as metrics._equal_width_bins on the original values. The count of
+    a sketch bin that straddles an edge is split in proportion to the overlap, and the
+    split counts are rounded so that they still add up to the number of values.
+    """
+    low, high = sketch.min, sketch.max
+    width = (high - low) / num_bins
+    shares = [0.0] * num_bins
+    for lower, upper, count in sketch.ranges():
+        if not width:
+            shares[0] += count
+            continue
+        first = min(int((lower - low) // width), num_bins - 1)
+        last = min(int((upper - low) // width), num_bins - 1)
+        if first == last or upper == lower:
+            shares[first] += count
+            continue
+        for index in range(first, last + 1):
+            overlap = min(upper, low + (index + 1) * width) - max(lower, low + index * width)
+            shares[index] += count * max(overlap, 0.0) / (upper - lower)
+    counts, cumulative, rounded = [], 0.0, 0
+    for share in shares:
+        cumulative += share
+        counts.append(round(cumulative) - rounded)
+        rounded += counts[-1]
+    counts[-1] += sketch.count - rounded
+    distribution = {}
+    for i, count in enumerate(counts):
+        key = key_format(low + i * width, low + (i + 1) * width)
+        distribution[key] = distribution.get(key, 0) + count
+    return distribution
+
+
+def _time_key(lower, upper):
+    return f"{round(lower, 2):.2f}-{round(upper, 2):.2f}"
+
+
+def _tenths(counts):
+    return {f"{i/10:.1f}-{(i+1)/10:.1f}": counts.get(i) for i in range(10)}
+
+
+class MetricsAccumulator:
+    """
+    The batch metrics of any number of results in constant memory (apart from one entry
+    per label and per distinct detection count). add() folds in one image's model result
+    tuple and stats() returns the fields sent to ModelService.StoreMetrics.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.images = 0
+        self.pre_times = RunningStats()
+        self.inf_times = RunningStats()
+        self.post_times = RunningStats()
+        self.pre_sketch = QuantileSketch(relative_accuracy)
+        self.inf_sketch = QuantileSketch(relative_accuracy)
+        self.post_sketch = QuantileSketch(relative_accuracy)
+        self.inf_ms_bins = BinnedCounts(scale=1)
+        self.confidences = RunningStats()
+        self.confidence_bins = BinnedCounts(scale=10, max_index=9)
+        self.labels = LabelStats()
+        self.detection_counts = BinnedCounts(scale=1)
+        self.box_sizes = RunningStats()
+        self.box_size_sketch = QuantileSketch(relative_accuracy)
+        self.box_proportions = RunningStats()
+        self.box_proportion_bins = BinnedCounts(scale=10, max_index=9)
+
+    def add(self, result):
+        """Add one image's model result tuple."""
+        labels, confs, bboxes, pre_times, inf_times, post_times, proportions = result[:7]
+        self.images += 1
+        self._add_times(pre_times, inf_times, post_times)
+        self._add_detections(labels, confs, bboxes, proportions)
+
+    @classmethod
+    def from_metrics_data(cls, data):
+        """Summarise the per-image lists of model_client.new_metrics_data."""
+        accumulator = cls()
+        accumulator.images = len(data['detections'])
+        accumulator._add_times(data['pre_times'], data['inf_times'], data['post_times'])
+        for detections in zip(data['labels_list'], data['confs_list'], data['bboxes_list'], data['box_props']):
+            accumulator._add_detections(*detections)
+        return accumulator
+
+    def _add_times(self, pre_times, inf_times, post_times):
+        for value in pre_times:
+            self.pre_times.add(value)
+            self.pre_sketch.add(value)
+        for value in inf_times:
+            self.inf_times.add(value)
+            self.inf_sketch.add(value)
+            self.inf_ms_bins.add(value)
+        for value in post_times:
+            self.post_times.add(value)
+            self.post_sketch.add(value)
+
+    def _add_detections(self, labels, confs, bboxes, proportions):
+        for label, confidence in zip(labels, confs):
+            self.labels.add(label, confidence)
+        for confidence in confs:
+            self.confidences.add(confidence)
+            self.confidence_bins.add(confidence)
+        self.detection_counts.add(len(labels))
+        for bbox in bboxes:
+            if bbox != PLACEHOLDER:
+                x1, y1, x2, y2 = bbox
+                size = (x2 - x1) * (y2 - y1)
+                self.box_sizes.add(size)
+                self.box_size_sketch.add(size)
+        for proportion in proportions:
+            if proportion != PLACEHOLDER:
+                self.box_proportions.add(proportion)
+                self.box_proportion_bins.add(proportion)
+
+    def merge(self, other):
+        """Add the results summarised by another accumulator, e.g. one filled in another process."""
+        self.images += other.images
+        for name, value in vars(other).items():
+            if name != "images":
+                getattr(self, name).merge(value)
+        return self
+
+    def __len__(self):
+        return self.images
+
+    def to_dict(self):
+        """Return a JSON-serialisable form of the accumulator, e.g. to store it with the batch metrics."""
+        values = {"version": SERIALIZATION_VERSION, "images": self.images}
+        for name, summary in vars(self).items():
+            if name != "images":
+                values[name] = summary.to_dict()
+        return values
+
+    @classmethod
+    def from_dict(cls, values):
+        if values.get("version") != SERIALIZATION_VERSION:
+            raise ValueError(f"Unsupported metrics sketch version: {values.get('version')}")
+        accumulator = cls()
+        accumulator.images = values["images"]
+        for name, summary in vars(accumulator).items():
+            if name != "images":
+                setattr(accumulator, name, type(summary).from_dict(values[name]))
+        return accumulator
+
+    @classmethod
+    def merged(cls, payloads):
+        """Return the accumulator of all the batches whose to_dict() forms are given."""
+        accumulator = cls()
+        for payload in payloads:
+            accumulator.merge(cls.from_dict(payload))
+        return accumulator
+
+    def summary(self, name, bins=10, fractions=(0.5, 0.95, 0.99)):
+        """
+        Summarise one sketched quantity: "preprocess", "inference" or "postprocess" time in ms,
+        or "box_size" in square pixels.
+        Returns:
+            dict: count, average, std_dev, min, max, the quantiles (e.g. p95) and the values
+            counted into `bins` equal-width bins between min and max.
+        """
+        stats, sketch = {
+            "preprocess": (self.pre_times, self.pre_sketch),
+            "inference": (self.inf_times, self.inf_sketch),
+            "postprocess": (self.post_times, self.post_sketch),
+            "box_size": (self.box_sizes, self.box_size_sketch),
+        }[name]
+        summary = {
+            "count": stats.count,
+            "average": stats.average(),
+            "std_dev": round(stats.std, 2),
+            "min": stats.min,
+            "max": stats.max,
+        }
+        for fraction in fractions:
+            summary[f"p{round(fraction * 100)}"] = sketch.quantile(fraction)
+        summary["distribution"] = sketch_equal_width_bins(sketch, bins, _time_key) if sketch.count else {}
+        return summary
+
+    def _inference_time_distribution(self):
+        if not self.inf_times.count:
+            return {"0-1ms": 0}
+        start = max(0, int(self.inf_times.min) - 2)
+        end = int(self.inf_times.max) + 2
+        return {f"{i}-{i + 1}ms": self.inf_ms_bins.get(i) for i in range(start, end)}
+
+    def percentiles(self, fractions=(0.5, 0.95, 0.99)):
+        """Return the quantiles of the preprocess, inference and postprocess times in ms, from the sketches."""
+        return {
+            name: {f"p{round(fraction * 100)}": sketch.quantile(fraction) for fraction in fractions}
+            for name, sketch in (("preprocess", self.pre_sketch), ("inference", self.inf_sketch), ("postprocess", self.post_sketch))
+        }
+
+    def stats(self):
+        """Return the batch metrics, with the same fields as metrics_engine.calculate_stats."""
+        category_distribution = dict(self.labels.counts)
+        total_labels = sum(category_distribution.values())
+        max_detections = max(self.detection_counts.counts, default=None)
+        return {
+            "Total images": self.images,
+            "Total time": round(self.pre_times.total + self.inf_times.total + self.post_times.total, 2),
+            "Total preprocessing time": round(self.pre_times.total, 2),
+            "Total inference time": round(self.inf_times.total, 2),
+            "Total postprocessing time": round(self.post_times.total, 2),
+            "Average preprocess time": self.pre_times.average(),
+            "Average inference time": self.inf_times.average(),
+            "Average postprocess time": self.post_times.average(),
+            "Average confidence score": self.confidences.average(),
+            "Average confidence for different labels": self.labels.average_confidences(),
+            "Confidence distribution": _tenths(self.confidence_bins),
+            "Detection count distribution": {} if max_detections is None else {
+                i: self.detection_counts.get(i) for i in range(max_detections + 1)
+            },
+            "Category distribution": category_distribution,
+            "Category percentages": {k: round(v/total_labels*100, 2) for k, v in category_distribution.items()} if total_labels else {},
+            "Inference time distribution": self._inference_time_distribution(),
+            "Preprocess time distribution": sketch_equal_width_bins(self.pre_sketch, 10, _time_key) if self.pre_sketch.count else {},
+            "Postprocess time distribution": sketch_equal_width_bins(self.post_sketch, 10, _time_key) if self.post_sketch.count else {},
+            "Average box size": self.box_sizes.average(),
+            "Box size distribution": sketch_equal_width_bins(
+                self.box_size_sketch, 5, lambda lower, upper: f"{int(lower)}-{int(upper)}"
+            ) if self.box_size_sketch.count else {"0-0": 0},
+            "Average box proportion": self.box_proportions.average(4),
+            "Box proportion distribution": _tenths(self.box_proportion_bins),
+        }
@@ -1,6 +1,26 @@
 from collections import Counter
 from statistics import mean
 
+# Classification results have a single empty box and box proportion, which are skipped
+PLACEHOLDER = ""
+
+def _equal_width_bins(values, num_bins, key_format):
+    """
+    Count values into num_bins equal-width bins between their minimum and maximum.
+    Bins whose formatted keys coincide are merged, and equal values all count in the first bin.
+    """
+    low, high = min(values), max(values)
+    width = (high - low) / num_bins
+    counts = [0] * num_bins
+    for value in values:
+        index = min(int((value - low) // width), num_bins - 1) if width else 0
+        counts[index] += 1
+    distribution = {}
+    for i, count in enumerate(counts):
+        key = key_format(low + i * width, low + (i + 1) * width)
+        distribution[key] = distribution.get(key, 0) + count
+    return distribution
+
 def calculate_total_images(image_names):
     return len(image_names)
 
@@ -78,42 +98,27 @@ def calculate_inference_time_distribution(inference_times):
 def calculate_avg_box_size(bounding_boxes, orig_shapes):
     box_sizes = []
     for bboxes, (h, w) in zip(bounding_boxes, orig_shapes):
-        for x1, y1, x2, y2 in bboxes:
+        for x1, y1, x2, y2 in (bbox for bbox in bboxes if bbox != PLACEHOLDER):
             box_sizes.append((x2-x1) * (y2-y1))
     return round(mean(box_sizes), 2) if box_sizes else 0
 
 def calculate_box_size_distribution(bounding_boxes, orig_shapes):
     box_sizes = []
     for bboxes, (h, w) in zip(bounding_boxes, orig_shapes):
-        for x1, y1, x2, y2 in bboxes:
+        for x1, y1, x2, y2 in (bbox for bbox in bboxes if bbox != PLACEHOLDER):
             box_sizes.append((x2 - x1) * (y2 - y1))
 
     if not box_sizes:
         return {"0-0": 0}
 
-    min_size = min(box_sizes)
-    max_size = max(box_sizes)
-    num_bins = 5
-    bin_width = (max_size - min_size) / num_bins
-    distribution = {}
-    for i in range(num_bins):
-        lower = int(min_size + i * bin_width)
-        upper = int(min_size + (i + 1) * bin_width)
-        key = f"{lower}-{upper}"
-        distribution[key] = 0
-
-    for size in box_sizes:
-        index = min(int((size - min_size) // bin_width), num_bins - 1)
-        key = list(distribution.keys())[index]
-        distribution[key] += 1
-    return distribution
+    return _equal_width_bins(box_sizes, 5, lambda lower, upper: f"{int(lower)}-{int(upper)}")
 
 def calculate_avg_box_proportion(box_proportions):
-    all_props = [p for plist in box_proportions for p in plist]
+    all_props = [p for plist in box_proportions for p in plist if p != PLACEHOLDER]
     return round(mean(all_props), 4) if all_props else 0
 
 def calculate_box_proportion_distribution(box_proportions):
-    all_props = [p for plist in box_proportions for p in plist]
+    all_props = [p for plist in box_proportions for p in plist if p != PLACEHOLDER]
     dist = {f"{i/10:.1f}-{(i+1)/10:.1f}": 0 for i in range(10)}
     for prop in all_props:
         index = min(int(prop*10), 9)
@@ -127,33 +132,42 @@ def calculate_avg_postprocess_time(post_times):
     return round(mean(post_times), 2) if post_times else 0
 
 def calculate_preprocess_time_distribution(preprocess_times):
-    preprocess_dist = {}
-    if preprocess_times:
-        min_pre = min(preprocess_times)
-        max_pre = max(preprocess_times)
-        bin_width = (max_pre - min_pre) / 10
-        for i in range(10):
-            lower = round(min_pre + i * bin_width, 2)
-            upper = round(min_pre + (i + 1) * bin_width, 2)
-            preprocess_dist[f"{lower:.2f}-{upper:.2f}"] = 0
-        for time in preprocess_times:
-            index = min(int((time - min_pre) // bin_width), 9)
-            key = list(preprocess_dist.keys())[index]
-            preprocess_dist[key] += 1
-    return preprocess_dist
+    if not preprocess_times:
+        return {}
+    return _equal_width_bins(preprocess_times, 10, lambda lower, upper: f"{round(lower, 2):.2f}-{round(upper, 2):.2f}")
 
 def calculate_postprocess_time_distribution(postprocess_times):
-    postprocess_dist = {}
-    if postprocess_times:
-        min_post = min(postprocess_times)
-        max_post = max(postprocess_times)
-        bin_width = (max_post - min_post) / 10
-        for i in range(10):
-            lower = round(min_post + i * bin_width, 2)
-            upper = round(min_post + (i + 1) * bin_width, 2)
-            postprocess_dist[f"{lower:.2f}-{upper:.2f}"] = 0
-        for time in postprocess_times:
-            index = min(int((time - min_post) // bin_width), 9)
-            key = list(postprocess_dist.keys())[index]
-            postprocess_dist[key] += 1
-    return postprocess_dist
\ No newline at end of file
+    if not postprocess_times:
+        return {}
+    return _equal_width_bins(postprocess_times, 10, lambda lower, upper: f"{round(lower, 2):.2f}-{round(upper, 2):.2f}")
+
+
+def calculate_stats(data):
+    """
+    Calculate the batch metrics from the per-image lists of model_client.new_metrics_data,
+    one function per metric. metrics_engine.calculate_stats computes the same dict in one pass.
+    """
+    category_dist = calculate_category_distribution(data['label_counts'])
+    return {
+        "Total images": calculate_total_images(data['detections']),  # one entry per image
+        "Total time": calculate_total_time(data['pre_times'], data['inf_times'], data['post_times']),
+        "Total preprocessing time": calculate_total_preprocessing_time(data['pre_times']),
+        "Total inference time": calculate_total_inference_time(data['inf_times']),
+        "Total postprocessing time": calculate_total_postprocessing_time(data['post_times']),
+        "Average preprocess time": calculate_avg_preprocess_time(data['pre_times']),
+        "Average inference time": calculate_avg_inference_time(data['inf_times']),
+        "Average postprocess time": calculate_avg_postprocess_time(data['post_times']),
+        "Average confidence score": calculate_avg_confidence(data['confs_list']),
+        "Average confidence for different labels": calculate_label_avg_confidences(data['labels_list'], data['confs_list']),
+        "Confidence distribution": calculate_confidence_distribution(data['confs_list']),
+        "Detection count distribution": calculate_detection_distribution(data['detections']),
+        "Category distribution": category_dist,
+        "Category percentages": calculate_category_percentages(category_dist),
+        "Inference time distribution": calculate_inference_time_distribution(data['inf_times']),
+        "Preprocess time distribution": calculate_preprocess_time_distribution(data['pre_times']),
+        "Postprocess time distribution": calculate_postprocess_time_distribution(data['post_times']),
+        "Average box size": calculate_avg_box_size(data['bboxes_list'], data['orig_shapes']),
+        "Box size distribution": calculate_box_size_distribution(data['bboxes_list'], data['orig_shapes']),
+        "Average box proportion": calculate_avg_box_proportion(data['box_props']),
+        "Box proportion distribution": calculate_box_proportion_distribution(data['box_props'])
+    }
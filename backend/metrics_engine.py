@@ -0,0 +1,152 @@
+"""
+Columnar batch metrics: the per-image values collected while processing a batch are
+flattened once into NumPy columns (one entry per image or per detection), and every
+metric of the stats dict is computed from those columns with vectorised operations.
+
+The result equals that of combining the functions in metrics.py (see
+metrics.calculate_stats), which scan the nested lists again for every metric. Values are
+handled as float64, so an average of integers, e.g. of integer box sizes, is a float
+where metrics.py may return an int of the same value.
+"""
+import math
+import statistics
+from itertools import chain
+import numpy as np
+
+# Classification results have a single empty box and box proportion
+PLACEHOLDER = ""
+
+
+def _without_placeholders(nested):
+    return ([value for value in values if value != PLACEHOLDER] if PLACEHOLDER in values else values for values in nested)
+
+
+def _column(nested, width=None):
+    """Flatten per-image lists of numbers (or of boxes, with width 4) into one float64 array."""
+    values = chain.from_iterable(_without_placeholders(nested))
+    if width is None:
+        return np.fromiter(values, dtype=np.float64)
+    return np.fromiter(chain.from_iterable(values), dtype=np.float64).reshape(-1, width)
+
+
+def _rounded_mean(values, digits):
+    """
+    Return round(statistics.mean(values), digits) for a non-empty column.
+    statistics.mean is exact, so the float sum is only trusted when it is not close to a
+    rounding boundary; otherwise the exact mean is computed the slow way.
+    """
+    mean = float(values.sum()) / len(values)
+    scaled = abs(mean) * 10 ** digits
+    if abs(scaled - math.floor(scaled) - 0.5) < 1e-6 + scaled * 1e-12:
+        return round(statistics.mean(values.tolist()), digits)
+    return round(mean, digits)
+
+
+def _mean_or_zero(values, digits=2):
+    return _rounded_mean(values, digits) if len(values) else 0
+
+
+def _tenths_distribution(values):
+    """Counts of values in [0.0-0.1), ..., [0.9-1.0], like metrics.calculate_confidence_distribution."""
+    indices = np.minimum((values * 10).astype(np.int64), 9) if len(values) else np.zeros(0, dtype=np.int64)
+    counts = np.bincount(indices, minlength=10).tolist()
+    return {f"{i/10:.1f}-{(i+1)/10:.1f}": counts[i] for i in range(10)}
+
+
+def _equal_width_bins(values, num_bins, key_format):
+    """The vectorised metrics._equal_width_bins, for a non-empty column."""
+    low, high = values.min().item(), values.max().item()
+    width = (high - low) / num_bins
+    if width:
+        counts = np.bincount(np.minimum(((values - low) // width).astype(np.int64), num_bins - 1), minlength=num_bins).tolist()
+    else:
+        counts = [len(values)] + [0] * (num_bins - 1)
+    distribution = {}
+    for i, count in enumerate(counts):
+        key = key_format(low + i * width, low + (i + 1) * width)
+        distribution[key] = distribution.get(key, 0) + count
+    return distribution
+
+
+def _time_key(lower, upper):
+    return f"{round(lower, 2):.2f}-{round(upper, 2):.2f}"
+
+
+def _inference_time_distribution(inf_times):
+    if not len(inf_times):
+        return {"0-1ms": 0}
+    start = max(0, int(inf_times.min()) - 2)
+    end = int(inf_times.max()) + 2
+    indices = inf_times.astype(np.int64)
+    indices = indices[(indices >= start) & (indices < end)] - start
+    counts = np.bincount(indices, minlength=end - start).tolist()
+    return {f"{i}-{i + 1}ms": counts[i - start] for i in range(start, end)}
+
+
+def _label_columns(labels_list):
+    """Return the labels in order of first appearance and the code of every detection's label."""
+    flat = list(chain.from_iterable(labels_list))
+    labels = list(dict.fromkeys(flat))
+    codes = {label: code for code, label in enumerate(labels)}
+    return labels, np.fromiter(map(codes.__getitem__, flat), dtype=np.int64, count=len(flat))
+
+
+def calculate_stats(data):
+    """
+    Calculate the batch metrics sent to the server from the values collected while processing.
+    Args:
+        data (dict): The per-image lists of model_client.new_metrics_data.
+    Returns:
+        dict: The stats, equal to metrics.calculate_stats(data).
+    """
+    pre_times, inf_times, post_times = data['pre_times'], data['inf_times'], data['post_times']
+    pre = np.asarray(pre_times, dtype=np.float64)
+    inf = np.asarray(inf_times, dtype=np.float64)
+    post = np.asarray(post_times, dtype=np.float64)
+    detections = np.asarray(data['detections'], dtype=np.int64)
+
+    confidences = _column(data['confs_list'])
+    labels, codes = _label_columns(data['labels_list'])
+    boxes = _column(data['bboxes_list'], width=4)
+    proportions = _column(data['box_props'])
+
+    # Python's sum, so the totals are summed in the same order as before
+    total_pre, total_inf, total_post = sum(pre_times), sum(inf_times), sum(post_times)
+
+    label_counts = np.bincount(codes, minlength=len(labels)).tolist()
+    category_distribution = dict(zip(labels, label_counts))
+    total_labels = sum(label_counts)
+
+    label_avg_confidences = {}
+    if len(labels):
+        # Detections sorted by label, so each label's confidences are one contiguous slice in detection order
+        order = np.argsort(codes, kind="stable")
+        bounds = np.cumsum(label_counts)
+        for code, label in enumerate(labels):
+            label_avg_confidences[label] = _rounded_mean(confidences[order[bounds[code] - label_counts[code]:bounds[code]]], 2)
+
+    box_sizes = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    return {
+        "Total images": len(detections),
+        "Total time": round(total_pre + total_inf + total_post, 2),
+        "Total preprocessing time": round(total_pre, 2),
+        "Total inference time": round(total_inf, 2),
+        "Total postprocessing time": round(total_post, 2),
+        "Average preprocess time": _mean_or_zero(pre),
+        "Average inference time": _mean_or_zero(inf),
+        "Average postprocess time": _mean_or_zero(post),
+        "Average confidence score": _mean_or_zero(confidences),
+        "Average confidence for different labels": label_avg_confidences,
+        "Confidence distribution": _tenths_distribution(confidences),
+        "Detection count distribution": dict(enumerate(np.bincount(detections).tolist())) if len(detections) else {},
+        "Category distribution": category_distribution,
+        "Category percentages": {k: round(v/total_labels*100, 2) for k, v in category_distribution.items()} if total_labels else {},
+        "Inference time distribution": _inference_time_distribution(inf),
+        "Preprocess time distribution": _equal_width_bins(pre, 10, _time_key) if len(pre) else {},
+        "Postprocess time distribution": _equal_width_bins(post, 10, _time_key) if len(post) else {},
+        "Average box size": _mean_or_zero(box_sizes),
+        "Box size distribution": _equal_width_bins(box_sizes, 5, lambda lower, upper: f"{int(lower)}-{int(upper)}") if len(box_sizes) else {"0-0": 0},
+        "Average box proportion": _mean_or_zero(proportions, 4),
+        "Box proportion distribution": _tenths_distribution(proportions),
+    }
@@ -5,185 +5,185 @@ import model_service_pb2_grpc
 import os
 import uuid
 import json
+import threading
 from collections import Counter
-import metrics
-import torch
+from metric_accumulators import MetricsAccumulator
 import time
-from torch.quantization import quantize_dynamic
-from ultralytics import YOLO
-from azure.storage.blob import BlobServiceClient
-from models.model_factory import ModelFactory
-from PIL import Image
-import hashlib
-from azure.identity import ClientSecretCredential
-from azure.keyvault.secrets import SecretClient
+from image_index import ImageIndex, compute_file_hash
+from result_cache import ResultCache
+from journal import BatchJournal
+from pipeline import Pipeline, Stage, collect_batch
+from result_stream import ResultStream
+from timing import NS_PER_MS, Timings, elapsed_ms
+from keyvault_utils import get_secrets
 from pathlib import Path
 from dotenv import load_dotenv
-import kaggle
-import zipfile
-import shutil
-from pathlib import Path
-
-env_path = Path("..") / ".env"  
-load_dotenv(dotenv_path=env_path)
-
-TENANT_ID = os.getenv("AZURE_TENANT_ID")
-CLIENT_ID = os.getenv("AZURE_CLIENT_ID")
-CLIENT_SECRET = os.getenv("AZURE_CLIENT_SECRET")
 
-if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET]):
-    raise ValueError("Missing one or more required environment variables: AZURE_TENANT_ID, AZURE_CLIENT_ID, AZURE_CLIENT_SECRET")
+# Heavy modules (torch, ultralytics, PIL, numpy, the Azure SDKs, kaggle) are imported by the
+# functions that need them, and secrets are fetched on first use, so that --help and
+# offline code paths start quickly and without network access.
 
-print(TENANT_ID)
+# What quantized=True means for the models, part of the result cache key
+QUANTIZATION_SCHEME = "int8-static"
 
-KEY_VAULT_URL = "https://sweng25group06keyvault.vault.azure.net/"
-credential = ClientSecretCredential(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
-secret_client = SecretClient(vault_url=KEY_VAULT_URL, credential=credential)
+env_path = Path("..") / ".env"  
+load_dotenv(dotenv_path=env_path)
 
-secret = secret_client.get_secret("AZURE-CONNECTION-STRING")
-AZURE_CONNECTION_STRING = secret.value
-secret = secret_client.get_secret("CONTAINER-NAME")
-CONTAINER_NAME = secret.value
+def get_storage_settings():
+    """Return the Blob Storage (connection string, container name) from the shared config provider."""
+    secrets = get_secrets(["AZURE-CONNECTION-STRING", "CONTAINER-NAME"])
+    return secrets["AZURE-CONNECTION-STRING"], secrets["CONTAINER-NAME"]
 
-def download_and_process_kaggle_dataset(dataset_name="alessiocorrado99/animals10", target_folder="kaggle_images"):
+def download_kaggle_dataset(dataset_name="alessiocorrado99/animals10", target_folder="kaggle_images"):
     """
-    Download and extract a Kaggle dataset to a target folder.
-    Returns the path to the extracted images.
+    Download a Kaggle dataset as a zip file into a target folder, without extracting it.
+    A zip that is already in the folder is reused, so later runs work offline.
+    Returns the path to the zip file.
     """
     # Create target folder if it doesn't exist
     os.makedirs(target_folder, exist_ok=True)
-    
+
+    zip_file = next(Path(target_folder).glob("*.zip"), None)
+    if zip_file is not None:
+        print(f"Using previously downloaded dataset: {zip_file}")
+        return str(zip_file)
+
     try:
+        # Importing kaggle authenticates with ~/.kaggle/kaggle.json, so only do it when downloading
+        import kaggle
+
         print(f"Downloading Kaggle dataset: {dataset_name}")
         kaggle.api.dataset_download_files(dataset_name, path=target_folder, unzip=False)
-        
+
         zip_file = next(Path(target_folder).glob("*.zip"))
-        
-        print(f"Extracting dataset: {zip_file}")
-        with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-            zip_ref.extractall(target_folder)
-        
-        raw_data_folder = os.path.join(target_folder, "raw-img")
-        if os.path.exists(raw_data_folder):
-            for root, _, files in os.walk(raw_data_folder):
-                for file in files:
-                    if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff')):
-                        src = os.path.join(root, file)
-                        dst = os.path.join(target_folder, file)
-                        if os.path.exists(dst):
-                            base, ext = os.path.splitext(file)
-                            dst = os.path.join(target_folder, f"{base}_{hashlib.md5(root.encode()).hexdigest()[:8]}{ext}")
-                        shutil.move(src, dst)
-            
-            shutil.rmtree(raw_data_folder)
-        
-        print(f"Dataset prepared in: {target_folder}")
-        return target_folder
-    
+        print(f"Dataset downloaded to: {zip_file}")
+        return str(zip_file)
+
     except Exception as e:
         print(f"Error processing Kaggle dataset: {e}")
         raise
 
-def compute_file_hash(file_path, hash_algorithm="sha256"):
-    """Compute the hash of a file using the specified algorithm."""
+_uploader = None
+_uploader_lock = threading.Lock()
 
-    hash_func = hashlib.new(hash_algorithm)
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_func.update(chunk)
-    return hash_func.hexdigest()
+def get_uploader(max_concurrency=8):
+    """Return the shared BlobUploader, creating it on first use."""
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            from blob_uploader import BlobUploader
 
-def upload_to_azure(image_path):
-    """Upload an image to Azure Blob Storage using its hash as the blob name."""
+            connection_string, container_name = get_storage_settings()
+            _uploader = BlobUploader.from_connection_string(connection_string, container_name, max_concurrency)
+    return _uploader
 
-    image_hash = compute_file_hash(image_path)
-    blob_name = f"{image_hash}.{image_path.split('.')[-1]}"
+def upload_to_azure(image, uploader=None, index=None, image_hash=None):
+    """
+    Upload an image to Azure Blob Storage using its hash as the blob name.
+    The image may be a file path or an ImageHandle, whose buffer is then reused.
+    When an ImageIndex is given, files it already records as uploaded are skipped
+    without being read, and previously computed hashes are reused.
+    """
+    from image_handle import ImageHandle
+
+    handle = image if isinstance(image, ImageHandle) else ImageHandle(image)
+    uploader = uploader or get_uploader()
+
+    if index is not None and handle.path is not None:
+        entry = index.lookup(handle.path)
+        # Only trust the recorded upload if it went to the container we are uploading to now
+        if entry and entry["uploaded"] and entry["blob_url"].startswith(uploader.container_client.url + "/"):
+            print(f"Image already uploaded according to local index: {entry['blob_url']}")
+            return entry["blob_url"]
+        image_hash = image_hash or index.get_hash(handle.path, handle)
+    else:
+        image_hash = image_hash or handle.hash()
 
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
-    blob_client = blob_service_client.get_blob_client(container=CONTAINER_NAME, blob=blob_name)
+    blob_name = f"{image_hash}.{handle.extension}"
 
-    if blob_client.exists():
-        print(f"Image already exists in Azure Blob Storage: {blob_name}")
-    else:
-        with open(image_path, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
-        print(f"Image uploaded to Azure Blob Storage: {blob_name}")
+    image_url, _ = uploader.upload(blob_name, handle.data)
 
-    """Creates the Blob URL"""
-    image_url = f"https://{blob_service_client.account_name}.blob.core.windows.net/{CONTAINER_NAME}/{blob_name}"
+    if index is not None and handle.path is not None:
+        index.mark_uploaded(handle.path, image_url)
 
     return image_url 
 
 def process_image(image_path, model, quantize=False):
     """Process an image using YOLO and return class labels and confidences."""
 
-    # Open the image to extract metadata
-    with Image.open(image_path) as img:
-        width, height = img.size
-        image_format = img.format
-
-    labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape, task_type = model.process_image(image_path)
+    # Read the image once for both its metadata and the model
+    from image_handle import ImageHandle
 
-    return labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape, task_type, width, height, image_format
-
-def send_results_to_server(image_urls, labels_list, confs_list, bboxes_list, batch_id, task_type, pre_times, inf_times, post_times, box_props, widths, heights, formats, retries=3, delay=2):
-    """Send a stream of image results to the gRPC server with retry logic."""
-    
-    # Create a generator to stream multiple requests
-    def request_generator():
-        for image_url, labels, confs, bboxes, pre_time, inf_time, post_time, box_prop, width, height, format in zip(image_urls, labels_list, confs_list, bboxes_list, pre_times, inf_times, post_times, box_props, widths, heights, formats):
-            if task_type == "image_classification":
-                bbox_coords = ["0,0,0,0"] 
-                box_prop = [0]
-            else:
-                bbox_coords = [f"{x1},{y1},{x2},{y2}" for x1, y1, x2, y2 in bboxes]
-            yield model_service_pb2.ResultsRequest(
-                image_url=image_url,
-                class_labels=labels,
-                confidences=confs,
-                batch_id=batch_id,
-                task_type=task_type,
-                bbox_coordinates=bbox_coords,
-                preprocessing_time=pre_time,
-                inference_time=inf_time,
-                postprocessing_time=post_time,
-                box_proportions=box_prop,
-                image_width=width,         
-                image_height=height,         
-                image_format=format  
-            )
-
-    with grpc.insecure_channel("localhost:50051") as channel:
-        stub = model_service_pb2_grpc.ModelServiceStub(channel)
-
-        # Retry logic
-        for attempt in range(retries):
-            try:
-                response_iterator = stub.StoreResults(request_generator())  # Send as a stream
+    handle = image_path if isinstance(image_path, ImageHandle) else ImageHandle(image_path)
+    width, height, image_format = handle.metadata()
 
-                for image_name, response in zip(image_urls, response_iterator):
-                    print(f"Server response for:\n{image_name}\n- {response.message}")
-                return  # Exit the function if everything is successful
+    labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape, task_type = model.process_image(handle)
 
-            except grpc.RpcError as e:
-                print(f"gRPC Error1: {e.code()} - {e.details()}")
+    return labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape, task_type, width, height, image_format
 
-                if e.code() == grpc.StatusCode.UNAVAILABLE:  # Socket closed or server not available
-                    print(f"gRPC Error: Socket closed, retrying in {delay} seconds...")
-                    time.sleep(delay)
-                else:
-                    # If it's not a transient error, re-raise it
-                    raise
+def result_cache_version(model):
+    """
+    Return the weights version a model's results are cached under. Exports only match eager
+    PyTorch within a tolerance, so each backend gets its own cache entries. Quantized results
+    are also tagged with the quantization scheme, so those of the earlier dynamic quantization
+    are not served as static INT8 results.
+    """
+    version = f"{model.weights_version}:{model.backend}"
+    return f"{version}:{QUANTIZATION_SCHEME}" if model.quantized else version
 
-            except Exception as e:
-                print(f"Unexpected error while sending results: {str(e)}")
-                break  # Exit the loop on unexpected error
+def cached_result(cached, task_type):
+    """
+    Build an image's model result tuple from its result cache entry.
+    No model time was spent on it, so its time lists are empty and the batch's timing metrics leave it out.
+    """
+    return (
+        cached['labels'], cached['confidences'], cached['bboxes'], [], [], [],
+        cached['box_proportions'], tuple(cached['orig_shape']), task_type
+    )
+
+def model_time(times):
+    """Return an image's time for one model step in ms, or 0 for a cached result, which has no times."""
+    return times[0] if times else 0.0
+
+def build_results_request(image_url, labels, confs, bboxes, batch_id, task_type, pre_time, inf_time, post_time, box_prop, width, height, format):
+    """Build the ResultsRequest streamed to the gRPC server for a single image."""
+    if task_type == "image_classification":
+        bbox_coords = ["0,0,0,0"] 
+        box_prop = [0]
+    else:
+        bbox_coords = [f"{x1},{y1},{x2},{y2}" for x1, y1, x2, y2 in bboxes]
+    return model_service_pb2.ResultsRequest(
+        image_url=image_url,
+        class_labels=labels,
+        confidences=confs,
+        batch_id=batch_id,
+        task_type=task_type,
+        bbox_coordinates=bbox_coords,
+        preprocessing_time=pre_time,
+        inference_time=inf_time,
+        postprocessing_time=post_time,
+        box_proportions=box_prop,
+        image_width=width,         
+        image_height=height,         
+        image_format=format  
+    )
 
-        print("Max retries reached, operation failed.")
+def send_results_to_server(image_urls, labels_list, confs_list, bboxes_list, batch_id, task_type, pre_times, inf_times, post_times, box_props, widths, heights, formats, retries=3, delay=2):
+    """Send already collected image results to the gRPC server over a single ResultStream."""
+    with ResultStream(retries=retries, delay=delay) as results_stream:
+        for image_url, labels, confs, bboxes, pre_time, inf_time, post_time, box_prop, width, height, format in zip(image_urls, labels_list, confs_list, bboxes_list, pre_times, inf_times, post_times, box_props, widths, heights, formats):
+            results_stream.send(build_results_request(
+                image_url, labels, confs, bboxes, batch_id, task_type,
+                pre_time, inf_time, post_time, box_prop, width, height, format
+            ))
 
-def send_metrics_to_server(metrics, batch_id):
-    """Send computed metrics to the gRPC server."""
-    with grpc.insecure_channel("localhost:50051") as channel:
+def send_metrics_to_server(metrics, batch_id, target="localhost:50051", sketches=None):
+    """
+    Send computed metrics to the gRPC server.
+    sketches is the to_dict() form of the batch's MetricsAccumulator, stored next to the
+    metrics so that batches can be merged later (see metrics_sketches).
+    """
+    with grpc.insecure_channel(target) as channel:
         stub = model_service_pb2_grpc.ModelServiceStub(channel)
         request = model_service_pb2.MetricsRequest(
             total_images=metrics["Total images"],
@@ -207,151 +207,549 @@ def send_metrics_to_server(metrics, batch_id):
             average_postprocess_time=metrics["Average postprocess time"],
             preprocess_time_distribution=json.dumps(metrics["Preprocess time distribution"]),
             postprocess_time_distribution=json.dumps(metrics["Postprocess time distribution"]),
-            batch_id=batch_id
+            batch_id=batch_id,
+            sketches=json.dumps(sketches) if sketches is not None else ""
         )
         response = stub.StoreMetrics(request)
         print(f"Server response: {response.message}")
 
-def run(model_name, quantize=False, use_kaggle_dataset=False, max_images=25):
-    try:
-        model = ModelFactory.create_model(model_name, quantize)
+def new_metrics_data(streaming=False):
+    """
+    Return empty lists for the per-image values the batch metrics are calculated from or,
+    when streaming, a MetricsAccumulator that summarises them in constant memory.
+    """
+    if streaming:
+        return MetricsAccumulator()
+    return {
+        'pre_times': [],
+        'inf_times': [],
+        'post_times': [],
+        'confs_list': [],
+        'labels_list': [],
+        'detections': [],
+        'label_counts': [],
+        'bboxes_list': [],
+        'box_props': [],
+        'orig_shapes': []
+    }
+
+def add_to_metrics_data(data, result):
+    """Add one image's model result tuple to the values collected for the batch metrics."""
+    if isinstance(data, MetricsAccumulator):
+        data.add(result)
+        return
+    labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape = result[:8]
+    data['pre_times'].extend(pre_times)
+    data['inf_times'].extend(inf_times)
+    data['post_times'].extend(post_times)
+    data['confs_list'].append(confs)
+    data['labels_list'].append(labels)
+    data['detections'].append(len(labels))
+    data['label_counts'].append(Counter(labels))
+    data['bboxes_list'].append(bboxes)
+    data['box_props'].append(proportions)
+    data['orig_shapes'].append(orig_shape)
+
+def count_metrics_images(data):
+    """Return the number of images whose results were added to the metrics values."""
+    return len(data) if isinstance(data, MetricsAccumulator) else len(data['detections'])
+
+def calculate_batch_metrics(data):
+    """Calculate the batch metrics sent to the server from the values collected while processing."""
+    if isinstance(data, MetricsAccumulator):
+        return data.stats()
+    import metrics_engine
+    return metrics_engine.calculate_stats(data)
+
+def metrics_sketches(data):
+    """Return the mergeable sketches of the values collected for the batch metrics, as a JSON-serialisable dict."""
+    accumulator = data if isinstance(data, MetricsAccumulator) else MetricsAccumulator.from_metrics_data(data)
+    return accumulator.to_dict()
+
+class ImageProcessor:
+    """
+    Holds the model and the resources shared between batches (uploader, image index,
+    result cache and inference processes), so they are set up once and stay warm
+    for every batch passed to process().
+    """
 
-        if use_kaggle_dataset:
-            # Process Kaggle dataset
-            image_folder = download_and_process_kaggle_dataset()
-            image_extensions = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
-            image_files = [f for f in os.listdir(image_folder) if f.lower().endswith(image_extensions)]
+    def __init__(self, model_name, quantize=False, batch_size=8,
+                 upload_workers=4, decode_workers=2, inference_workers=1, stream_workers=1, queue_size=32, inference_processes=1,
+                 index_path="image_index.sqlite", result_cache_path="result_cache.sqlite", result_cache_size=10000,
+                 inference_server=None, priority="bulk", backend="torch", model=None, uploader=None, timings=None,
+                 streaming_metrics=False):
+        if model is not None:
+            # An already created model, e.g. a stand-in used by the benchmarks
+            self.model = model
+        elif inference_server:
+            # Inference runs in the InferenceService, so torch and the weights are not needed here
+            from models.remote_model import RemoteModel
+            self.model = RemoteModel(inference_server, model_name, priority=priority)
+            inference_processes = 1
         else:
-            # Process unprocessed_images folder as before
-            unprocessed_folder_path = "unprocessed_images"
-            image_extensions = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
-            image_files = [f for f in os.listdir(unprocessed_folder_path) if f.lower().endswith(image_extensions)]
-            image_folder = unprocessed_folder_path
-
-        if not image_files:
-            print("No images found in the unprocessed_images folder.")
-            return
-
-        if max_images is not None:
-            image_files = image_files[:max_images]
-            print(f"Limiting processing to {max_images} images")
-
-        batch_id = str(uuid.uuid4())
-        data = {
-            'image_urls': [],
-            'pre_times': [],
-            'inf_times': [],
-            'post_times': [],
-            'confs_list': [],
-            'labels_list': [],
-            'detections': [],
-            'label_counts': [],
-            'bboxes_list': [],
-            'box_props': [],
-            'orig_shapes': [],
-            'widths': [],  # New field for image widths
-            'heights': [], # New field for image heights
-            'formats': []  # New field for image formats
-        }
+            from models.model_factory import ModelFactory
+            self.model = ModelFactory.create_model(model_name, quantize, backend)
+        self.task_type = self.model.get_task_type()
+
+        # Fork the inference processes before any threads or gRPC channels exist
+        self.worker_pool = None
+        if inference_processes > 1:
+            from worker_pool import InferenceWorkerPool
+            self.worker_pool = InferenceWorkerPool(self.model, inference_processes)
+        self.inference_model = self.worker_pool or self.model
+        self.decode_locally = self.worker_pool is None and not inference_server
+
+        self.batch_size = batch_size
+        self.upload_workers = upload_workers
+        self.decode_workers = decode_workers
+        # Keep one batch in flight per inference process
+        self.inference_workers = max(inference_workers, inference_processes)
+        self.stream_workers = stream_workers
+        self.queue_size = queue_size
+        # Summarise the metrics values in constant memory instead of keeping them per image
+        self.streaming_metrics = streaming_metrics
+
+        self.uploader = uploader or get_uploader(max_concurrency=upload_workers)
+        self.pipeline_stats = {}
+        # Per-image stage timings, in ms; disabled unless a Timings is given
+        self.timings = timings or Timings(enabled=False)
+        self.index = ImageIndex(index_path) if index_path else None
+        self.result_cache = ResultCache(result_cache_path, result_cache_size) if result_cache_path else None
+
+    def process(self, image_items, results_stream, batch_id, on_result=None, data=None, journal=None):
+        """
+        Run a batch of images through the pipeline, streaming each result as soon as it is ready.
+        Args:
+            image_items (iterable): Dicts with an image_name and either an image_path or a handle.
+                With a journal, each item also needs the image_key it is recorded under.
+            results_stream (ResultStream): Open stream the results are sent on.
+            batch_id (str): Batch the results belong to.
+            on_result (callable): Optional callback invoked with each finished item.
+            data (dict or MetricsAccumulator): Metrics values to add to, e.g. those of a resumed batch.
+            journal (BatchJournal): Optional journal recording each result and its acknowledgement.
+        Returns:
+            dict or MetricsAccumulator: The values needed to calculate the batch metrics.
+        """
+        from image_handle import ImageHandle
+
+        model = self.model
+        task_type = self.task_type
+        uploader = self.uploader
+        index = self.index
+        result_cache = self.result_cache
+        timings = self.timings
+
+        # Only the values needed for the batch metrics are kept; results themselves are streamed
+        if data is None:
+            data = new_metrics_data(self.streaming_metrics)
+        data_lock = threading.Lock()
+
+        def upload_stage(item):
+            print(f"Processing image: {item['image_name']}")
+            record = item['timings'] = timings.new_record(image=item['image_name'], batch_id=batch_id)
+            item['started_ns'] = time.perf_counter_ns()
+            with timings.span(record, "upload"):
+                # The handle is read once and shared by hashing, upload, decoding and inference
+                handle = item.get('handle') or ImageHandle(item['image_path'])
+                item['handle'] = handle
+                with timings.span(record, "hash"):
+                    if index is not None and handle.path is not None:
+                        item['image_hash'] = index.get_hash(handle.path, handle)
+                    else:
+                        item['image_hash'] = handle.hash()
+                with timings.span(record, "blob"):
+                    item['image_url'] = upload_to_azure(handle, uploader, index, item['image_hash'])
+            return item
+
+        def decode_stage(item):
+            handle = item['handle']
+            record = item['timings']
+            with timings.span(record, "decode"):
+                with timings.span(record, "metadata"):
+                    item['width'], item['height'], item['format'] = handle.metadata()
+                # Decode here so inference workers only run the model; inference processes and servers decode for themselves
+                if self.decode_locally:
+                    with timings.span(record, "pixels"):
+                        handle.pil_image(getattr(model, "decode_size", None))
+            return item
+
+        def inference_stage(items):
+            with timings.span([item['timings'] for item in items], "inference"):
+                run_inference(items)
+            return items
+
+        def run_inference(items):
+            misses = items
+            if result_cache is not None:
+                misses = []
+                with timings.span([item['timings'] for item in items], "cache"):
+                    for item in items:
+                        cached = result_cache.get(item['image_hash'], model.model_name, result_cache_version(model), model.quantized)
+                        if cached is None:
+                            misses.append(item)
+                        else:
+                            item['result'] = cached_result(cached, task_type)
+
+            if misses:
+                # Run the model once over the whole batch
+                with timings.span([item['timings'] for item in misses], "model"):
+                    batch_results = self.inference_model.process_batch([item['handle'] for item in misses])
+                for item, result in zip(misses, batch_results):
+                    item['result'] = result
+                    # The model's own breakdown of its time, already in ms
+                    for name, times in zip(("preprocess", "forward", "postprocess"), result[3:6]):
+                        timings.add(item['timings'], f"inference/model/{name}", times[0])
+                    if result_cache is not None:
+                        labels, confs, bboxes, _, _, _, proportions, orig_shape, _ = result
+                        result_cache.put(item['image_hash'], model.model_name, result_cache_version(model), model.quantized, {
+                            'labels': labels,
+                            'confidences': confs,
+                            'bboxes': bboxes,
+                            'box_proportions': proportions,
+                            'orig_shape': list(orig_shape)
+                        })
+
+        def finish_record(item):
+            # The stream stage and the server's answer both add to the timing record; the later one finishes it
+            with data_lock:
+                item['unfinished'] -= 1
+                finished = item['unfinished'] == 0
+            if finished:
+                timings.finish(item['timings'])
+
+        def stream_stage(item):
+            labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape, _ = item['result']
+            record = item['timings']
+            image_key = item.get('image_key')
+
+            with timings.span(record, "stream"):
+                if journal is not None:
+                    # Journal the result before sending it, so it survives a crash either way
+                    with timings.span(record, "journal"):
+                        journal.record_result(image_key, {
+                            'image_url': item['image_url'],
+                            'width': item['width'],
+                            'height': item['height'],
+                            'format': item['format'],
+                            'result': [labels, confs, bboxes, pre_times, inf_times, post_times, proportions, list(orig_shape)]
+                        })
+
+                on_ack = None
+                if journal is not None or record is not None:
+                    def on_ack():
+                        if journal is not None:
+                            journal.record_ack(image_key)
+                        # From handing the result to the stream until the server answered, and from upload until then
+                        timings.add(record, "rpc", elapsed_ms(sent_ns))
+                        timings.add(record, "total", elapsed_ms(item['started_ns']))
+                        finish_record(item)
+
+                # Send the result to the server as soon as the image is done
+                item['unfinished'] = 2
+                sent_ns = time.perf_counter_ns()
+                with timings.span(record, "send"):
+                    results_stream.send(build_results_request(
+                        item['image_url'], labels, confs, bboxes, batch_id, task_type,
+                        model_time(pre_times), model_time(inf_times), model_time(post_times), proportions,
+                        item['width'], item['height'], item['format']
+                    ), on_ack)
+
+            timings.add(record, "read", item['handle'].read_ns / NS_PER_MS)
+            finish_record(item)
+
+            with data_lock:
+                add_to_metrics_data(data, item['result'])
+
+            item['handle'].release()
+            if on_result is not None:
+                on_result(item)
+
+        # Upload, decode, inference and result streaming overlap, connected by bounded queues
+        ingest_pipeline = Pipeline([
+            Stage("upload", upload_stage, workers=self.upload_workers, queue_size=self.queue_size),
+            Stage("decode", decode_stage, workers=self.decode_workers, queue_size=self.queue_size),
+            Stage("inference", inference_stage, workers=self.inference_workers, queue_size=self.queue_size, batch_size=self.batch_size),
+            Stage("stream", stream_stage, workers=self.stream_workers, queue_size=self.queue_size),
+        ])
+        ingest_pipeline.run(image_items)
+        ingest_pipeline.print_stats()
+        self.pipeline_stats = ingest_pipeline.stats()
+        return data
+
+    def close(self):
+        if self.timings.enabled:
+            self.timings.print_summary()
+            self.timings.close()
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+        if hasattr(self.model, "close"):
+            self.model.close()
+        if self.index is not None:
+            print(f"Image index: {self.index.hash_hits} hashes reused, {self.index.hash_misses} files hashed")
+            self.index.close()
+        if self.result_cache is not None:
+            print(f"Result cache: {self.result_cache.stats()}")
+            self.result_cache.close()
+
+def run(model_name, quantize=False, use_kaggle_dataset=False, max_images=25, batch_size=8,
+        kaggle_zip=None, sample=False, seed=None, resume=None, journal_dir="journals",
+        folder="unprocessed_images", server="localhost:50051", **processor_options):
+    """
+    Process one batch of images from a folder (unprocessed_images by default) or a Kaggle
+    dataset zip, and send the results and metrics to the ModelService at server.
 
-        # Process each image and accumulate results for streaming
-        for image_name in image_files:
-            image_path = os.path.join(image_folder, image_name)
-            print(f"Processing image: {image_name}")
-
-            image_url = upload_to_azure(image_path)
-
-            # Process the image using YOLO
-            labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape, task_type, width, height, format  = process_image(image_path, model, quantize)
-
-            data['image_urls'].append(image_url)
-            data['pre_times'].extend(pre_times)
-            data['inf_times'].extend(inf_times)
-            data['post_times'].extend(post_times)
-            data['confs_list'].append(confs)
-            data['labels_list'].append(labels)
-            data['detections'].append(len(labels))
-            data['label_counts'].append(Counter(labels))
-            data['bboxes_list'].append(bboxes)
-            data['box_props'].append(proportions)
-            data['orig_shapes'].append(orig_shape)
-            data['widths'].append(width)      # Add image width
-            data['heights'].append(height)    # Add image height
-            data['formats'].append(format)
-
-            if use_kaggle_dataset:
-                os.remove(image_path)
-
-        # After all images are processed, send the results to the server in a stream
-        send_results_to_server(
-            data['image_urls'],  
-            data['labels_list'],  
-            data['confs_list'],  
-            data['bboxes_list'], 
-            batch_id, 
-            task_type,
-            data['pre_times'],
-            data['inf_times'],
-            data['post_times'],
-            data['box_props'],
-            data['widths'],       # Pass image widths
-            data['heights'],     # Pass image heights
-            data['formats']      # Pass image formats
-        )
+    Every batch is journaled in journal_dir. With resume set to the ID of an earlier batch,
+    that batch's journal is replayed: its model and images are reused, results the server
+    never acknowledged are sent again, only the images without a result are processed, and
+    the metrics are calculated over the whole batch.
 
-        if use_kaggle_dataset:
-            shutil.rmtree("kaggle_images")
-            print("Cleaned up Kaggle download folder")
+    Returns a summary with the batch_id, the per-stage pipeline stats and the batch metrics,
+    or None if there was nothing to process or the batch failed.
+    """
+    from zip_source import IMAGE_EXTENSIONS, iter_zip_members, select_zip_images
 
-        print("pre_times:",data['pre_times'])
+    try:
+        if resume:
+            journal = BatchJournal.for_batch(resume, journal_dir)
+            if journal.settings is None:
+                print(f"No journal found for batch {resume} in {journal_dir}.")
+                return
+            batch_id = resume
+            settings = journal.settings
+            model_name, quantize = settings['model'], settings['quantize']
+            print(
+                f"Resuming batch {batch_id}: {len(journal.completed)}/{len(journal.images)} images done, "
+                f"{len(journal.unacknowledged())} results to send again"
+            )
+        else:
+            if use_kaggle_dataset or kaggle_zip:
+                # Read the Kaggle dataset straight from its zip file, one member at a time
+                zip_path = os.path.abspath(kaggle_zip or download_kaggle_dataset())
+                images = select_zip_images(zip_path, max_images, sample, seed)
+                if not images:
+                    print(f"No images found in {zip_path}.")
+                    return
+                settings = {'source': 'zip', 'zip_path': zip_path}
+            else:
+                # Process unprocessed_images folder as before
+                unprocessed_folder_path = os.path.abspath(folder)
+                images = [f for f in os.listdir(unprocessed_folder_path) if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+                if not images:
+                    print(f"No images found in the {folder} folder.")
+                    return
+
+                if max_images is not None:
+                    images = images[:max_images]
+                settings = {'source': 'folder', 'folder': unprocessed_folder_path}
+
+            if max_images is not None:
+                print(f"Limiting processing to {max_images} images")
+
+            batch_id = str(uuid.uuid4())
+            settings.update(model=model_name, quantize=quantize)
+            journal = BatchJournal.for_batch(batch_id, journal_dir)
+            journal.start(settings, images)
+            print(f"Processing batch {batch_id}")
+
+        remaining = journal.remaining()
+        if settings['source'] == 'zip':
+            image_items = (
+                {'image_key': member, 'image_name': handle.name, 'handle': handle}
+                for member, handle in iter_zip_members(settings['zip_path'], remaining)
+            )
+        else:
+            image_items = (
+                {'image_key': image_name, 'image_name': image_name, 'image_path': os.path.join(settings['folder'], image_name)}
+                for image_name in remaining
+            )
+
+        # Stop the processor's workers and flush the journal even if the batch fails
+        processor = None
+        try:
+            processor = ImageProcessor(model_name, quantize, batch_size, **processor_options)
+
+            # Results journaled before a crash count towards the metrics of the whole batch
+            data = new_metrics_data(processor.streaming_metrics)
+            for image_key in journal.images:
+                if image_key in journal.results:
+                    add_to_metrics_data(data, journal.results[image_key]['result'])
+
+            with ResultStream(server, max_pending=processor.queue_size) as results_stream:
+                for image_key in journal.unacknowledged():
+                    record = journal.results[image_key]
+                    labels, confs, bboxes, pre_times, inf_times, post_times, proportions, _ = record['result']
+                    results_stream.send(build_results_request(
+                        record['image_url'], labels, confs, bboxes, batch_id, processor.task_type,
+                        model_time(pre_times), model_time(inf_times), model_time(post_times), proportions,
+                        record['width'], record['height'], record['format']
+                    ), lambda image_key=image_key: journal.record_ack(image_key))
+
+                processor.process(image_items, results_stream, batch_id, data=data, journal=journal)
+        finally:
+            if processor is not None:
+                processor.close()
+            journal.close()
 
         # Now, calculate and send the metrics
-        stats = {
-            "Total images": metrics.calculate_total_images(data['image_urls']),
-            "Total time": metrics.calculate_total_time(data['pre_times'], data['inf_times'], data['post_times']),
-            "Total preprocessing time": metrics.calculate_total_preprocessing_time(data['pre_times']),
-            "Total inference time": metrics.calculate_total_inference_time(data['inf_times']),
-            "Total postprocessing time": metrics.calculate_total_postprocessing_time(data['post_times']),
-            "Average preprocess time": metrics.calculate_avg_preprocess_time(data['pre_times']),
-            "Average inference time": metrics.calculate_avg_inference_time(data['inf_times']),
-            "Average postprocess time": metrics.calculate_avg_postprocess_time(data['post_times']),
-            "Average confidence score": metrics.calculate_avg_confidence(data['confs_list']),
-            "Average confidence for different labels": metrics.calculate_label_avg_confidences(data['labels_list'], data['confs_list']),
-            "Confidence distribution": metrics.calculate_confidence_distribution(data['confs_list']),
-            "Detection count distribution": metrics.calculate_detection_distribution(data['detections']),
-            "Category distribution": metrics.calculate_category_distribution(data['label_counts']),
-            "Category percentages": metrics.calculate_category_percentages(metrics.calculate_category_distribution(data['label_counts'])),
-            "Inference time distribution": metrics.calculate_inference_time_distribution(data['inf_times']),
-            "Preprocess time distribution": metrics.calculate_preprocess_time_distribution(data['pre_times']),
-            "Postprocess time distribution": metrics.calculate_postprocess_time_distribution(data['post_times']),
-            "Average box size": metrics.calculate_avg_box_size(data['bboxes_list'], data['orig_shapes']),
-            "Box size distribution": metrics.calculate_box_size_distribution(data['bboxes_list'], data['orig_shapes']),
-            "Average box proportion": metrics.calculate_avg_box_proportion(data['box_props']),
-            "Box proportion distribution": metrics.calculate_box_proportion_distribution(data['box_props'])
-        }
+        stats = calculate_batch_metrics(data)
+        if isinstance(data, MetricsAccumulator):
+            print(f"Time percentiles (ms): {data.percentiles()}")
 
         # Send metrics to the server
-        send_metrics_to_server(stats, batch_id)
+        send_metrics_to_server(stats, batch_id, server, metrics_sketches(data))
+        return {
+            'batch_id': batch_id,
+            'pipeline': processor.pipeline_stats,
+            'timings': processor.timings.snapshot(),
+            'metrics': stats
+        }
 
     except Exception as e:
         print(f"Client error: {e}")
         traceback.print_exc()
 
+def watch(model_name, quantize=False, folder="unprocessed_images", batch_size=8, max_latency=2.0,
+          poll_interval=1.0, include_existing=False, stats_port=None, stats_interval=30.0, server="localhost:50051",
+          **processor_options):
+    """
+    Keep the model loaded and process images as they are added to a folder, until interrupted.
+
+    New images are gathered into micro-batches of up to batch_size images, and a batch is
+    started at the latest max_latency seconds after its first image was found. Each
+    micro-batch gets its own batch_id and metrics. Throughput and per-image latency (from
+    the moment an image is found until its result is sent) are logged every stats_interval
+    seconds and, when stats_port is given, served as JSON at http://127.0.0.1:<port>/stats.
+    """
+    from folder_watcher import FolderWatcher
+    from throughput_stats import ThroughputStats, start_stats_server
+
+    # Load the model and fork any inference processes before the watcher and server threads start
+    processor = ImageProcessor(model_name, quantize, batch_size, **processor_options)
+    stats = ThroughputStats()
+    stats_server = start_stats_server(stats.snapshot, stats_port) if stats_port is not None else None
+    watcher = FolderWatcher(folder, poll_interval=poll_interval, include_existing=include_existing).start()
+    results_stream = None
+
+    def on_result(item):
+        stats.record(time.monotonic() - item['detected_at'])
+
+    try:
+        last_report = time.monotonic()
+        while True:
+            found = collect_batch(watcher.queue, batch_size, max_latency, timeout=stats_interval)
+
+            if found:
+                # Reopen the result stream if the server was lost after the last batch
+                if results_stream is None or results_stream.failed:
+                    if results_stream is not None:
+                        results_stream.close()
+                    results_stream = ResultStream(server, max_pending=processor.queue_size)
+                    results_stream.start()
+
+                batch_id = str(uuid.uuid4())
+                image_items = [
+                    {'image_name': os.path.basename(path), 'image_path': path, 'detected_at': detected_at}
+                    for path, detected_at in found
+                ]
+                try:
+                    data = processor.process(image_items, results_stream, batch_id, on_result)
+                    if count_metrics_images(data):
+                        send_metrics_to_server(calculate_batch_metrics(data), batch_id, server, metrics_sketches(data))
+                except Exception as e:
+                    print(f"Client error: {e}")
+                    traceback.print_exc()
+
+            if time.monotonic() - last_report >= stats_interval:
+                print(f"Throughput stats: {stats.snapshot()}")
+                last_report = time.monotonic()
+
+    except KeyboardInterrupt:
+        print("Stopping watch mode")
+    finally:
+        watcher.stop()
+        if results_stream is not None:
+            results_stream.close()
+        if stats_server is not None:
+            stats_server.shutdown()
+        processor.close()
+        print(f"Throughput stats: {stats.snapshot()}")
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Run the model client.")
     parser.add_argument("--model", type=str, choices=["yolo", "efficientnet"], default="yolo", help="Select the model to use.")
     parser.add_argument("--quantize", action="store_true", help="Quantize the model for lower energy consumption.")
+    parser.add_argument("--backend", type=str, choices=["torch", "onnx", "torchscript"], default="torch", help="Run the model eagerly in PyTorch, or through a verified ONNX Runtime or TorchScript export.")
     parser.add_argument("--kaggle", action="store_true", help="Process images from Kaggle dataset instead of unprocessed_images folder.")
     parser.add_argument("--max-images", type=int, default=25, help="Maximum number of images to process from the dataset.")
+    parser.add_argument("--kaggle-zip", type=str, default=None, help="Read images from a local dataset zip file instead of downloading from Kaggle.")
+    parser.add_argument("--sample", action="store_true", help="Pick --max-images images at random from the dataset zip instead of the first ones.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for --sample.")
+    parser.add_argument("--batch-size", type=int, default=8, help="Number of images passed to the model in a single forward pass.")
+    parser.add_argument("--upload-workers", type=int, default=4, help="Number of threads hashing and uploading images, also the size of the upload connection pool.")
+    parser.add_argument("--decode-workers", type=int, default=2, help="Number of threads reading image metadata and decoding images.")
+    parser.add_argument("--inference-workers", type=int, default=1, help="Number of threads running model inference.")
+    parser.add_argument("--inference-processes", type=int, default=1, help="Number of processes running inference in parallel, sharing one copy of the model weights.")
+    parser.add_argument("--stream-workers", type=int, default=1, help="Number of threads streaming results to the server.")
+    parser.add_argument("--queue-size", type=int, default=32, help="Capacity of the queue in front of each pipeline stage.")
+    parser.add_argument("--index-path", type=str, default="image_index.sqlite", help="SQLite file caching image hashes and upload state between runs.")
+    parser.add_argument("--no-index", action="store_true", help="Hash and upload every image without consulting the local index.")
+    parser.add_argument("--result-cache-path", type=str, default="result_cache.sqlite", help="SQLite file caching model results for duplicate images.")
+    parser.add_argument("--result-cache-size", type=int, default=10000, help="Maximum number of cached results before least recently used ones are evicted.")
+    parser.add_argument("--no-result-cache", action="store_true", help="Run the model on every image, even duplicates.")
+    parser.add_argument("--inference-server", type=str, default=None, metavar="HOST:PORT", help="Run inference in an InferenceService (e.g. localhost:50053) instead of loading the model locally.")
+    parser.add_argument("--priority", type=str, choices=["interactive", "bulk", "backfill"], default="bulk", help="Priority class of this client's requests to the inference server.")
+    parser.add_argument("--resume", type=str, default=None, metavar="BATCH_ID", help="Resume an interrupted batch from its journal, processing only the images it has no result for.")
+    parser.add_argument("--timings", type=str, default=None, metavar="PATH", help="Time every stage of every image in ms: write per-image records to PATH (JSON lines) and histograms to PATH with a .histograms.json suffix.")
+    parser.add_argument("--streaming-metrics", action="store_true", help="Calculate the batch metrics from constant-memory summaries instead of every image's values, for very large batches. Distributions with bins from the batch min and max become approximate.")
+    parser.add_argument("--journal-dir", type=str, default="journals", help="Folder holding the journal of each batch.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and process images as they are added to the unprocessed_images folder.")
+    parser.add_argument("--max-latency", type=float, default=2.0, help="In watch mode, seconds a new image may wait for its micro-batch to fill up.")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="In watch mode, seconds between folder scans when filesystem events are unavailable.")
+    parser.add_argument("--include-existing", action="store_true", help="In watch mode, also process images already in the folder at startup.")
+    parser.add_argument("--stats-port", type=int, default=None, help="In watch mode, serve throughput and latency stats as JSON on this port.")
+    parser.add_argument("--stats-interval", type=float, default=30.0, help="In watch mode, seconds between throughput stats log lines.")
     args = parser.parse_args()
 
-    # Configure Kaggle API
-    if args.kaggle:
-        # Make sure kaggle.json is in the right location (~/.kaggle/kaggle.json)
-        from kaggle.api.kaggle_api_extended import KaggleApi
-        api = KaggleApi()
-        api.authenticate()
-
-    run(args.model, args.quantize, args.kaggle, args.max_images)
\ No newline at end of file
+    processor_options = dict(
+        upload_workers=args.upload_workers,
+        decode_workers=args.decode_workers,
+        inference_workers=args.inference_workers,
+        stream_workers=args.stream_workers,
+        queue_size=args.queue_size,
+        inference_processes=args.inference_processes,
+        index_path=None if args.no_index else args.index_path,
+        result_cache_path=None if args.no_result_cache else args.result_cache_path,
+        result_cache_size=args.result_cache_size,
+        inference_server=args.inference_server,
+        priority=args.priority,
+        backend=args.backend,
+        streaming_metrics=args.streaming_metrics,
+        timings=Timings(
+            records_path=args.timings, histograms_path=f"{os.path.splitext(args.timings)[0]}.histograms.json"
+        ) if args.timings else None
+    )
+
+    if args.watch:
+        watch(
+            args.model, args.quantize,
+            batch_size=args.batch_size,
+            max_latency=args.max_latency,
+            poll_interval=args.poll_interval,
+            include_existing=args.include_existing,
+            stats_port=args.stats_port,
+            stats_interval=args.stats_interval,
+            **processor_options
+        )
+    else:
+        run(
+            args.model, args.quantize, args.kaggle, args.max_images, args.batch_size,
+            kaggle_zip=args.kaggle_zip,
+            sample=args.sample,
+            seed=args.seed,
+            resume=args.resume,
+            journal_dir=args.journal_dir,
+            **processor_options
+        )
@@ -5,14 +5,15 @@ import model_service_pb2_grpc
 import neo4j_service_pb2
 import neo4j_service_pb2_grpc
 import logging
+import queue
+import threading
 import requests
 import uuid
 from azure.cosmos import CosmosClient
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from azure.identity import ClientSecretCredential
-from azure.keyvault.secrets import SecretClient
+from keyvault_utils import get_secrets
 from datetime import datetime
 
 env_path = Path("..") / ".env"  # Go up one level to the root directory
@@ -20,31 +21,27 @@ load_dotenv(dotenv_path=env_path)
 
 
 class ModelService(model_service_pb2_grpc.ModelServiceServicer):
-    def __init__(self):
+    def __init__(self, neo4j_target="localhost:50052", cosmos_container=None):
+        """
+        Args:
+            neo4j_target (str): Address of the Neo4jService.
+            cosmos_container: Container client to store metrics in. By default it is the
+                Cosmos DB container named by the COSMOS-* secrets; benchmarks pass a stand-in.
+        """
         # Initialize the Neo4j Service client
-        self.neo4j_channel = grpc.insecure_channel("localhost:50052")
+        self.neo4j_channel = grpc.insecure_channel(neo4j_target)
         self.neo4j_stub = neo4j_service_pb2_grpc.Neo4jServiceStub(
             self.neo4j_channel)
 
-        TENANT_ID = os.getenv("AZURE_TENANT_ID")
-        CLIENT_ID = os.getenv("AZURE_CLIENT_ID")
-        CLIENT_SECRET = os.getenv("AZURE_CLIENT_SECRET")
-
-        if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET]):
-            raise ValueError("Missing one or more required environment variables: AZURE_TENANT_ID, AZURE_CLIENT_ID, AZURE_CLIENT_SECRET")
+        if cosmos_container is not None:
+            self.cosmos_container = cosmos_container
+            return
 
-        KEY_VAULT_URL = "https://sweng25group06keyvault.vault.azure.net/"
-        credential = ClientSecretCredential(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
-        secret_client = SecretClient(vault_url=KEY_VAULT_URL, credential=credential)
-
-        secret = secret_client.get_secret("COSMOS-ENDPOINT")
-        COSMOS_ENDPOINT = secret.value
-        secret = secret_client.get_secret("COSMOS-KEY")
-        COSMOS_KEY = secret.value
-        secret = secret_client.get_secret("COSMOS-DATABASE-NAME")
-        DATABASE_NAME = secret.value
-        secret = secret_client.get_secret("COSMOS-CONTAINER-NAME")
-        CONTAINER_NAME = secret.value
+        secrets = get_secrets(["COSMOS-ENDPOINT", "COSMOS-KEY", "COSMOS-DATABASE-NAME", "COSMOS-CONTAINER-NAME"])
+        COSMOS_ENDPOINT = secrets["COSMOS-ENDPOINT"]
+        COSMOS_KEY = secrets["COSMOS-KEY"]
+        DATABASE_NAME = secrets["COSMOS-DATABASE-NAME"]
+        CONTAINER_NAME = secrets["COSMOS-CONTAINER-NAME"]
 
         if not all([COSMOS_ENDPOINT, COSMOS_KEY, DATABASE_NAME, CONTAINER_NAME]):
             raise ValueError("Missing one or more required environment variables.")
@@ -63,50 +60,41 @@ class ModelService(model_service_pb2_grpc.ModelServiceServicer):
             raise
 
     def StoreResults(self, request_iterator, context):
-        """Handles a stream of classification results, stores them, and streams responses."""
-        try:
-            for request in request_iterator:
-                print("Received image and results from client.")
-
-                # Log class labels and confidences
-                for label, confidence in zip(request.class_labels, request.confidences):
-                    print(f"Class: {label}, Confidence: {confidence}")
-
-                # Process results, skipping image download
-                image_url = request.image_url
-                print(f"Processing metadata for image with URL: {image_url}")
+        """
+        Handles a stream of classification results, stores them, and streams responses.
+
+        All results of the client stream go to Neo4j over one StoreImageResults stream, one
+        message per image with all its detections. Results are read and forwarded to Neo4j on
+        one background thread and written to Cosmos DB on another, so the next image is sent
+        to both stores while the previous one is still being written, and each response is
+        streamed back as soon as both stores have answered for its image. Once the handler
+        exits, e.g. after a Neo4j error, the Neo4j stream is cancelled and both threads stop.
+        """
+        neo4j_requests = queue.Queue()
+        cosmos_requests = queue.Queue()
+        # Cosmos DB success of every image sent to Neo4j, in order
+        cosmos_results = queue.Queue()
+        errors = []
+        stopped = threading.Event()
+
+        def forward_results():
+            try:
+                for request in request_iterator:
+                    if stopped.is_set():
+                        break
+                    print("Received image and results from client.")
+
+                    # Log class labels and confidences
+                    for label, confidence in zip(request.class_labels, request.confidences):
+                        print(f"Class: {label}, Confidence: {confidence}")
+
+                    # Process results, skipping image download
+                    print(f"Processing metadata for image with URL: {request.image_url}")
 
-                success = True
-                try:
                     if not (len(request.class_labels) == len(request.confidences) == len(request.bbox_coordinates)):
                         raise ValueError("Mismatched list lengths in request.")
 
-                    for label, confidence, bbox in zip(request.class_labels, request.confidences, request.bbox_coordinates):
-                        neo4j_request = neo4j_service_pb2.ClassificationResult(
-                            class_label=label,
-                            confidence=confidence,
-                            image_url=image_url,
-                            batch_id=request.batch_id,
-                            task_type=request.task_type,
-                            bbox_coordinates=bbox,
-                            image_width=request.image_width,  
-                            image_height=request.image_height,  
-                            image_format=request.image_format  
-                        )
-
-                        try:
-                            neo4j_response = self.neo4j_stub.StoreResult(
-                                iter([neo4j_request]))
-                            for res in neo4j_response:
-                                if not res.success:
-                                    print("Neo4j StoreResult failed")
-                                    success = False
-                        except grpc.RpcError as e:
-                            print(
-                                f"Neo4j gRPC Error: {e.code()} - {e.details()}")
-                            context.set_code(e.code())
-                            context.set_details(e.details())
-                            return  # Stop processing this request
+                    neo4j_requests.put(self.build_image_results(request))
 
                     metrics_data = {
                         "image_url": request.image_url,
@@ -119,20 +107,58 @@ class ModelService(model_service_pb2_grpc.ModelServiceServicer):
                         "bbox_coordinates": list(request.bbox_coordinates),
                         "box_proportions": list(request.box_proportions)
                     }
-
-                    if not self.store_metrics_in_cosmos(metrics_data, request.batch_id, request.task_type):
-                        success = False
-
-                except Exception as e:
-                    print(f"Unexpected error when processing request: {e}")
-                    context.set_code(grpc.StatusCode.INTERNAL)
-                    context.set_details(str(e))
-                    return
-
-                yield model_service_pb2.ResultsResponse(
-                    success=success,
-                    message="Results stored successfully." if success else "Some issues encountered."
-                )
+                    cosmos_requests.put((metrics_data, request.batch_id, request.task_type))
+
+            except Exception as e:
+                print(f"Unexpected error when processing request: {e}")
+                errors.append(e)
+            finally:
+                # Ends the Neo4j stream once it has answered every image sent so far, and the
+                # responses before an image whose Cosmos DB write failed
+                neo4j_requests.put(None)
+                cosmos_requests.put(None)
+
+        def store_in_cosmos():
+            try:
+                for metrics_data, batch_id, task_type in iter(cosmos_requests.get, None):
+                    if stopped.is_set():
+                        break
+                    cosmos_results.put(self.store_metrics_in_cosmos(metrics_data, batch_id, task_type))
+            except Exception as e:
+                print(f"Unexpected error when storing results in Cosmos DB: {e}")
+                errors.append(e)
+            finally:
+                cosmos_results.put(None)
+
+        neo4j_responses = None
+        try:
+            neo4j_responses = self.neo4j_stub.StoreImageResults(iter(neo4j_requests.get, None))
+            threading.Thread(target=forward_results, name="store-results", daemon=True).start()
+            threading.Thread(target=store_in_cosmos, name="store-results-cosmos", daemon=True).start()
+
+            try:
+                for neo4j_response in neo4j_responses:
+                    if not neo4j_response.success:
+                        print("Neo4j StoreImageResults failed")
+                    # Waits for the Cosmos DB write of the same image
+                    cosmos_success = cosmos_results.get()
+                    if cosmos_success is None:
+                        break
+                    success = neo4j_response.success and cosmos_success
+                    yield model_service_pb2.ResultsResponse(
+                        success=success,
+                        message="Results stored successfully." if success else "Some issues encountered."
+                    )
+            except grpc.RpcError as e:
+                print(
+                    f"Neo4j gRPC Error: {e.code()} - {e.details()}")
+                context.set_code(e.code())
+                context.set_details(e.details())
+                return  # Stop processing the stream
+
+            if errors:
+                context.set_code(grpc.StatusCode.INTERNAL)
+                context.set_details(str(errors[0]))
 
         except Exception as e:
             print(f"Unexpected error in StoreResults: {e}")
@@ -141,8 +167,29 @@ class ModelService(model_service_pb2_grpc.ModelServiceServicer):
             yield model_service_pb2.ResultsResponse(success=False, message=f"Server error: {str(e)}")
 
         finally:
+            # Nothing more is read from the client or sent to either store once the handler has exited
+            stopped.set()
+            neo4j_requests.put(None)
+            if neo4j_responses is not None:
+                neo4j_responses.cancel()
             print("StoreResults iterator fully consumed.")
 
+    @staticmethod
+    def build_image_results(request):
+        """Build the ImageResults message sent to the Neo4jService for one ResultsRequest."""
+        return neo4j_service_pb2.ImageResults(
+            image_url=request.image_url,
+            batch_id=request.batch_id,
+            task_type=request.task_type,
+            image_width=request.image_width,
+            image_height=request.image_height,
+            image_format=request.image_format,
+            detections=[
+                neo4j_service_pb2.Detection(class_label=label, confidence=confidence, bbox_coordinates=bbox)
+                for label, confidence, bbox in zip(request.class_labels, request.confidences, request.bbox_coordinates)
+            ]
+        )
+
     def StoreMetrics(self, request, context):
         try:
             print("Received metrics from client.")
@@ -168,7 +215,8 @@ class ModelService(model_service_pb2_grpc.ModelServiceServicer):
                 average_postprocess_time=request.average_postprocess_time,
                 preprocess_time_distribution=request.preprocess_time_distribution,
                 postprocess_time_distribution=request.postprocess_time_distribution,
-                batch_id=request.batch_id
+                batch_id=request.batch_id,
+                sketches=request.sketches
             )
             neo4j_response = self.neo4j_stub.StoreMetrics(
                 neo4j_metrics_request)
@@ -1,6 +1,19 @@
 from abc import ABC, abstractmethod
+import io
+import os
+import numpy as np
+from PIL import Image
 
 class BaseModel(ABC):
+    # Identify the weights behind a result, e.g. for reusing results of duplicate images
+    model_name = None
+    weights_version = None
+    quantized = False
+    backend = "torch"
+    # (width, height) the model needs its images decoded at least at, so JPEGs can be
+    # decoded at a reduced size (see ImageHandle.pil_image); None for full resolution
+    decode_size = None
+
     @abstractmethod
     def get_task_type(self):
         """Return the task type (e.g., object_detection, image_classification)."""
@@ -8,9 +21,42 @@ class BaseModel(ABC):
 
     @abstractmethod
     def process_image(self, image_path):
-        """Process an image and return results."""
+        """
+        Process an image and return results.
+        The image may be a file path or an in-memory image accepted by load_image.
+        Preprocessing, inference and postprocessing times are in milliseconds.
+        """
         pass
 
+    def process_batch(self, image_paths):
+        """
+        Process a list of images and return one result tuple per image, in input order.
+        Each tuple has the same shape as the one returned by process_image, with the
+        timings (in milliseconds) attributed to that image. Models that can stack inputs into a single
+        forward pass should override this; the default falls back to one call per image.
+        """
+        return [self.process_image(image_path) for image_path in image_paths]
+
+    @staticmethod
+    def load_image(image):
+        """
+        Return an RGB PIL image for any supported input: a file path, an ImageHandle (or any
+        object with a pil_image() method), a PIL image, an RGB numpy array or encoded bytes.
+        """
+        if isinstance(image, (str, os.PathLike)):
+            with Image.open(image) as img:
+                return img.convert("RGB")
+        if hasattr(image, "pil_image"):
+            return image.pil_image()
+        if isinstance(image, Image.Image):
+            return image if image.mode == "RGB" else image.convert("RGB")
+        if isinstance(image, np.ndarray):
+            return Image.fromarray(image).convert("RGB")
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            with Image.open(io.BytesIO(image)) as img:
+                return img.convert("RGB")
+        raise TypeError(f"Unsupported image input: {type(image).__name__}")
+
     def quantize_model(self):
         """Quantize the model if supported."""
-        raise NotImplementedError("Quantization not supported for this model.")
\ No newline at end of file
+        raise NotImplementedError("Quantization not supported for this model.")
@@ -1,70 +1,197 @@
 import torch
+import efficientnet_pytorch
 from efficientnet_pytorch import EfficientNet
-from torchvision import transforms
-from PIL import Image
 from .base_model import BaseModel
+from .preprocessing import Preprocessor
+from .export_utils import (
+    INT8_CONF_TOLERANCE, artifact_path, calibration_images, check_backend, compare_outputs, compare_results, onnx_session,
+    quantize_onnx_static, verification_images
+)
+import hashlib
 import os
 import json
 import torch
 import time
-from torch.quantization import quantize_dynamic
+from timing import elapsed_ms
 
 class EfficientNetClassifier(BaseModel):
-    def __init__(self):
-        self.model = EfficientNet.from_pretrained('efficientnet-b0')
+    def __init__(self, backend="torch"):
+        check_backend(backend)
+        self.model_name = 'efficientnet-b0'
+        self.model = EfficientNet.from_pretrained(self.model_name)
         self.model.eval()
         self.task_type = "image_classification"
+        # Pretrained weights are pinned by the efficientnet_pytorch release
+        self.weights_version = efficientnet_pytorch.__version__
 
-        self.preprocess = transforms.Compose([
-            transforms.Resize(224),
-            transforms.CenterCrop(224),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-        ])
+        # Resize(224), CenterCrop(224), ToTensor and ImageNet Normalize, batched over reduced JPEG decodes
+        self.preprocessor = Preprocessor(224, mode="center_crop")
+        self.decode_size = self.preprocessor.draft_size
 
         current_dir = os.path.dirname(os.path.abspath(__file__)) 
         json_path = os.path.join(current_dir, "imagenet_class_index.json")
         with open(json_path, "r") as f:
             self.label_map = json.load(f)
 
+        self.session = None
+        self._weights_hash = None
+        if backend != "torch":
+            self._use_backend(backend)
+
+    @staticmethod
+    def _hash_state_dict(model):
+        """Identify the weights by the hash of every tensor in the state dict."""
+        hash_func = hashlib.sha256()
+        for name, tensor in model.state_dict().items():
+            hash_func.update(name.encode("utf-8"))
+            hash_func.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+        return hash_func.hexdigest()[:16]
+
+    def _artifact_path(self, backend, variant=""):
+        # Hashed once, while the eager model is still loaded
+        if self._weights_hash is None:
+            self._weights_hash = self._hash_state_dict(self.model)
+        suffix = ".onnx" if backend == "onnx" else ".pt"
+        return artifact_path(self.model_name, self._weights_hash, backend, suffix, variant)
+
+    def _exported(self, backend):
+        """
+        Return the path of the ONNX or TorchScript export of the model, exporting it on first use.
+        The export is cached by the weights hash (and the torch version for TorchScript),
+        and only cached once its logits on the verification images match the eager model.
+        """
+        path = self._artifact_path(backend, "" if backend == "onnx" else f"torch{torch.__version__}")
+        if not os.path.exists(path):
+            self._export(backend, path)
+        return path
+
+    def _use_backend(self, backend):
+        """Run inference through the exported ONNX (ONNX Runtime) or TorchScript model."""
+        path = self._exported(backend)
+        if backend == "onnx":
+            self.session = onnx_session(path)
+            self.model = None
+        else:
+            self.model = torch.jit.optimize_for_inference(torch.jit.load(path))
+        self.backend = backend
+        print(f"Using {backend} export of {self.model_name}: {path}")
+
+    def _export(self, backend, path):
+        print(f"Exporting {self.model_name} to {backend}...")
+        # The memory efficient swish is a custom autograd function that cannot be exported
+        self.model.set_swish(memory_efficient=False)
+        batch = torch.from_numpy(self.preprocessor(verification_images())[0])
+        with torch.no_grad():
+            reference = self.model(batch).numpy()
+
+        temp_path = f"{path}.tmp"
+        try:
+            if backend == "onnx":
+                torch.onnx.export(
+                    self.model, batch[:1], temp_path, input_names=["input"], output_names=["logits"],
+                    dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}}, opset_version=17
+                )
+                candidate = onnx_session(temp_path).run(None, {"input": batch.numpy()})[0]
+            else:
+                with torch.no_grad():
+                    traced = torch.jit.freeze(torch.jit.trace(self.model, batch[:1]))
+                    candidate = traced(batch).numpy()
+                traced.save(temp_path)
+
+            # Exported with a batch of one and checked with the whole batch, so this also covers batching
+            compare_outputs(reference, candidate)
+            os.replace(temp_path, path)
+        except BaseException:
+            # Whether it mismatched or failed to export or run, the unverified export is not kept
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _classify(self, session, images):
+        """Return the top label, confidence and (empty) box of each image from an ONNX Runtime session."""
+        logits = torch.from_numpy(session.run(None, {"input": self.preprocessor(images)[0]})[0])
+        confidences, class_ids = torch.max(torch.nn.functional.softmax(logits, dim=1), 1)
+        return [
+            ([self.label_map[str(class_id.item())][1]], [confidence.item()], [""])
+            for confidence, class_id in zip(confidences, class_ids)
+        ]
+
+    def _forward(self, input_batch):
+        """Run a stacked input batch through the model and return the logits."""
+        if self.session is not None:
+            return torch.from_numpy(self.session.run(None, {"input": input_batch.numpy()})[0])
+        with torch.no_grad():
+            return self.model(input_batch)
+
     def get_task_type(self):
         return self.task_type
 
     def process_image(self, image_path):
         """Classify an image and return the top label and confidence."""
-        image = Image.open(image_path).convert("RGB")
-        orig_shape = image.size
+        return self.process_batch([image_path])[0]
 
-        start_preprocess = time.time()
-        input_tensor = self.preprocess(image)
-        input_batch = input_tensor.unsqueeze(0)
-        preprocess_time = time.time() - start_preprocess 
+    def process_batch(self, image_paths):
+        """Classify a list of images with one stacked forward pass and return one result tuple per image."""
+        if not image_paths:
+            return []
 
-        start_inference = time.time()
-        with torch.no_grad():
-            output = self.model(input_batch)
-        inference_time = time.time() - start_inference
-
-        start_postprocess = time.time()
-        probabilities = torch.nn.functional.softmax(output[0], dim=0)
-        confidence, class_id = torch.max(probabilities, 0)
-        postprocess_time = time.time() - start_postprocess
-
-        class_label = self.label_map[str(class_id.item())][1]
-
-        return (
-        [class_label],              # labels (human-readable)
-        [confidence.item()],         # confidences
-        [""],                          # bboxes (empty for classification)
-        [preprocess_time],           # preprocess_times
-        [inference_time],            # inference_times
-        [postprocess_time],          # postprocess_times
-        [""],
-        orig_shape,
-        self.get_task_type()         # task_type
-    )
-
-    def quantize_model(self):
-        """Quantize the EfficientNet model."""
-        print("Quantizing EfficientNet model...")
-        self.model = quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
\ No newline at end of file
+        # Decoding is part of preprocessing, since it is done at a reduced size for the model input
+        batch, orig_shapes, preprocess_times = self.preprocessor(image_paths)
+        input_batch = torch.from_numpy(batch)
+
+        start_inference = time.perf_counter_ns()
+        output = self._forward(input_batch)
+        # One forward pass serves the whole batch, so each image gets an equal share of it
+        inference_time = elapsed_ms(start_inference) / len(image_paths)
+
+        start_postprocess = time.perf_counter_ns()
+        probabilities = torch.nn.functional.softmax(output, dim=1)
+        confidences, class_ids = torch.max(probabilities, 1)
+        postprocess_time = elapsed_ms(start_postprocess) / len(image_paths)
+
+        results = []
+        for orig_shape, preprocess_time, confidence, class_id in zip(orig_shapes, preprocess_times, confidences, class_ids):
+            class_label = self.label_map[str(class_id.item())][1]
+            results.append((
+                [class_label],
+                [confidence.item()],
+                [""],
+                [preprocess_time],
+                [inference_time],
+                [postprocess_time],
+                [""],
+                orig_shape,
+                self.get_task_type()
+            ))
+        return results
+
+    def quantize_model(self, calibration_size=32):
+        """
+        Quantize the EfficientNet model to INT8 with ONNX Runtime static quantization, calibrated
+        on a sample of unprocessed_images. The quantized model is cached next to the other exports,
+        and only cached once its confident labels on the verification images match the FP32 export's.
+        """
+        path = self._artifact_path("onnx", variant="int8")
+        if not os.path.exists(path):
+            print("Quantizing EfficientNet model...")
+            fp32_path = self._exported("onnx")
+            inputs = [self.preprocessor([image])[0] for image in calibration_images(calibration_size)]
+            unverified = self._artifact_path("onnx", variant="int8-unverified")
+            try:
+                quantize_onnx_static(fp32_path, unverified, "input", inputs)
+                images = verification_images()
+                compare_results(
+                    self._classify(onnx_session(fp32_path), images), self._classify(onnx_session(unverified), images),
+                    conf_tolerance=INT8_CONF_TOLERANCE
+                )
+                os.replace(unverified, path)
+            except BaseException:
+                if os.path.exists(unverified):
+                    os.remove(unverified)
+                raise
+
+        self.session = onnx_session(path)
+        self.model = None
+        self.backend = "onnx"
+        self.quantized = True
+        print(f"Using INT8 model of {self.model_name}: {path}")
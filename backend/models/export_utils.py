@@ -0,0 +1,175 @@
+import os
+import random
+import re
+import numpy as np
+from PIL import Image
+
+BACKENDS = ("torch", "onnx", "torchscript")
+EXPORT_DIR = os.getenv("MODEL_EXPORT_DIR", "exported_models")
+UNPROCESSED_IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "unprocessed_images")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
+# An INT8 model is checked against FP32 with compare_results, with looser tolerances than an
+# export, since quantization moves confidences and box edges more than rounding does
+INT8_CONF_TOLERANCE = 0.15
+INT8_BOX_TOLERANCE = 16.0
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported backend: {backend} (expected one of: {', '.join(BACKENDS)})")
+
+
+def artifact_path(model_name, weights_hash, backend, suffix, variant=""):
+    """
+    Return where an exported model is cached. The name includes the hash of the weights
+    it was exported from, so new weights never load a stale export.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    variant = f"-{variant}" if variant else ""
+    return os.path.join(EXPORT_DIR, f"{model_name}-{weights_hash}-{backend}{variant}{suffix}")
+
+
+def verification_images(limit=4):
+    """
+    Return RGB images to compare an export against the eager model: a few of the sample
+    images in unprocessed_images, plus a synthetic gradient so there is always one.
+    """
+    images = []
+    if os.path.isdir(UNPROCESSED_IMAGES):
+        for name in sorted(os.listdir(UNPROCESSED_IMAGES)):
+            if len(images) >= limit:
+                break
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with Image.open(os.path.join(UNPROCESSED_IMAGES, name)) as img:
+                    images.append(img.convert("RGB"))
+
+    gradient = np.zeros((480, 640, 3), dtype=np.uint8)
+    gradient[..., 0] = np.linspace(0, 255, 640, dtype=np.uint8)
+    gradient[..., 1] = np.linspace(0, 255, 480, dtype=np.uint8)[:, None]
+    images.append(Image.fromarray(gradient))
+    return images
+
+
+def calibration_images(limit=32, seed=0):
+    """
+    Return a reproducible random sample of the images in unprocessed_images to calibrate
+    static quantization on. Without any images, the synthetic verification image is used,
+    which gives a poor calibration.
+    """
+    names = []
+    if os.path.isdir(UNPROCESSED_IMAGES):
+        names = sorted(name for name in os.listdir(UNPROCESSED_IMAGES) if name.lower().endswith(IMAGE_EXTENSIONS))
+    if not names:
+        print(f"Warning: no images in {UNPROCESSED_IMAGES} to calibrate quantization on, using a synthetic image")
+        return verification_images(limit=0)
+
+    images = []
+    for name in random.Random(seed).sample(names, min(limit, len(names))):
+        with Image.open(os.path.join(UNPROCESSED_IMAGES, name)) as img:
+            images.append(img.convert("RGB"))
+    return images
+
+
+def compare_outputs(reference, candidate, atol=1e-3, rtol=1e-3):
+    """
+    Check raw model outputs (e.g. logits) of an export against the eager model.
+    Raises ValueError if they differ by more than the tolerance.
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"Exported model output shape {candidate.shape} does not match {reference.shape}")
+    if not np.allclose(candidate, reference, atol=atol, rtol=rtol):
+        max_diff = float(np.max(np.abs(candidate - reference)))
+        raise ValueError(f"Exported model outputs differ from the eager model by up to {max_diff:.6f}")
+
+
+def _detections(result):
+    labels, confs, boxes = result[:3]
+    return [(label, conf, None if box == "" else box) for label, conf, box in zip(labels, confs, boxes)]
+
+
+def _matches(detection, other, conf_tolerance, box_tolerance):
+    label, conf, box = detection
+    other_label, other_conf, other_box = other
+    if label != other_label or abs(conf - other_conf) > conf_tolerance:
+        return False
+    if box is None or other_box is None:
+        return box is None and other_box is None
+    return max(abs(a - b) for a, b in zip(box, other_box)) <= box_tolerance
+
+
+def compare_results(reference, candidate, conf_tolerance=0.05, box_tolerance=4.0, min_confidence=0.5):
+    """
+    Check the result tuples of an exported model against those of the eager model.
+
+    Every detection with at least min_confidence, on either side, needs a counterpart on the
+    other side with the same label, a confidence within conf_tolerance and box coordinates
+    within box_tolerance pixels. Weaker detections are not compared, since those close to
+    the detection threshold may come and go with small numeric differences.
+    Raises ValueError on the first mismatch.
+    """
+    if len(reference) != len(candidate):
+        raise ValueError(f"Exported model returned {len(candidate)} results for {len(reference)} images")
+    for index, (expected, actual) in enumerate(zip(reference, candidate)):
+        for source, target, side in ((expected, actual, "eager"), (actual, expected, "exported")):
+            others = _detections(target)
+            for detection in _detections(source):
+                if detection[1] < min_confidence:
+                    continue
+                if not any(_matches(detection, other, conf_tolerance, box_tolerance) for other in others):
+                    label, conf, _ = detection
+                    raise ValueError(f"Image {index}: {label} ({conf:.2f}) from the {side} model has no match in the other model's results")
+
+
+def onnx_session(path):
+    """Open an ONNX model with ONNX Runtime's full graph optimizations (e.g. operator fusion) on the CPU."""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return onnxruntime.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def last_module_nodes(onnx_path):
+    """
+    Return the names of the nodes in the last module of an ultralytics ONNX export, i.e. the
+    detection head, whose box decoding and concatenated outputs lose too much accuracy in INT8.
+    """
+    import onnx
+
+    nodes = onnx.load(onnx_path).graph.node
+    pattern = re.compile(r"/model\.(\d+)/")
+    indices = [int(match.group(1)) for match in (pattern.search(node.name) for node in nodes) if match]
+    if not indices:
+        return []
+    head = f"/model.{max(indices)}/"
+    return [node.name for node in nodes if head in node.name]
+
+
+def quantize_onnx_static(fp32_path, int8_path, input_name, inputs, nodes_to_exclude=()):
+    """
+    Quantize an ONNX model to INT8 with ONNX Runtime post-training static quantization.
+    Activation ranges are calibrated by running the model on inputs, a list of float32 arrays
+    that are fed to input_name one at a time. Weights are quantized per channel.
+    """
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.inputs = iter(inputs)
+
+        def get_next(self):
+            array = next(self.inputs, None)
+            return None if array is None else {input_name: array}
+
+    temp_path = f"{int8_path}.tmp"
+    quantize_static(
+        fp32_path, temp_path, Reader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        nodes_to_exclude=list(nodes_to_exclude)
+    )
+    os.replace(temp_path, int8_path)
@@ -3,19 +3,23 @@ from .efficientnet_model import EfficientNetClassifier
 
 class ModelFactory:
     @staticmethod
-    def create_model(model_name, quantize=False):
+    def create_model(model_name, quantize=False, backend="torch"):
         """
         Factory method to create and return the selected model.
         Args:
             model_name (str): Name of the model to create (e.g., "yolo", "efficientnet").
-            quantize (bool): Whether to quantize the model.
+            quantize (bool): Whether to run a statically quantized INT8 model through ONNX Runtime.
+            backend (str): Inference backend, "torch" (eager), "onnx" (ONNX Runtime) or "torchscript".
         Returns:
             BaseModel: An instance of the selected model.
         """
+        if quantize and backend == "torchscript":
+            raise ValueError("Quantization runs the model in ONNX Runtime and cannot be combined with the torchscript backend")
+
         if model_name == "yolo":
-            model = YOLOv11("yolo11n.pt")
+            model = YOLOv11("yolo11n.pt", backend=backend)
         elif model_name == "efficientnet":
-            model = EfficientNetClassifier()
+            model = EfficientNetClassifier(backend=backend)
         else:
             raise ValueError(f"Unsupported model: {model_name}")
 
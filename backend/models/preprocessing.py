@@ -0,0 +1,180 @@
+"""
+Batched image preprocessing shared by the models.
+
+Decoding a 12 MP camera JPEG in full only to shrink it to 224x224 or 640x640 wastes most
+of the work, so JPEGs are decoded in draft mode: the decoder scales the DCT blocks down by
+1/2, 1/4 or 1/8, to the smallest size that still covers the model input. Each image is
+then resized and cropped (or letterboxed) to a uint8 array on a thread pool, since PIL
+releases the GIL while decoding and resizing, and the batch is converted to float and
+normalized in one vectorised operation.
+"""
+import io
+import os
+import threading
+import time
+from concurrent import futures
+import numpy as np
+from PIL import Image
+from timing import elapsed_ms
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+# Padding value of ultralytics' letterbox
+LETTERBOX_FILL = 114
+MODES = ("center_crop", "letterbox")
+
+
+def decode(image, draft_size=None):
+    """
+    Decode any input accepted by BaseModel.load_image to RGB.
+    Args:
+        image: A file path, an ImageHandle, a PIL image, an RGB numpy array or encoded bytes.
+        draft_size (tuple): Optional (width, height) to decode JPEGs down to in draft mode.
+    Returns:
+        tuple: The RGB PIL image and the (width, height) of the full-size image.
+    """
+    if hasattr(image, "pil_image"):
+        width, height, _ = image.metadata()
+        return image.pil_image(draft_size), (width, height)
+    if isinstance(image, Image.Image):
+        return (image if image.mode == "RGB" else image.convert("RGB")), image.size
+    if isinstance(image, np.ndarray):
+        rgb = Image.fromarray(image).convert("RGB")
+        return rgb, rgb.size
+    if isinstance(image, (str, os.PathLike)):
+        source = image
+    elif isinstance(image, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(image)
+    else:
+        raise TypeError(f"Unsupported image input: {type(image).__name__}")
+    with Image.open(source) as img:
+        size = img.size
+        if draft_size is not None:
+            # A no-op for formats other than JPEG
+            img.draft("RGB", tuple(draft_size))
+        return img.convert("RGB"), size
+
+
+def center_crop(image, size):
+    """
+    Resize the shorter side of a PIL image to size and crop the center size x size square,
+    like torchvision's Resize(size) followed by CenterCrop(size).
+    """
+    width, height = image.size
+    if width <= height:
+        new_width, new_height = size, int(size * height / width)
+    else:
+        new_width, new_height = int(size * width / height), size
+    if (new_width, new_height) != (width, height):
+        image = image.resize((new_width, new_height), Image.BILINEAR)
+    top = int(round((new_height - size) / 2.0))
+    left = int(round((new_width - size) / 2.0))
+    return np.asarray(image.crop((left, top, left + size, top + size)))
+
+
+def letterbox(image, size):
+    """
+    Resize a PIL image to fit in a size x size square, keeping its aspect ratio, and pad it
+    with gray, like ultralytics' LetterBox.
+    """
+    scale = min(size / image.width, size / image.height)
+    new_width, new_height = round(image.width * scale), round(image.height * scale)
+    if (new_width, new_height) != image.size:
+        image = image.resize((new_width, new_height), Image.BILINEAR)
+    canvas = np.full((size, size, 3), LETTERBOX_FILL, dtype=np.uint8)
+    top = int(round((size - new_height) / 2 - 0.1))
+    left = int(round((size - new_width) / 2 - 0.1))
+    canvas[top:top + new_height, left:left + new_width] = np.asarray(image)
+    return canvas
+
+
+class Preprocessor:
+    """
+    Turns a list of images into a normalized float32 batch of shape (N, 3, size, size).
+
+    Args:
+        size (int): Side of the square model input.
+        mode (str): "center_crop" (resize the shorter side and crop the center) or
+            "letterbox" (fit the whole image and pad it).
+        mean, std (tuple): Per-channel normalization of the [0, 1] pixel values, or None
+            to leave them in [0, 1].
+        workers (int): Threads decoding and resizing the images of a batch.
+        draft (bool): Decode JPEGs at a reduced resolution that still covers the input.
+    """
+
+    def __init__(self, size, mode="center_crop", mean=IMAGENET_MEAN, std=IMAGENET_STD, workers=4, draft=True):
+        if mode not in MODES:
+            raise ValueError(f"Unknown preprocessing mode '{mode}', expected one of {', '.join(MODES)}")
+        self.size = size
+        self.mode = mode
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float32).reshape(1, 3, 1, 1)
+        self.std = None if std is None else np.asarray(std, dtype=np.float32).reshape(1, 3, 1, 1)
+        self.workers = workers
+        # Both sides must cover the input: the shorter one for a crop, the longer one for a letterbox
+        self.draft_size = (size, size) if draft else None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _map(self, func, items):
+        if self.workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with self._lock:
+            # Worker threads do not survive a fork, so a forked inference worker starts its own pool
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="preprocess")
+                self._executor_pid = os.getpid()
+            executor = self._executor
+        return list(executor.map(func, items))
+
+    def decode(self, image):
+        """Return the image decoded to RGB (reduced in draft mode) and its full (width, height)."""
+        return decode(image, self.draft_size)
+
+    def decode_batch(self, images):
+        """
+        Decode a list of images on the thread pool.
+        Returns:
+            list: One (RGB PIL image, full (width, height), decode time in ms) tuple per image.
+        """
+        def decode_one(image):
+            start = time.perf_counter_ns()
+            rgb, size = self.decode(image)
+            return rgb, size, elapsed_ms(start)
+
+        return self._map(decode_one, images)
+
+    def _prepare(self, image):
+        start = time.perf_counter_ns()
+        rgb, size = self.decode(image)
+        pixels = center_crop(rgb, self.size) if self.mode == "center_crop" else letterbox(rgb, self.size)
+        return pixels, size, elapsed_ms(start)
+
+    def __call__(self, images):
+        """
+        Preprocess a list of images into one batch.
+        Returns:
+            tuple: The float32 batch of shape (N, 3, size, size), the full (width, height) of
+            every image and the preprocessing time of every image in ms, including an equal
+            share of the batch normalization.
+        """
+        prepared = self._map(self._prepare, images)
+        if not prepared:
+            return np.empty((0, 3, self.size, self.size), dtype=np.float32), [], []
+
+        start = time.perf_counter_ns()
+        # NHWC uint8 to contiguous NCHW float32 in one copy, then normalized in place
+        batch = np.ascontiguousarray(np.stack([pixels for pixels, _, _ in prepared]).transpose(0, 3, 1, 2), dtype=np.float32)
+        batch /= 255.0
+        if self.mean is not None:
+            batch -= self.mean
+        if self.std is not None:
+            batch /= self.std
+        share = elapsed_ms(start) / len(prepared)
+        return batch, [size for _, size, _ in prepared], [ms + share for _, _, ms in prepared]
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,66 @@
+import grpc
+import inference_service_pb2
+import inference_service_pb2_grpc
+from .base_model import BaseModel
+
+
+class RemoteModel(BaseModel):
+    """
+    A thin client for a model hosted by the InferenceService.
+
+    It returns the same result tuples as the local models, so it can stand in for one
+    anywhere in the client, but it needs neither torch nor the model weights. All images
+    of a batch are sent as concurrent requests, which lets the server batch them with
+    requests from other producers. Requests are sent in the given priority class
+    ("interactive", "bulk" or "backfill").
+    """
+
+    def __init__(self, target="localhost:50053", model="", timeout=60, priority="bulk"):
+        self.priority = inference_service_pb2.Priority.Value(priority.upper())
+        self.channel = grpc.insecure_channel(target)
+        self.stub = inference_service_pb2_grpc.InferenceServiceStub(self.channel)
+        self.timeout = timeout
+
+        info = self.stub.GetModelInfo(inference_service_pb2.ModelInfoRequest(model=model), timeout=timeout)
+        self.model = info.model
+        self.model_name = info.model_name
+        self.weights_version = info.weights_version
+        self.quantized = info.quantized
+        self.backend = info.backend or "torch"
+        self.task_type = info.task_type
+        print(f"Using remote model '{self.model}' ({self.model_name}) at {target}")
+
+    def get_task_type(self):
+        return self.task_type
+
+    def _request(self, image):
+        if isinstance(image, str) and image.startswith(("http://", "https://")):
+            return inference_service_pb2.InferRequest(model=self.model, image_url=image, priority=self.priority)
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                return inference_service_pb2.InferRequest(model=self.model, image_bytes=f.read(), image_name=image, priority=self.priority)
+        # ImageHandles send their already loaded file content
+        return inference_service_pb2.InferRequest(
+            model=self.model, image_bytes=bytes(image.data), image_name=image.name, priority=self.priority
+        )
+
+    @staticmethod
+    def _to_result(response):
+        if not response.success:
+            raise RuntimeError(response.message)
+        bboxes = [[box.x1, box.y1, box.x2, box.y2] for box in response.bboxes]
+        return (
+            list(response.class_labels), list(response.confidences), bboxes,
+            [response.preprocessing_time], [response.inference_time], [response.postprocessing_time],
+            list(response.box_proportions), (response.image_height, response.image_width), response.task_type
+        )
+
+    def process_image(self, image_path):
+        return self._to_result(self.stub.Infer(self._request(image_path), timeout=self.timeout))
+
+    def process_batch(self, image_paths):
+        calls = [self.stub.Infer.future(self._request(image), timeout=self.timeout) for image in image_paths]
+        return [self._to_result(call.result()) for call in calls]
+
+    def close(self):
+        self.channel.close()
@@ -1,36 +1,114 @@
 import torch
 from ultralytics import YOLO
 from .base_model import BaseModel
-import torch
-from torch.quantization import quantize_dynamic
+from .export_utils import (
+    INT8_BOX_TOLERANCE, INT8_CONF_TOLERANCE, artifact_path, calibration_images, check_backend, compare_results,
+    last_module_nodes, quantize_onnx_static, verification_images
+)
+from .preprocessing import Preprocessor
+import hashlib
+import os
 
 class YOLOv11(BaseModel):
-    def __init__(self, model_path):
+    def __init__(self, model_path, backend="torch"):
+        check_backend(backend)
         self.model = YOLO(model_path)
         self.task_type = "object_detection"
+        self.model_name = os.path.splitext(os.path.basename(model_path))[0]
+        self.weights_version = self._hash_weights(self.model.ckpt_path or model_path)
+        # Ultralytics letterboxes to 640 itself; this decodes the images just large enough for
+        # that on a thread pool, and builds the letterboxed calibration inputs for quantization
+        self.preprocessor = Preprocessor(640, mode="letterbox", mean=None, std=None)
+        self.decode_size = self.preprocessor.draft_size
+        if backend != "torch":
+            self._use_backend(backend)
+
+    def _exported(self, backend):
+        """
+        Return the path of the ONNX or TorchScript export of the model, exporting it on first use.
+        The export is cached by the weights hash and only cached once its detections on the
+        verification images match those of the eager model.
+        """
+        path = artifact_path(self.model_name, self.weights_version, backend, ".onnx" if backend == "onnx" else ".torchscript")
+        if not os.path.exists(path):
+            print(f"Exporting {self.model_name} to {backend}...")
+            # ONNX gets a dynamic batch axis so process_batch can stack any number of images
+            exported = self.model.export(format=backend, dynamic=backend == "onnx", simplify=False, verbose=False)
+            images = verification_images()
+            try:
+                compare_results(self._predict(self.model, images), self._predict(YOLO(exported, task="detect"), images))
+                os.replace(exported, path)
+            except BaseException:
+                # Whether it mismatched or failed to load or run, the unverified export is not kept
+                if os.path.exists(exported):
+                    os.remove(exported)
+                raise
+        return path
+
+    def _use_backend(self, backend):
+        """Run inference through the exported ONNX (ONNX Runtime) or TorchScript model."""
+        path = self._exported(backend)
+        self.model = YOLO(path, task="detect")
+        self.backend = backend
+        print(f"Using {backend} export of {self.model_name}: {path}")
+
+    def _predict(self, model, images):
+        return [self._parse_result(result) for result in model(images, batch=len(images), verbose=False)]
+
+    @staticmethod
+    def _hash_weights(weights_path):
+        """Identify the weights by the hash of the checkpoint file."""
+        hash_func = hashlib.sha256()
+        with open(weights_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hash_func.update(chunk)
+        return hash_func.hexdigest()[:16]
 
     def get_task_type(self):
         return self.task_type
 
     def process_image(self, image_path):
         """Process an image using YOLO and return results."""
+        return self.process_batch([image_path])[0]
+
+    def process_batch(self, image_paths):
+        """Run YOLO on a list of images as a single stacked batch and return one result tuple per image."""
+        if not image_paths:
+            return []
+        decoded = self.preprocessor.decode_batch(image_paths)
+        results = self.model([image for image, _, _ in decoded], batch=len(decoded), verbose=False)
+        return [self._parse_result(result, size, decode_time) for result, (_, size, decode_time) in zip(results, decoded)]
+
+    def _parse_result(self, result, full_size=None, decode_time=0.0):
+        """
+        Convert a single ultralytics Results object into the model result tuple.
+        Args:
+            result: The ultralytics Results of one image.
+            full_size (tuple): (width, height) of the full image when it was decoded at a reduced
+                size, so the boxes and shape are scaled back to full-size coordinates.
+            decode_time (float): Time spent decoding the image in ms, counted as preprocessing.
+        """
         preprocess_times = []
         inference_times = []
         postprocess_times = []
 
-        results = self.model(image_path, verbose=False)
-        boxes = results[0].boxes
-        speed_info = results[0].speed
-        orig_shape = results[0].orig_shape
+        boxes = result.boxes
+        # Ultralytics already divides batch timings by the batch size, so these are per image
+        speed_info = result.speed
+        orig_shape = result.orig_shape
 
-        preprocess_times.append(speed_info["preprocess"])
+        preprocess_times.append(speed_info["preprocess"] + decode_time)
         inference_times.append(speed_info["inference"])
         postprocess_times.append(speed_info["postprocess"])
 
         bboxes = boxes.xyxy.tolist() if boxes.xyxy is not None else []
+        if full_size is not None and (full_size[1], full_size[0]) != tuple(orig_shape):
+            scale_x, scale_y = full_size[0] / orig_shape[1], full_size[1] / orig_shape[0]
+            bboxes = [[x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y] for x1, y1, x2, y2 in bboxes]
+            orig_shape = (full_size[1], full_size[0])
         confs = boxes.conf.tolist() if boxes.conf is not None else []
         class_ids = boxes.cls.tolist() if boxes.cls is not None else []
-        labels = [results[0].names[int(cls)] for cls in class_ids] if class_ids else []
+        labels = [result.names[int(cls)] for cls in class_ids] if class_ids else []
 
         width, height = orig_shape[1], orig_shape[0]
         box_proportions = []
@@ -42,7 +120,34 @@ class YOLOv11(BaseModel):
 
         return labels, confs, bboxes, preprocess_times, inference_times, postprocess_times, box_proportions, orig_shape, self.get_task_type()
 
-    def quantize_model(self):
-        """Quantize the YOLO model."""
-        print("Quantizing YOLO model...")
-        self.model = quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
\ No newline at end of file
+    def quantize_model(self, calibration_size=32):
+        """
+        Quantize the YOLO model to INT8 with ONNX Runtime static quantization, calibrated on a
+        sample of unprocessed_images. The convolutions run in INT8 while the detection head
+        stays in float. The quantized model is cached next to the other exports, and only cached
+        once its detections on the verification images match those of the FP32 export.
+        """
+        path = artifact_path(self.model_name, self.weights_version, "onnx", ".onnx", variant="int8")
+        if not os.path.exists(path):
+            print("Quantizing YOLO model...")
+            fp32_path = self._exported("onnx")
+            inputs = [self.preprocessor([image])[0] for image in calibration_images(calibration_size)]
+            unverified = artifact_path(self.model_name, self.weights_version, "onnx", ".onnx", variant="int8-unverified")
+            try:
+                quantize_onnx_static(fp32_path, unverified, "images", inputs, nodes_to_exclude=last_module_nodes(fp32_path))
+                images = verification_images()
+                compare_results(
+                    self._predict(YOLO(fp32_path, task="detect"), images), self._predict(YOLO(unverified, task="detect"), images),
+                    conf_tolerance=INT8_CONF_TOLERANCE, box_tolerance=INT8_BOX_TOLERANCE
+                )
+                os.replace(unverified, path)
+            except BaseException:
+                if os.path.exists(unverified):
+                    os.remove(unverified)
+                raise
+
+        # The quantized model is still loaded through the YOLO wrapper, so results are parsed as before
+        self.model = YOLO(path, task="detect")
+        self.backend = "onnx"
+        self.quantized = True
+        print(f"Using INT8 model of {self.model_name}: {path}")
\ No newline at end of file
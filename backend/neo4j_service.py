@@ -2,103 +2,156 @@ import grpc
 from concurrent import futures
 import neo4j_service_pb2
 import neo4j_service_pb2_grpc
-from neo4j import GraphDatabase
 import uuid
 
 
 class Neo4jService(neo4j_service_pb2_grpc.Neo4jServiceServicer):
-    def __init__(self):
-        # Initializing Neo4j
-        self.driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
+    def __init__(self, driver=None):
+        """
+        Args:
+            driver: Neo4j driver to store results with. By default it connects to the local
+                database; benchmarks pass an in-memory stand-in.
+        """
+        if driver is None:
+            # Only a real database needs the neo4j package
+            from neo4j import GraphDatabase
+
+            # Initializing Neo4j
+            driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
+        self.driver = driver
 
     def StoreResult(self, request_iterator, context):
         """Handles a stream of classification results and stores them in Neo4j."""
         # print("Store result works and I am here in Neo4j")
         try:
             for request in request_iterator:
-                x1, y1, x2, y2 = map(float, request.bbox_coordinates.split(','))
+                detections = self._detection_rows([request])
 
                 with self.driver.session() as session:
-                    # Batch Node
-                    session.run(
-                        "MERGE (b:BatchNode {batch_id: $batch_id})",
-                        batch_id=request.batch_id
-                    )
-
-                    # Image Node with metadata
-                    session.run(
-                        """
-                        MERGE (i:Image {
-                            image_url: $image_url,
-                            width: $width,
-                            height: $height,
-                            format: $format
-                        })
-                        MERGE (b:BatchNode {batch_id: $batch_id})
-                        MERGE (i)-[:BELONGS_TO]->(b)
-                        """,
-                        image_url=request.image_url,
-                        width=request.image_width,  # Add image width
-                        height=request.image_height,  # Add image height
-                        format=request.image_format,  # Add image format
-                        batch_id=request.batch_id
-                    )
-
-                    # Annotation Node
-                    session.run(
-                        """
-                        MATCH (i:Image {image_url: $image_url})
-                        MERGE (i)-[:HAS_ANNOTATION]->(a:Annotation {
-                            task_type: $task_type
-                        })
-                        ON CREATE SET
-                            a.reviewed = false,
-                            a.classified = false,
-                            a.misclassified = false,
-                            a.created_at = datetime()
-                        """,
-                        image_url=request.image_url,
-                        task_type=request.task_type
-                    )
-
-                    # Bounding Box for Object Detection
-                    if request.task_type == "object_detection":
-                        session.run(
-                            """
-                            MATCH (i:Image {image_url: $image_url})
-                            MERGE (bb:BoundingBox {
-                                x1: $x1, y1: $y1, x2: $x2, y2: $y2, confidence: $confidence
-                            })
-                            MERGE (l:Label {name: $class_label})
-                            MERGE (i)-[:HAS_BOUNDING_BOX]->(bb)
-                            MERGE (bb)-[:HAS_LABEL]->(l)
-                            """,
-                            image_url=request.image_url,
-                            x1=x1, y1=y1, x2=x2, y2=y2,
-                            confidence=request.confidence,
-                            class_label=request.class_label
-                        )
-
-                    # Classification Annotation for Image Classification
-                    if request.task_type == "image_classification":
-                        session.run(
-                            """
-                            MATCH (i:Image {image_url: $image_url})
-                            MERGE (ca:ClassificationAnnotation {confidence: $confidence})
-                            MERGE (l:Label {name: $class_label})
-                            MERGE (i)-[:HAS_CLASSIFICATION]->(ca)
-                            MERGE (ca)-[:HAS_LABEL]->(l)
-                            """,
-                            image_url=request.image_url,
-                            confidence=request.confidence,
-                            class_label=request.class_label
-                        )
+                    self._store_image(session, request)
+                    self._store_detections(session, request, detections)
 
                 yield neo4j_service_pb2.StoreResultResponse(success=True)
 
         except Exception as e:
             yield neo4j_service_pb2.StoreResultResponse(success=False)
 
+    def StoreImageResults(self, request_iterator, context):
+        """
+        Handles a stream of images with all their detections, and answers each image once
+        its image, annotation and detections are stored in Neo4j. Like one StoreResult call
+        per detection, an image without detections is answered without storing anything.
+        """
+        for request in request_iterator:
+            try:
+                detections = self._detection_rows(request.detections)
+
+                if not detections:
+                    yield neo4j_service_pb2.StoreResultResponse(success=True)
+                    continue
+
+                with self.driver.session() as session:
+                    self._store_image(session, request)
+                    self._store_detections(session, request, detections)
+                success = True
+            except Exception as e:
+                print(f"Error storing results for {request.image_url}: {e}")
+                success = False
+
+            yield neo4j_service_pb2.StoreResultResponse(success=success)
+
+    def _store_image(self, session, request):
+        """Store the batch, image and annotation nodes of a request for one image."""
+        # Batch Node
+        session.run(
+            "MERGE (b:BatchNode {batch_id: $batch_id})",
+            batch_id=request.batch_id
+        )
+
+        # Image Node with metadata
+        session.run(
+            """
+            MERGE (i:Image {
+                image_url: $image_url,
+                width: $width,
+                height: $height,
+                format: $format
+            })
+            MERGE (b:BatchNode {batch_id: $batch_id})
+            MERGE (i)-[:BELONGS_TO]->(b)
+            """,
+            image_url=request.image_url,
+            width=request.image_width,  # Add image width
+            height=request.image_height,  # Add image height
+            format=request.image_format,  # Add image format
+            batch_id=request.batch_id
+        )
+
+        # Annotation Node
+        session.run(
+            """
+            MATCH (i:Image {image_url: $image_url})
+            MERGE (i)-[:HAS_ANNOTATION]->(a:Annotation {
+                task_type: $task_type
+            })
+            ON CREATE SET
+                a.reviewed = false,
+                a.classified = false,
+                a.misclassified = false,
+                a.created_at = datetime()
+            """,
+            image_url=request.image_url,
+            task_type=request.task_type
+        )
+
+    @staticmethod
+    def _detection_rows(detections):
+        """Return the query parameters of detections with a class_label, confidence and "x1,y1,x2,y2" bbox_coordinates."""
+        rows = []
+        for detection in detections:
+            x1, y1, x2, y2 = map(float, detection.bbox_coordinates.split(','))
+            rows.append({
+                "class_label": detection.class_label,
+                "confidence": detection.confidence,
+                "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            })
+        return rows
+
+    def _store_detections(self, session, request, rows):
+        """Store the labelled bounding boxes or classifications of one image with a single query."""
+
+        # Bounding Box for Object Detection
+        if request.task_type == "object_detection":
+            session.run(
+                """
+                MATCH (i:Image {image_url: $image_url})
+                UNWIND $detections AS d
+                MERGE (bb:BoundingBox {
+                    x1: d.x1, y1: d.y1, x2: d.x2, y2: d.y2, confidence: d.confidence
+                })
+                MERGE (l:Label {name: d.class_label})
+                MERGE (i)-[:HAS_BOUNDING_BOX]->(bb)
+                MERGE (bb)-[:HAS_LABEL]->(l)
+                """,
+                image_url=request.image_url,
+                detections=rows
+            )
+
+        # Classification Annotation for Image Classification
+        if request.task_type == "image_classification":
+            session.run(
+                """
+                MATCH (i:Image {image_url: $image_url})
+                UNWIND $detections AS d
+                MERGE (ca:ClassificationAnnotation {confidence: d.confidence})
+                MERGE (l:Label {name: d.class_label})
+                MERGE (i)-[:HAS_CLASSIFICATION]->(ca)
+                MERGE (ca)-[:HAS_LABEL]->(l)
+                """,
+                image_url=request.image_url,
+                detections=rows
+            )
+
     def StoreMetrics(self, request, context):
         metric_id = str(uuid.uuid4())
         batch_id = request.batch_id
@@ -157,6 +210,23 @@ class Neo4jService(neo4j_service_pb2_grpc.Neo4jServiceServicer):
                 preprocess_distribution_json=request.preprocess_time_distribution,
                 postprocess_distribution_json=request.postprocess_time_distribution,
             )
+
+            # Mergeable sketches of the batch, which the metricsRollup query merges across batches
+            if request.sketches:
+                session.run(
+                    """
+                    MATCH (m:Metrics {metric_id: $metric_id})
+                    CREATE (s:MetricsSketch {
+                        batch_id: $batch_id,
+                        created_at: datetime(),
+                        sketches: $sketches
+                    })
+                    CREATE (s)-[:SKETCH_OF]->(m)
+                    """,
+                    metric_id=metric_id,
+                    batch_id=batch_id,
+                    sketches=request.sketches,
+                )
         return neo4j_service_pb2.StoreResultResponse(success=True)
 
 
@@ -39,6 +39,11 @@ class Neo4jServiceStub(object):
                 request_serializer=neo4j__service__pb2.ClassificationResult.SerializeToString,
                 response_deserializer=neo4j__service__pb2.StoreResultResponse.FromString,
                 _registered_method=True)
+        self.StoreImageResults = channel.stream_stream(
+                '/Neo4jService/StoreImageResults',
+                request_serializer=neo4j__service__pb2.ImageResults.SerializeToString,
+                response_deserializer=neo4j__service__pb2.StoreResultResponse.FromString,
+                _registered_method=True)
         self.StoreMetrics = channel.unary_unary(
                 '/Neo4jService/StoreMetrics',
                 request_serializer=neo4j__service__pb2.MetricsResult.SerializeToString,
@@ -60,6 +65,12 @@ class Neo4jServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StoreImageResults(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def StoreMetrics(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -80,6 +91,11 @@ def add_Neo4jServiceServicer_to_server(servicer, server):
                     request_deserializer=neo4j__service__pb2.ClassificationResult.FromString,
                     response_serializer=neo4j__service__pb2.StoreResultResponse.SerializeToString,
             ),
+            'StoreImageResults': grpc.stream_stream_rpc_method_handler(
+                    servicer.StoreImageResults,
+                    request_deserializer=neo4j__service__pb2.ImageResults.FromString,
+                    response_serializer=neo4j__service__pb2.StoreResultResponse.SerializeToString,
+            ),
             'StoreMetrics': grpc.unary_unary_rpc_method_handler(
                     servicer.StoreMetrics,
                     request_deserializer=neo4j__service__pb2.MetricsResult.FromString,
@@ -128,6 +144,33 @@ class Neo4jService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def StoreImageResults(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/Neo4jService/StoreImageResults',
+            neo4j__service__pb2.ImageResults.SerializeToString,
+            neo4j__service__pb2.StoreResultResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def StoreMetrics(request,
             target,
@@ -0,0 +1,226 @@
+import queue
+import threading
+import time
+import traceback
+from timing import Histogram
+
+_SENTINEL = object()
+
+
+class Stage:
+    """
+    A single pipeline stage: a pool of worker threads reading from one bounded input queue.
+
+    Args:
+        name (str): Name used when reporting stage statistics.
+        func (callable): Called with one item (or a list of up to batch_size items when
+            batch_size > 1). Returns the item(s) to pass downstream, or None to drop them.
+        workers (int): Number of worker threads for this stage.
+        queue_size (int): Capacity of the stage's input queue.
+        batch_size (int): Maximum number of queued items handed to func in one call.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=16, batch_size=1):
+        if workers < 1:
+            raise ValueError(f"Stage '{name}' needs at least one worker.")
+        if batch_size < 1:
+            raise ValueError(f"Stage '{name}' needs a batch size of at least one.")
+
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.input_queue = queue.Queue(maxsize=queue_size)
+
+        self._lock = threading.Lock()
+        self._active_workers = workers
+        self.processed = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self._queue_depth_total = 0
+        self._queue_depth_samples = 0
+        self.input_stall_time = 0.0
+        self.output_stall_time = 0.0
+        self.busy_time = 0.0
+        # Call latencies in ms, in fixed buckets so a long run uses constant memory
+        self.call_times = Histogram()
+
+    def _record_depth(self):
+        depth = self.input_queue.qsize()
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            self._queue_depth_total += depth
+            self._queue_depth_samples += 1
+
+    def _next_items(self):
+        """Block for one item, then drain up to batch_size - 1 more without waiting."""
+        self._record_depth()
+        start = time.perf_counter()
+        item = self.input_queue.get()
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.input_stall_time += waited
+
+        if item is _SENTINEL:
+            return [], True
+
+        items = [item]
+        while len(items) < self.batch_size:
+            try:
+                item = self.input_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _SENTINEL:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def stats(self):
+        with self._lock:
+            avg_depth = self._queue_depth_total / self._queue_depth_samples if self._queue_depth_samples else 0
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "errors": self.errors,
+                "max_queue_depth": self.max_queue_depth,
+                "avg_queue_depth": round(avg_depth, 2),
+                "input_stall_time": round(self.input_stall_time, 3),
+                "output_stall_time": round(self.output_stall_time, 3),
+                "busy_time": round(self.busy_time, 3),
+                # Latency of one call to func, i.e. of a whole batch when batch_size > 1
+                "latency_p50_ms": round(self.call_times.percentile(0.50), 3),
+                "latency_p95_ms": round(self.call_times.percentile(0.95), 3),
+                "latency_p99_ms": round(self.call_times.percentile(0.99), 3),
+            }
+
+
+class Pipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues so that each stage
+    can overlap with the others. A full downstream queue blocks the upstream workers,
+    which keeps memory bounded by the queue sizes rather than by the number of items.
+    """
+
+    def __init__(self, stages):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.stages = stages
+        self.feed_stall_time = 0.0
+        self.elapsed_time = 0.0
+
+    def _put(self, stage_index, item):
+        """Hand an item to a stage, returning how long the caller was blocked by a full queue."""
+        start = time.perf_counter()
+        self.stages[stage_index].input_queue.put(item)
+        return time.perf_counter() - start
+
+    def _emit(self, stage_index, outputs):
+        """Forward a stage's outputs to the next stage, if there is one."""
+        if outputs is None or stage_index + 1 >= len(self.stages):
+            return 0.0
+        stage = self.stages[stage_index]
+        if stage.batch_size == 1:
+            outputs = [outputs]
+        stalled = 0.0
+        for output in outputs:
+            if output is not None:
+                stalled += self._put(stage_index + 1, output)
+        return stalled
+
+    def _worker(self, stage_index):
+        stage = self.stages[stage_index]
+        done = False
+        while not done:
+            items, done = stage._next_items()
+            if not items:
+                continue
+
+            start = time.perf_counter()
+            try:
+                outputs = stage.func(items if stage.batch_size > 1 else items[0])
+            except Exception as e:
+                print(f"Pipeline stage '{stage.name}' failed: {e}")
+                traceback.print_exc()
+                with stage._lock:
+                    stage.errors += len(items)
+                continue
+            busy = time.perf_counter() - start
+
+            stalled = self._emit(stage_index, outputs)
+            with stage._lock:
+                stage.processed += len(items)
+                stage.busy_time += busy
+                stage.call_times.add(busy * 1000)
+                stage.output_stall_time += stalled
+
+        # The last worker of a stage to finish shuts down every worker of the next stage
+        with stage._lock:
+            stage._active_workers -= 1
+            last_worker = stage._active_workers == 0
+        if last_worker and stage_index + 1 < len(self.stages):
+            for _ in range(self.stages[stage_index + 1].workers):
+                self._put(stage_index + 1, _SENTINEL)
+
+    def run(self, items):
+        """Feed every item through the pipeline and block until all stages have drained."""
+        start = time.perf_counter()
+        threads = []
+        for stage_index, stage in enumerate(self.stages):
+            for worker_id in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(stage_index,),
+                    name=f"{stage.name}-{worker_id}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        for item in items:
+            self.feed_stall_time += self._put(0, item)
+        for _ in range(self.stages[0].workers):
+            self._put(0, _SENTINEL)
+
+        for thread in threads:
+            thread.join()
+        self.elapsed_time = time.perf_counter() - start
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def print_stats(self):
+        """Print per-stage queue depth, stall times and 95th percentile call latency for the last run."""
+        print(f"Pipeline finished in {self.elapsed_time:.2f}s (input feed stalled {self.feed_stall_time:.2f}s)")
+        print(f"{'stage':<12}{'workers':>8}{'done':>7}{'errors':>7}{'max q':>7}{'avg q':>7}{'in stall':>10}{'out stall':>11}{'busy':>9}{'p95':>10}")
+        for name, s in self.stats().items():
+            print(
+                f"{name:<12}{s['workers']:>8}{s['processed']:>7}{s['errors']:>7}{s['max_queue_depth']:>7}"
+                f"{s['avg_queue_depth']:>7}{s['input_stall_time']:>9.2f}s{s['output_stall_time']:>10.2f}s{s['busy_time']:>8.2f}s{s['latency_p95_ms']:>8.1f}ms"
+            )
+
+
+def collect_batch(source_queue, max_size, max_wait, timeout=None):
+    """
+    Collect a micro-batch from a queue under a size and a latency deadline.
+
+    Blocks up to timeout (forever when None) for the first item, then keeps collecting
+    until max_size items are gathered or max_wait seconds have passed since the first
+    one arrived, whichever comes first.
+
+    Returns:
+        list: The collected items, empty if nothing arrived before the timeout.
+    """
+    try:
+        first = source_queue.get(timeout=timeout)
+    except queue.Empty:
+        return []
+
+    items = [first]
+    deadline = time.monotonic() + max_wait
+    while len(items) < max_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            items.append(source_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return items
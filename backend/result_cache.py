@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import threading
+
+
+class ResultCache:
+    """
+    A size-bounded LRU cache of model results, stored in SQLite.
+
+    Entries are keyed by (image content hash, model name, weights version, quantized), so a
+    duplicate image only skips inference when the same weights in the same precision
+    produced the stored result. When the cache holds more than max_entries results, the
+    least recently used ones are evicted. Pass db_path=":memory:" for a cache that lives
+    only as long as the process.
+    """
+
+    def __init__(self, db_path="result_cache.sqlite", max_entries=10000):
+        if max_entries < 1:
+            raise ValueError("The result cache needs room for at least one entry.")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                content_hash TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                weights_version TEXT NOT NULL,
+                quantized INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (content_hash, model_name, weights_version, quantized)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._conn.commit()
+
+        self._clock, self._size = self._conn.execute("SELECT COALESCE(MAX(last_used), 0), COUNT(*) FROM results").fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._size
+
+    def get(self, content_hash, model_name, weights_version, quantized):
+        """
+        Return the cached result for an image, or None on a miss.
+        The result is a dict with labels, confidences, bboxes, box_proportions and orig_shape.
+        """
+        key = (content_hash, model_name, weights_version, int(quantized))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM results WHERE content_hash = ? AND model_name = ? AND weights_version = ? AND quantized = ?",
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._clock += 1
+            self._conn.execute(
+                "UPDATE results SET last_used = ? WHERE content_hash = ? AND model_name = ? AND weights_version = ? AND quantized = ?",
+                (self._clock, *key)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, content_hash, model_name, weights_version, quantized, result):
+        """Store a result, evicting the least recently used entries beyond max_entries."""
+        key = (content_hash, model_name, weights_version, int(quantized))
+        with self._lock:
+            self._clock += 1
+            replaced = self._conn.execute(
+                "SELECT 1 FROM results WHERE content_hash = ? AND model_name = ? AND weights_version = ? AND quantized = ?",
+                key
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(result), self._clock)
+            )
+            if not replaced:
+                self._size += 1
+
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self._size -= overflow
+                self.evictions += overflow
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "entries": self._size,
+            }
@@ -0,0 +1,141 @@
+import collections
+import threading
+import time
+import grpc
+import model_service_pb2_grpc
+
+
+class ResultStream:
+    """
+    A long-lived ModelService.StoreResults stream fed by a generator.
+
+    Results are sent as soon as they are passed to send(), and responses are read on a
+    background thread while more results are still being produced. At most max_pending
+    results are held in memory (queued or waiting for a server response), so memory use
+    does not grow with the number of images. If the server becomes unavailable, the
+    stream is reopened and every result that was not yet acknowledged is sent again.
+    """
+
+    def __init__(self, target="localhost:50051", retries=3, delay=2, max_pending=64):
+        self.target = target
+        self.retries = retries
+        self.delay = delay
+        self.max_pending = max_pending
+
+        self._cond = threading.Condition()
+        self._outbound = collections.deque()
+        self._pending = collections.deque()
+        self._generation = 0
+        self._closed = False
+        self._thread = None
+        self._channel = None
+
+        self.sent = 0
+        self.acknowledged = 0
+        self.failed = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        self._channel = grpc.insecure_channel(self.target)
+        self._thread = threading.Thread(target=self._consume_responses, name="result-stream", daemon=True)
+        self._thread.start()
+
+    def send(self, request, on_ack=None):
+        """
+        Queue a ResultsRequest for the stream, blocking while too many results are unacknowledged.
+        on_ack, if given, is called with no arguments once the server has answered the request.
+        """
+        with self._cond:
+            while not self.failed and len(self._outbound) + len(self._pending) >= self.max_pending:
+                self._cond.wait()
+            if self.failed:
+                return False
+            self._outbound.append((request, on_ack))
+            self.sent += 1
+            self._cond.notify_all()
+        return True
+
+    def close(self):
+        """End the request stream and wait until the server has answered every result."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._channel is not None:
+            self._channel.close()
+        print(f"Result stream closed: {self.acknowledged}/{self.sent} results acknowledged")
+
+    def _request_generator(self, generation, replay):
+        """Yield unacknowledged results from a previous attempt, then new results until closed."""
+        for request, _ in replay:
+            yield request
+
+        while True:
+            with self._cond:
+                while not self._outbound and not self._closed and self._generation == generation:
+                    self._cond.wait()
+                # A newer stream has taken over after a retry, so stop feeding this one
+                if self._generation != generation:
+                    return
+                if not self._outbound:
+                    return
+                entry = self._outbound.popleft()
+                self._pending.append(entry)
+            yield entry[0]
+
+    def _consume_responses(self):
+        stub = model_service_pb2_grpc.ModelServiceStub(self._channel)
+
+        # Retry logic
+        for attempt in range(self.retries):
+            with self._cond:
+                generation = self._generation
+                replay = list(self._pending)
+            try:
+                response_iterator = stub.StoreResults(self._request_generator(generation, replay))
+
+                for response in response_iterator:
+                    with self._cond:
+                        request, on_ack = self._pending.popleft()
+                        self.acknowledged += 1
+                        self._cond.notify_all()
+                    if on_ack is not None:
+                        on_ack()
+                    print(f"Server response for:\n{request.image_url}\n- {response.message}")
+
+                # The server only ends the stream after the client has, once every result is answered
+                with self._cond:
+                    unanswered = len(self._pending) + len(self._outbound)
+                    if self._closed and not unanswered:
+                        return  # Exit once the server has answered the whole stream
+                print(f"Server ended the stream with {unanswered} results unanswered")
+                break
+
+            except grpc.RpcError as e:
+                print(f"gRPC Error1: {e.code()} - {e.details()}")
+
+                if e.code() == grpc.StatusCode.UNAVAILABLE:  # Socket closed or server not available
+                    print(f"gRPC Error: Socket closed, retrying in {self.delay} seconds...")
+                    with self._cond:
+                        self._generation += 1
+                        self._cond.notify_all()
+                    time.sleep(self.delay)
+                else:
+                    break
+
+            except Exception as e:
+                print(f"Unexpected error while sending results: {str(e)}")
+                break  # Exit the loop on unexpected error
+
+        print("Max retries reached, operation failed.")
+        with self._cond:
+            self.failed = True
+            self._generation += 1
+            self._cond.notify_all()
@@ -0,0 +1,148 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from unittest.mock import MagicMock
+import pytest
+
+import accuracy_engine
+from accuracy_engine import (
+    APPLY_CELLS_QUERY, APPLY_LABELS_QUERY, UNKNOWN_LABEL, calculate_accuracy, counter_changes, feedback_cell,
+    rebuild, update_feedback,
+)
+
+
+def mock_tx(records):
+    """A transaction whose first run() returns the given annotation records, and that records every query."""
+    tx = MagicMock()
+    annotation_result = MagicMock()
+    annotation_result.__iter__.return_value = iter(records)
+    update_result = MagicMock()
+    update_result.single.return_value = {"updatedCount": 1}
+    tx.run.side_effect = lambda query, **params: annotation_result if "collect(label)[0]" in query else update_result
+    return tx
+
+
+def applied_rows(tx, query):
+    return [row for call in tx.run.call_args_list if call.args[0] == query for row in call.kwargs["rows"]]
+
+
+def annotation(classified=False, misclassified=False, correct_label=None, predicted="can", batch_ids=("b1",),
+               task_type="object_detection"):
+    return {
+        "image_url": "https://blob/image.jpg", "task_type": task_type, "classified": classified, "misclassified": misclassified,
+        "correct_label": correct_label, "batch_ids": list(batch_ids), "predicted": predicted,
+    }
+
+
+def test_feedback_cells():
+    """Test which confusion matrix cell each feedback state counts in."""
+
+    assert feedback_cell("can", classified=True, misclassified=False) == ("can", "can")
+    assert feedback_cell("can", classified=False, misclassified=True, correct_label="bottle") == ("can", "bottle")
+    assert feedback_cell("can", classified=False, misclassified=True) == ("can", UNKNOWN_LABEL)
+    assert feedback_cell("can", classified=False, misclassified=False) is None
+    assert feedback_cell(None, classified=True, misclassified=False) is None
+
+
+def test_flipping_feedback_moves_the_image_between_counters():
+    """Test that correcting a correct image removes its true positive and adds a false positive and negative."""
+
+    cells, labels = counter_changes(("can", "can"), ("can", "bottle"), ["b1"])
+    assert sorted(cells, key=lambda row: row["actual"]) == [
+        {"batch_id": "b1", "predicted": "can", "actual": "bottle", "delta": 1},
+        {"batch_id": "b1", "predicted": "can", "actual": "can", "delta": -1},
+    ]
+    assert sorted(labels, key=lambda row: row["label"]) == [
+        {"batch_id": "b1", "label": "bottle", "tp": 0, "fp": 0, "fn": 1},
+        {"batch_id": "b1", "label": "can", "tp": -1, "fp": 1, "fn": 0},
+    ]
+    assert counter_changes(("can", "can"), ("can", "can"), ["b1"]) == ([], [])
+
+
+def test_update_feedback_applies_only_the_change():
+    """Test that feedback updates the annotation and the counters of every batch of the image."""
+
+    tx = mock_tx([annotation(classified=True, batch_ids=("b1", "b2"))])
+    assert update_feedback(tx, "https://blob/image.jpg", classified=False, misclassified=True, correct_label="bottle") == 1
+
+    update = next(call for call in tx.run.call_args_list if call.args[0] == accuracy_engine.UPDATE_ANNOTATION_QUERY)
+    assert update.kwargs["correct_label"] == "bottle"
+    assert {(row["batch_id"], row["actual"], row["delta"]) for row in applied_rows(tx, APPLY_CELLS_QUERY)} == {
+        ("b1", "bottle", 1), ("b1", "can", -1), ("b2", "bottle", 1), ("b2", "can", -1),
+    }
+
+    # Marking an already reviewed image reviewed again leaves the counters alone
+    tx = mock_tx([annotation(classified=True)])
+    update_feedback(tx, "https://blob/image.jpg", reviewed=True)
+    assert applied_rows(tx, APPLY_CELLS_QUERY) == applied_rows(tx, APPLY_LABELS_QUERY) == []
+
+    assert update_feedback(mock_tx([]), "https://blob/missing.jpg", classified=True) is None
+
+
+def test_update_feedback_counts_every_annotation_of_an_image():
+    """Test that an image with a detection and a classification annotation updates the counters of both predictions."""
+
+    tx = mock_tx([
+        annotation(classified=True, predicted="can"),
+        annotation(predicted="tabby", task_type="image_classification"),
+    ])
+    assert update_feedback(tx, "https://blob/image.jpg", classified=False, misclassified=True, correct_label="bottle") == 1
+
+    assert sorted((row["predicted"], row["actual"], row["delta"]) for row in applied_rows(tx, APPLY_CELLS_QUERY)) == [
+        ("can", "bottle", 1), ("can", "can", -1), ("tabby", "bottle", 1),
+    ]
+    assert sorted((row["label"], row["tp"], row["fp"], row["fn"]) for row in applied_rows(tx, APPLY_LABELS_QUERY)) == [
+        ("bottle", 0, 0, 1), ("bottle", 0, 0, 1), ("can", -1, 1, 0), ("tabby", 0, 1, 0),
+    ]
+    # Each annotation's predicted label comes only from the relation of its own task type
+    assert 'a.task_type = "image_classification" AND type(r) = "HAS_CLASSIFICATION"' in accuracy_engine.ANNOTATION_QUERY
+
+
+def test_rebuild_counts_every_reviewed_image():
+    """Test that rebuilding sums the outcomes of the annotations per batch."""
+
+    tx = mock_tx([
+        annotation(classified=True),
+        annotation(classified=True),
+        annotation(misclassified=True, correct_label="bottle"),
+        annotation(misclassified=True, predicted="bottle", batch_ids=("b2",)),
+        annotation(classified=True, predicted=None),
+    ])
+    assert rebuild(tx) == 4
+
+    assert sorted(applied_rows(tx, APPLY_CELLS_QUERY), key=lambda row: (row["batch_id"], row["actual"])) == [
+        {"batch_id": "b1", "predicted": "can", "actual": "bottle", "delta": 1},
+        {"batch_id": "b1", "predicted": "can", "actual": "can", "delta": 2},
+        {"batch_id": "b2", "predicted": "bottle", "actual": UNKNOWN_LABEL, "delta": 1},
+    ]
+    assert {(row["batch_id"], row["label"]): (row["tp"], row["fp"], row["fn"]) for row in applied_rows(tx, APPLY_LABELS_QUERY)} == {
+        ("b1", "can"): (2, 1, 0), ("b1", "bottle"): (0, 0, 1), ("b2", "bottle"): (0, 1, 0),
+    }
+
+
+def test_calculate_accuracy():
+    """Test the accuracy, per-label and macro-averaged metrics and confusion matrix of summed counters."""
+
+    accuracy = calculate_accuracy(
+        [
+            {"label": "can", "tp": 3, "fp": 1, "fn": 0},
+            {"label": "bottle", "tp": 1, "fp": 0, "fn": 1},
+            {"label": "carton", "tp": 0, "fp": 0, "fn": 0},
+        ],
+        [
+            {"predicted": "can", "actual": "can", "count": 3},
+            {"predicted": "can", "actual": "bottle", "count": 1},
+            {"predicted": "bottle", "actual": "bottle", "count": 1},
+            {"predicted": "bottle", "actual": "can", "count": 0},
+        ],
+    )
+
+    assert (accuracy["reviewed"], accuracy["correct"], accuracy["accuracy"]) == (5, 4, 0.8)
+    assert list(accuracy["labels"]) == ["bottle", "can"]
+    assert accuracy["labels"]["can"] == {
+        "true_positives": 3, "false_positives": 1, "false_negatives": 0, "precision": 0.75, "recall": 1.0, "f1": 0.8571,
+    }
+    assert accuracy["precision"] == pytest.approx((1.0 + 0.75) / 2)
+    assert accuracy["recall"] == pytest.approx((0.5 + 1.0) / 2)
+    assert accuracy["confusion_matrix"] == {"can": {"can": 3, "bottle": 1}, "bottle": {"bottle": 1}}
+    assert calculate_accuracy([], [])["accuracy"] == 0.0
@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+import threading
+import time
+
+from blob_uploader import BlobUploader
+from stand_ins import InMemoryContainerClient
+
+
+def test_upload_creates_blob_once():
+    """Test that a blob is created on the first upload and left alone afterwards."""
+
+    container_client = InMemoryContainerClient(container_name="images")
+    uploader = BlobUploader(container_client)
+
+    url, created = uploader.upload("abc.jpg", b"first")
+    second_url, second_created = uploader.upload("abc.jpg", b"second")
+
+    assert created and not second_created
+    assert url == second_url == f"{container_client.url}/abc.jpg"
+    assert container_client.blobs["abc.jpg"] == b"first"
+    assert container_client.upload_calls == 2
+
+
+def test_upload_many_bounds_concurrency():
+    """Test that no more than max_concurrency uploads are in flight at once."""
+
+    class SlowContainerClient(InMemoryContainerClient):
+        def __init__(self):
+            super().__init__()
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.counter_lock = threading.Lock()
+
+        def upload_blob(self, name, data, overwrite=False, **kwargs):
+            with self.counter_lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            time.sleep(0.01)
+            super().upload_blob(name, data, overwrite=overwrite)
+            with self.counter_lock:
+                self.in_flight -= 1
+
+    container_client = SlowContainerClient()
+    uploader = BlobUploader(container_client, max_concurrency=3)
+
+    results = uploader.upload_many((f"{i}.jpg", b"data") for i in range(12))
+
+    assert [url for url, _ in results] == [f"{container_client.url}/{i}.jpg" for i in range(12)]
+    assert len(container_client.blobs) == 12
+    assert container_client.max_in_flight <= 3
@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import time
+import pytest
+
+from dynamic_batcher import DynamicBatcher
+
+
+def test_batcher_groups_concurrent_requests():
+    """Test that requests submitted together share one call to process_batch."""
+
+    batches = []
+    release = threading.Event()
+
+    def process_batch(items):
+        release.wait(5)
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = DynamicBatcher(process_batch, max_batch_size=4, max_wait=0.5)
+    try:
+        futures = [batcher.submit(i) for i in range(4)]
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+    finally:
+        batcher.close()
+
+    assert results == [(0, 4), (10, 4), (20, 4), (30, 4)]
+    assert batches == [[0, 1, 2, 3]]
+    assert batcher.snapshot()["avg_batch_size"] == 4
+
+
+def test_batcher_does_not_wait_past_max_wait():
+    """Test that a lone request runs once max_wait has passed."""
+
+    batcher = DynamicBatcher(lambda items: [item + 1 for item in items], max_batch_size=8, max_wait=0.01)
+    try:
+        assert batcher.submit(1).result(timeout=5) == (2, 1)
+    finally:
+        batcher.close()
+
+
+def test_batcher_fails_every_request_of_a_failed_batch():
+    """Test that an exception from process_batch reaches every caller of the batch."""
+
+    def process_batch(items):
+        raise RuntimeError("model crashed")
+
+    batcher = DynamicBatcher(process_batch, max_batch_size=2, max_wait=0.01)
+    try:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            batcher.submit("image").result(timeout=5)
+    finally:
+        batcher.close()
+
+    with pytest.raises(RuntimeError):
+        batcher.submit("image")
+
+
+def test_interactive_requests_skip_the_bulk_backlog():
+    """Test that interactive latency stays low while a bulk backlog is being processed."""
+
+    def process_batch(items):
+        time.sleep(0.01)
+        return items
+
+    batcher = DynamicBatcher(process_batch, max_batch_size=4, max_wait=0.01)
+    try:
+        bulk = [batcher.submit(i, "bulk") for i in range(200)]
+        time.sleep(0.05)
+        interactive = batcher.submit("urgent", "interactive")
+        interactive.result(timeout=5)
+        remaining_bulk = sum(not future.done() for future in bulk)
+        for future in bulk:
+            future.result(timeout=10)
+    finally:
+        batcher.close()
+
+    assert remaining_bulk > 100
+    classes = batcher.snapshot()["classes"]
+    assert classes["interactive"]["total"] == 1
+    assert classes["bulk"]["total"] == 200
+    assert classes["interactive"]["latency_p99_ms"] < classes["bulk"]["latency_p99_ms"]
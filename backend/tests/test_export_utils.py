@@ -0,0 +1,123 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+
+from PIL import Image
+
+from models import export_utils
+from models.export_utils import (
+    INT8_BOX_TOLERANCE, INT8_CONF_TOLERANCE, artifact_path, calibration_images, check_backend, compare_outputs,
+    compare_results, verification_images
+)
+
+
+def detection(labels, confs, boxes):
+    return (labels, confs, boxes, [0.0], [0.0], [0.0], [], (480, 640), "object_detection")
+
+
+def test_check_backend_rejects_unknown_backends():
+    """Test that only the supported inference backends are accepted."""
+
+    for backend in ("torch", "onnx", "torchscript"):
+        check_backend(backend)
+    with pytest.raises(ValueError):
+        check_backend("tensorrt")
+
+
+def test_artifact_path_is_keyed_by_weights_hash(tmp_path, monkeypatch):
+    """Test that exports of different weights are cached under different names."""
+
+    monkeypatch.setattr(export_utils, "EXPORT_DIR", str(tmp_path / "exports"))
+
+    path = artifact_path("yolo11n", "abc123", "onnx", ".onnx")
+    assert path == os.path.join(str(tmp_path / "exports"), "yolo11n-abc123-onnx.onnx")
+    assert os.path.isdir(tmp_path / "exports")
+    assert artifact_path("yolo11n", "def456", "onnx", ".onnx") != path
+    assert artifact_path("efficientnet-b0", "abc123", "torchscript", ".pt", variant="torch2.5").endswith("-torchscript-torch2.5.pt")
+
+
+def test_verification_images_always_include_a_synthetic_image(tmp_path, monkeypatch):
+    """Test that there is something to verify an export on even without sample images."""
+
+    monkeypatch.setattr(export_utils, "UNPROCESSED_IMAGES", str(tmp_path / "missing"))
+
+    images = verification_images()
+    assert len(images) == 1
+    assert images[0].mode == "RGB"
+
+
+def test_calibration_images_are_a_reproducible_sample(tmp_path, monkeypatch):
+    """Test that calibration samples the same images from unprocessed_images on every run."""
+
+    for index in range(10):
+        Image.new("L", (8 + index, 8), color=index * 20).save(tmp_path / f"{index}.png")
+    (tmp_path / "notes.txt").write_text("not an image")
+    monkeypatch.setattr(export_utils, "UNPROCESSED_IMAGES", str(tmp_path))
+
+    first = calibration_images(limit=4, seed=1)
+    second = calibration_images(limit=4, seed=1)
+    assert len(first) == 4
+    assert all(image.mode == "RGB" for image in first)
+    assert [image.size for image in first] == [image.size for image in second]
+    assert len(calibration_images(limit=50)) == 10
+
+
+def test_compare_outputs_accepts_small_differences():
+    """Test that outputs within the tolerance pass and larger differences are rejected."""
+
+    reference = [[1.0, 2.0, 3.0]]
+    compare_outputs(reference, [[1.0001, 2.0, 2.9999]])
+
+    with pytest.raises(ValueError):
+        compare_outputs(reference, [[1.1, 2.0, 3.0]])
+    with pytest.raises(ValueError):
+        compare_outputs(reference, [[1.0, 2.0]])
+
+
+def test_compare_results_matches_detections_within_tolerance():
+    """Test that detections match by label, confidence and box, regardless of their order."""
+
+    reference = [detection(["bottle", "can"], [0.9, 0.8], [[10, 10, 50, 50], [100, 100, 150, 150]])]
+    candidate = [detection(["can", "bottle"], [0.81, 0.89], [[101, 99, 150, 151], [10, 11, 50, 50]])]
+    compare_results(reference, candidate)
+
+    moved = [detection(["bottle", "can"], [0.9, 0.8], [[30, 10, 70, 50], [100, 100, 150, 150]])]
+    with pytest.raises(ValueError):
+        compare_results(reference, moved)
+
+    relabelled = [detection(["bottle", "cup"], [0.9, 0.8], [[10, 10, 50, 50], [100, 100, 150, 150]])]
+    with pytest.raises(ValueError):
+        compare_results(reference, relabelled)
+
+
+def test_compare_results_with_int8_tolerances():
+    """Test that an INT8 model may drift further than an export, but still needs the same detections."""
+
+    reference = [detection(["bottle"], [0.9], [[10, 10, 50, 50]])]
+    drifted = [detection(["bottle"], [0.8], [[18, 4, 60, 50]])]
+    with pytest.raises(ValueError):
+        compare_results(reference, drifted)
+    compare_results(reference, drifted, conf_tolerance=INT8_CONF_TOLERANCE, box_tolerance=INT8_BOX_TOLERANCE)
+
+    missing = [detection(["can"], [0.8], [[18, 4, 60, 50]])]
+    with pytest.raises(ValueError):
+        compare_results(reference, missing, conf_tolerance=INT8_CONF_TOLERANCE, box_tolerance=INT8_BOX_TOLERANCE)
+
+
+def test_compare_results_ignores_weak_detections():
+    """Test that detections below the confidence floor may appear or disappear."""
+
+    reference = [detection(["bottle", "can"], [0.9, 0.3], [[10, 10, 50, 50], [100, 100, 150, 150]])]
+    candidate = [detection(["bottle"], [0.9], [[10, 10, 50, 50]])]
+    compare_results(reference, candidate)
+
+    with pytest.raises(ValueError):
+        compare_results(candidate, [detection([], [], [])])
+
+
+def test_compare_results_handles_classifications():
+    """Test that classification results without boxes are compared by label and confidence."""
+
+    reference = [(["plastic_bag"], [0.7], [""], [0.0], [0.0], [0.0], [""], (224, 224), "image_classification")]
+    compare_results(reference, [(["plastic_bag"], [0.69], [""], [0.0], [0.0], [0.0], [""], (224, 224), "image_classification")])
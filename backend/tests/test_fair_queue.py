@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import time
+import pytest
+
+from fair_queue import WeightedFairQueue
+
+
+def test_backlogged_classes_share_by_weight():
+    """Test that busy classes are served in proportion to their weights."""
+
+    fair_queue = WeightedFairQueue({"interactive": 4, "bulk": 2, "backfill": 1})
+    for i in range(70):
+        for priority in ("interactive", "bulk", "backfill"):
+            fair_queue.put(priority, i)
+
+    served = [priority for priority, _ in fair_queue.get_batch(70)]
+    assert served.count("interactive") == 40
+    assert served.count("bulk") == 20
+    assert served.count("backfill") == 10
+
+
+def test_new_interactive_item_is_served_before_bulk_backlog():
+    """Test that an interactive item queued behind a bulk backlog goes into the next batch."""
+
+    fair_queue = WeightedFairQueue()
+    for i in range(1000):
+        fair_queue.put("bulk", i)
+    fair_queue.get_batch(8)
+    fair_queue.put("interactive", "urgent")
+
+    assert ("interactive", "urgent") in fair_queue.get_batch(8)
+
+
+def test_idle_class_does_not_bank_credit():
+    """Test that a class that was idle cannot starve the others when it returns."""
+
+    fair_queue = WeightedFairQueue({"interactive": 1, "bulk": 1})
+    for i in range(100):
+        fair_queue.put("bulk", i)
+    fair_queue.get_batch(50)
+    for i in range(100):
+        fair_queue.put("interactive", i)
+
+    served = [priority for priority, _ in fair_queue.get_batch(20)]
+    assert served.count("bulk") >= 9
+
+
+def test_get_batch_waits_for_the_class_max_wait():
+    """Test that a partial batch waits for its class's max_wait, and not at all for a zero wait."""
+
+    fair_queue = WeightedFairQueue(max_waits={"bulk": 0.2, "interactive": 0.0})
+
+    fair_queue.put("bulk", "a")
+    threading.Timer(0.05, fair_queue.put, ("bulk", "b")).start()
+    assert [item for _, item in fair_queue.get_batch(4)] == ["a", "b"]
+
+    start = time.monotonic()
+    fair_queue.put("interactive", "now")
+    assert fair_queue.get_batch(4) == [("interactive", "now")]
+    assert time.monotonic() - start < 0.1
+
+    assert fair_queue.get_batch(4, timeout=0.01) == []
+    with pytest.raises(ValueError):
+        fair_queue.put("urgent", "x")
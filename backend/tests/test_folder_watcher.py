@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import queue
+
+from folder_watcher import FolderWatcher
+
+
+def _next_path(watcher, timeout=5):
+    path, detected_at = watcher.queue.get(timeout=timeout)
+    return path
+
+
+def test_watcher_reports_new_images_once(tmp_path):
+    """Test that a new image is reported once, and other files are ignored."""
+
+    with FolderWatcher(tmp_path, poll_interval=0.05, force_polling=True) as watcher:
+        (tmp_path / "notes.txt").write_text("not an image")
+        (tmp_path / "cat.jpg").write_bytes(b"jpeg data")
+
+        assert _next_path(watcher) == str(tmp_path / "cat.jpg")
+        try:
+            extra = watcher.queue.get(timeout=0.3)
+        except queue.Empty:
+            extra = None
+        assert extra is None
+
+
+def test_watcher_skips_existing_images_by_default(tmp_path):
+    """Test that images present at startup are only reported with include_existing."""
+
+    (tmp_path / "old.png").write_bytes(b"png data")
+
+    with FolderWatcher(tmp_path, poll_interval=0.05, force_polling=True) as watcher:
+        (tmp_path / "new.png").write_bytes(b"png data")
+        assert _next_path(watcher) == str(tmp_path / "new.png")
+
+    with FolderWatcher(tmp_path, poll_interval=0.05, force_polling=True, include_existing=True) as watcher:
+        reported = {_next_path(watcher), _next_path(watcher)}
+        assert reported == {str(tmp_path / "old.png"), str(tmp_path / "new.png")}
+
+
+def test_watcher_reports_changed_images_again(tmp_path):
+    """Test that an image is reported again after its content changes."""
+
+    image = tmp_path / "dog.bmp"
+    with FolderWatcher(tmp_path, poll_interval=0.05, force_polling=True) as watcher:
+        image.write_bytes(b"first")
+        assert _next_path(watcher) == str(image)
+
+        image.write_bytes(b"second version")
+        assert _next_path(watcher) == str(image)
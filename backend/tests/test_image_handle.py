@@ -0,0 +1,92 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import hashlib
+import io
+from unittest.mock import patch
+import pytest
+from PIL import Image
+
+import image_handle
+from image_handle import ImageHandle
+
+TEST_IMAGE_PATH = os.path.join(os.path.dirname(__file__), "test_images", "test_image.jpg")
+
+
+def test_handle_reads_file_once():
+    """Test that hashing, metadata and decoding share a single read of the file."""
+
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        content = f.read()
+
+    handle = ImageHandle(TEST_IMAGE_PATH)
+    with patch("builtins.open", wraps=open) as mock_open:
+        assert handle.hash() == hashlib.sha256(content).hexdigest()
+        width, height, image_format = handle.metadata()
+        image = handle.pil_image()
+
+    assert mock_open.call_count == 1
+    assert image.mode == "RGB"
+    assert image.size == (width, height)
+    assert image_format == "JPEG"
+    assert handle.array().shape == (height, width, 3)
+
+
+def test_handle_decodes_once():
+    """Test that the decoded image is reused rather than decoded again."""
+
+    handle = ImageHandle(TEST_IMAGE_PATH)
+
+    assert handle.pil_image() is handle.pil_image()
+
+
+def test_handle_memory_maps_large_files(monkeypatch):
+    """Test that files above the threshold are memory-mapped and still decode correctly."""
+
+    monkeypatch.setattr(image_handle, "MMAP_THRESHOLD", 1)
+    handle = ImageHandle(TEST_IMAGE_PATH)
+
+    with open(TEST_IMAGE_PATH, "rb") as f:
+        assert handle.hash() == hashlib.sha256(f.read()).hexdigest()
+    assert handle.pil_image().size == Image.open(TEST_IMAGE_PATH).size
+    handle.release()
+
+
+def test_handle_from_bytes():
+    """Test that a handle can wrap an in-memory image without a path."""
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 16), color=(255, 0, 0)).save(buffer, format="PNG")
+
+    handle = ImageHandle.from_bytes(buffer.getvalue(), "red.png")
+
+    assert handle.extension == "png"
+    assert handle.metadata() == (32, 16, "PNG")
+    assert handle.pil_image().getpixel((0, 0)) == (255, 0, 0)
+
+
+def test_handle_requires_path_or_bytes():
+    """Test that a handle cannot be created from nothing, or from bytes without a name."""
+
+    with pytest.raises(ValueError):
+        ImageHandle()
+    with pytest.raises(ValueError, match="needs a name"):
+        ImageHandle(data=b"image bytes")
+
+
+def test_handle_draft_decode(tmp_path):
+    """Test that a reduced decode keeps the full-size metadata and does not replace the full decode."""
+
+    path = tmp_path / "large.jpg"
+    Image.new("RGB", (1600, 1200), color=(40, 80, 120)).save(path)
+    handle = ImageHandle(str(path))
+
+    draft = handle.pil_image((224, 224))
+    assert draft.size == (400, 300)
+    assert handle.pil_image((224, 224)) is draft
+    assert handle.metadata()[:2] == (1600, 1200)
+
+    full = handle.pil_image()
+    assert full.size == (1600, 1200)
+    # Once decoded in full, the full image serves reduced requests too
+    assert handle.pil_image((224, 224)) is full
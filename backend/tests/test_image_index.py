@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import hashlib
+import pytest
+
+import image_index
+from image_index import ImageIndex, compute_file_hash
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ImageIndex(str(tmp_path / "index.sqlite"))
+    yield index
+    index.close()
+
+
+def test_compute_file_hash_matches_hashlib(tmp_path, monkeypatch):
+    """Test that buffered and memory-mapped hashing both match a plain SHA-256."""
+
+    content = os.urandom(3 * 1024 * 1024 + 17)
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(content)
+    expected = hashlib.sha256(content).hexdigest()
+
+    assert compute_file_hash(str(image_path)) == expected
+
+    monkeypatch.setattr(image_index, "MMAP_THRESHOLD", 1024)
+    assert compute_file_hash(str(image_path)) == expected
+
+
+def test_get_hash_reuses_indexed_hash(tmp_path, index):
+    """Test that an unchanged file is hashed only once across lookups."""
+
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"image bytes")
+
+    first = index.get_hash(str(image_path))
+    second = index.get_hash(str(image_path))
+
+    assert first == second == hashlib.sha256(b"image bytes").hexdigest()
+    assert index.hash_misses == 1
+    assert index.hash_hits == 1
+
+
+def test_changed_file_invalidates_upload_state(tmp_path, index):
+    """Test that modifying a file clears its recorded hash and upload state."""
+
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"original")
+    index.get_hash(str(image_path))
+    index.mark_uploaded(str(image_path), "https://account/container/abc.jpg")
+
+    assert index.lookup(str(image_path))["uploaded"]
+
+    image_path.write_bytes(b"changed content")
+    os.utime(image_path, ns=(0, 0))
+
+    assert index.lookup(str(image_path)) is None
+    assert index.get_hash(str(image_path)) == hashlib.sha256(b"changed content").hexdigest()
+    assert not index.lookup(str(image_path))["uploaded"]
+
+
+def test_index_persists_between_instances(tmp_path):
+    """Test that a new ImageIndex on the same file sees earlier uploads."""
+
+    db_path = str(tmp_path / "index.sqlite")
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(b"image bytes")
+
+    first = ImageIndex(db_path)
+    first.get_hash(str(image_path))
+    first.mark_uploaded(str(image_path), "https://account/container/abc.jpg")
+    first.close()
+
+    second = ImageIndex(db_path)
+    entry = second.lookup(str(image_path))
+    second.close()
+
+    assert entry == {
+        "content_hash": hashlib.sha256(b"image bytes").hexdigest(),
+        "blob_url": "https://account/container/abc.jpg",
+        "uploaded": True,
+    }
@@ -0,0 +1,136 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from concurrent import futures
+import io
+import threading
+import grpc
+import pytest
+from PIL import Image
+
+import inference_service_pb2
+import inference_service_pb2_grpc
+from image_handle import ImageHandle
+from inference_service import InferenceService
+from models.remote_model import RemoteModel
+
+
+class FakeDetector:
+    """Returns one detection per image and records the size of every batch it runs."""
+
+    model_name = "fake.pt"
+    weights_version = "abc123"
+    quantized = False
+    backend = "onnx"
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def get_task_type(self):
+        return "object_detection"
+
+    def process_batch(self, images):
+        with self.lock:
+            self.batch_sizes.append(len(images))
+        results = []
+        for image in images:
+            width, height, _ = image.metadata()
+            results.append((
+                [image.name], [0.9], [[0.0, 0.0, float(width), float(height)]],
+                [1.0], [2.0], [3.0], [1.0], (height, width), "object_detection"
+            ))
+        return results
+
+
+class FakeClassifier:
+    """Returns the top label of every image with EfficientNet's empty box and box proportion."""
+
+    model_name = "classifier.pth"
+    weights_version = "def456"
+    quantized = False
+    backend = "torch"
+
+    def get_task_type(self):
+        return "image_classification"
+
+    def process_batch(self, images):
+        return [
+            (["tabby"], [0.7], [""], [1.0], [2.0], [3.0], [""], (224, 224), "image_classification")
+            for _ in images
+        ]
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def inference_server():
+    model = FakeDetector()
+    service = InferenceService({"fake": model, "classifier": FakeClassifier()}, max_batch_size=8, max_wait=0.2)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=16))
+    inference_service_pb2_grpc.add_InferenceServiceServicer_to_server(service, server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    yield model, f"localhost:{port}"
+    server.stop(None)
+    service.close()
+
+
+def test_remote_model_reports_server_model_info(inference_server):
+    """Test that the thin client takes its cache identity and task type from the server."""
+
+    _, target = inference_server
+    remote = RemoteModel(target)
+
+    assert remote.model == "fake"
+    assert (remote.model_name, remote.weights_version, remote.quantized, remote.backend) == ("fake.pt", "abc123", False, "onnx")
+    assert remote.get_task_type() == "object_detection"
+    remote.close()
+
+
+def test_remote_batch_is_batched_on_the_server(inference_server):
+    """Test that a client batch comes back in order and shares forward passes on the server."""
+
+    model, target = inference_server
+    remote = RemoteModel(target)
+    handles = [ImageHandle.from_bytes(_png(10 + i, 20), f"img{i}.png") for i in range(6)]
+
+    results = remote.process_batch(handles)
+    remote.close()
+
+    assert [result[0] for result in results] == [[f"img{i}.png"] for i in range(6)]
+    assert results[2][2] == [[0.0, 0.0, 12.0, 20.0]]
+    assert results[2][7] == (20, 12)
+    assert results[0][3:6] == ([1.0], [2.0], [3.0])
+    assert sum(model.batch_sizes) == 6
+    assert max(model.batch_sizes) > 1
+
+
+def test_unknown_model_is_rejected(inference_server):
+    """Test that requests for a model the server does not host fail with INVALID_ARGUMENT."""
+
+    _, target = inference_server
+    with grpc.insecure_channel(target) as channel:
+        stub = inference_service_pb2_grpc.InferenceServiceStub(channel)
+        with pytest.raises(grpc.RpcError) as error:
+            stub.Infer(inference_service_pb2.InferRequest(model="missing", image_bytes=_png(4, 4)))
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_classification_results_are_served_without_placeholders(inference_server):
+    """Test that a classification model's empty box and box proportion are left out of the response."""
+
+    _, target = inference_server
+    remote = RemoteModel(target, model="classifier")
+    labels, confs, bboxes, pre_times, inf_times, post_times, proportions, orig_shape, task_type = remote.process_image(
+        ImageHandle.from_bytes(_png(8, 8), "cat.png")
+    )
+    remote.close()
+
+    assert (labels, bboxes, proportions, task_type) == (["tabby"], [], [], "image_classification")
+    assert confs == [pytest.approx(0.7)]
+    assert orig_shape == (224, 224)
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from journal import BatchJournal
+
+
+def test_journal_replays_progress_after_reopen(tmp_path):
+    """Test that a reopened journal knows which images are done and which results were acknowledged."""
+
+    journal = BatchJournal.for_batch("batch-1", str(tmp_path))
+    journal.start({"model": "yolo", "source": "folder"}, ["a.jpg", "b.jpg", "c.jpg"])
+    journal.record_result("a.jpg", {"image_url": "https://example/a.jpg"})
+    journal.record_result("b.jpg", {"image_url": "https://example/b.jpg"})
+    journal.record_ack("a.jpg")
+    journal.close()
+
+    resumed = BatchJournal.for_batch("batch-1", str(tmp_path))
+    assert resumed.settings == {"model": "yolo", "source": "folder"}
+    assert resumed.remaining() == ["c.jpg"]
+    assert resumed.unacknowledged() == ["b.jpg"]
+    assert resumed.results["b.jpg"]["image_url"] == "https://example/b.jpg"
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    """Test that a record cut off by a crash is ignored and later records still append."""
+
+    journal = BatchJournal.for_batch("batch-2", str(tmp_path))
+    journal.start({}, ["a.jpg", "b.jpg"])
+    journal.record_result("a.jpg", {"image_url": "https://example/a.jpg"})
+    journal.close()
+    with open(tmp_path / "batch-2.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"type": "result", "image": "b.j')
+
+    resumed = BatchJournal.for_batch("batch-2", str(tmp_path))
+    assert resumed.remaining() == ["b.jpg"]
+    resumed.record_ack("a.jpg")
+    resumed.close()
+
+    assert BatchJournal.for_batch("batch-2", str(tmp_path)).unacknowledged() == []
+
+
+def test_missing_journal_has_no_settings(tmp_path):
+    """Test that a batch without a journal is recognisable before anything is processed."""
+
+    journal = BatchJournal.for_batch("unknown", str(tmp_path))
+    assert journal.settings is None
+    assert journal.remaining() == []
+    journal.close()
+    assert not os.path.exists(tmp_path / "unknown.jsonl")
+
+
+def test_live_journal_keeps_only_image_keys(tmp_path):
+    """Test that results recorded during a run are written to the file but not kept in memory."""
+
+    journal = BatchJournal.for_batch("batch-3", str(tmp_path))
+    journal.start({}, ["a.jpg", "b.jpg", "c.jpg"])
+    journal.record_result("b.jpg", {"image_url": "https://example/b.jpg"})
+    journal.record_result("a.jpg", {"image_url": "https://example/a.jpg"})
+    journal.record_ack("b.jpg")
+
+    assert journal.results == {}
+    assert journal.remaining() == ["c.jpg"]
+    assert journal.unacknowledged() == ["a.jpg"]
+    journal.close()
+
+    assert BatchJournal.for_batch("batch-3", str(tmp_path)).results["a.jpg"]["image_url"] == "https://example/a.jpg"
@@ -0,0 +1,101 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import threading
+import time
+from types import SimpleNamespace
+from cryptography.fernet import Fernet
+import pytest
+
+from keyvault_utils import EncryptedDiskCache, EnvConfigProvider, KeyVaultConfigProvider
+
+
+class FakeSecretClient:
+    """Serves secrets from a dict and records how many get_secret calls overlap."""
+
+    def __init__(self, secrets, delay=0.05):
+        self.secrets = secrets
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get_secret(self, name):
+        with self.lock:
+            self.calls.append(name)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return SimpleNamespace(value=self.secrets[name])
+
+
+SECRETS = {"COSMOS-ENDPOINT": "https://cosmos", "COSMOS-KEY": "key", "CONTAINER-NAME": "images"}
+
+
+def test_env_provider_maps_secret_names_to_variables(tmp_path):
+    """Test that COSMOS-KEY is read from COSMOS_KEY, with the environment overriding the file."""
+
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"COSMOS_KEY": "from-file", "CONTAINER_NAME": "images"}))
+    provider = EnvConfigProvider(str(config_file), environ={"COSMOS_KEY": "from-env"})
+
+    assert provider.get_secrets(["COSMOS-KEY", "CONTAINER-NAME"]) == {"COSMOS-KEY": "from-env", "CONTAINER-NAME": "images"}
+    with pytest.raises(ValueError, match="COSMOS_ENDPOINT"):
+        provider.get_secret("COSMOS-ENDPOINT")
+
+
+def test_key_vault_provider_fetches_concurrently_and_caches():
+    """Test that missing secrets are fetched in parallel once and then served from memory."""
+
+    client = FakeSecretClient(SECRETS)
+    provider = KeyVaultConfigProvider(secret_client=client, ttl=60)
+
+    assert provider.get_secrets(list(SECRETS)) == SECRETS
+    assert provider.get_secret("COSMOS-KEY") == "key"
+    assert sorted(client.calls) == sorted(SECRETS)
+    assert client.max_in_flight == len(SECRETS)
+
+
+def test_key_vault_provider_refetches_after_ttl():
+    """Test that an expired secret is fetched again."""
+
+    client = FakeSecretClient(SECRETS, delay=0)
+    provider = KeyVaultConfigProvider(secret_client=client, ttl=0.05)
+
+    provider.get_secret("COSMOS-KEY")
+    time.sleep(0.1)
+    provider.get_secret("COSMOS-KEY")
+    assert client.calls == ["COSMOS-KEY", "COSMOS-KEY"]
+
+
+def test_encrypted_disk_cache_serves_a_warm_restart(tmp_path):
+    """Test that a new provider reuses the encrypted disk cache without calling Key Vault."""
+
+    key = Fernet.generate_key()
+    cache_path = str(tmp_path / "secrets.cache")
+    KeyVaultConfigProvider(secret_client=FakeSecretClient(SECRETS, delay=0), disk_cache=EncryptedDiskCache(cache_path, key)).get_secrets(list(SECRETS))
+
+    with open(cache_path, "rb") as f:
+        assert b"https://cosmos" not in f.read()
+
+    client = FakeSecretClient(SECRETS, delay=0)
+    restarted = KeyVaultConfigProvider(secret_client=client, disk_cache=EncryptedDiskCache(cache_path, key))
+    assert restarted.get_secrets(list(SECRETS)) == SECRETS
+    assert client.calls == []
+
+    # A cache encrypted with another key is ignored
+    other = KeyVaultConfigProvider(secret_client=client, disk_cache=EncryptedDiskCache(cache_path, Fernet.generate_key()))
+    other.get_secret("COSMOS-KEY")
+    assert client.calls == ["COSMOS-KEY"]
+
+
+def test_derived_key_is_stable():
+    """Test that the key derived from the client secret is a valid, repeatable Fernet key."""
+
+    key = EncryptedDiskCache.derive_key("client-secret")
+    assert key == EncryptedDiskCache.derive_key("client-secret")
+    Fernet(key)
@@ -0,0 +1,227 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import math
+import pickle
+import random
+import statistics
+import pytest
+
+import metrics_engine
+from metric_accumulators import MetricsAccumulator, QuantileSketch, RunningStats
+from model_client import add_to_metrics_data, calculate_batch_metrics, count_metrics_images, metrics_sketches, new_metrics_data
+
+EXACT_FIELDS = [
+    "Total images", "Total time", "Total preprocessing time", "Total inference time", "Total postprocessing time",
+    "Confidence distribution", "Detection count distribution", "Category distribution", "Category percentages",
+    "Inference time distribution", "Box proportion distribution",
+]
+AVERAGE_FIELDS = [
+    "Average preprocess time", "Average inference time", "Average postprocess time", "Average confidence score",
+    "Average box size", "Average box proportion",
+]
+SKETCHED_FIELDS = ["Preprocess time distribution", "Postprocess time distribution", "Box size distribution"]
+
+
+def random_results(count, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for _ in range(count):
+        detections = rng.randint(0, 6)
+        bboxes, proportions = [], []
+        for _ in range(detections):
+            x1, y1 = rng.uniform(0, 600), rng.uniform(0, 400)
+            x2, y2 = rng.uniform(x1 + 1, 640), rng.uniform(y1 + 1, 480)
+            bboxes.append([x1, y1, x2, y2])
+            proportions.append(round((x2 - x1) * (y2 - y1) / (640 * 480), 4))
+        results.append((
+            [rng.choice(["bottle", "can", "carton"]) for _ in range(detections)],
+            [rng.random() for _ in range(detections)],
+            bboxes,
+            [rng.uniform(0.5, 5.0)],
+            [rng.lognormvariate(2.5, 0.5)],
+            [rng.uniform(0.2, 3.0)],
+            proportions,
+            (480, 640),
+            "object_detection",
+        ))
+    return results
+
+
+def test_running_stats_match_statistics_and_merge():
+    """Test Welford's mean and variance, and that merged halves equal one pass over all values."""
+
+    rng = random.Random(1)
+    values = [rng.gauss(10, 3) for _ in range(1000)]
+    first, second, whole = RunningStats(), RunningStats(), RunningStats()
+    for value in values[:300]:
+        first.add(value)
+    for value in values[300:]:
+        second.add(value)
+    for value in values:
+        whole.add(value)
+
+    merged = first.merge(second)
+    assert merged.count == 1000
+    assert merged.mean == pytest.approx(statistics.mean(values))
+    assert merged.variance == pytest.approx(statistics.pvariance(values))
+    assert whole.variance == pytest.approx(statistics.pvariance(values))
+    assert (merged.min, merged.max) == (min(values), max(values))
+    assert RunningStats().average() == 0
+
+
+def test_quantile_sketch_is_within_its_relative_accuracy():
+    """Test that every quantile is within the relative accuracy of the exact nearest-rank value."""
+
+    rng = random.Random(2)
+    values = [rng.lognormvariate(1, 1.5) for _ in range(20000)] + [0.0] * 100
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    ordered = sorted(values)
+    for fraction in (0.001, 0.25, 0.5, 0.9, 0.95, 0.99, 1.0):
+        exact = ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+        assert sketch.quantile(fraction) == pytest.approx(exact, rel=0.01, abs=1e-12)
+    # Memory depends on the range of the values, not on their count
+    assert len(sketch.bins) < 2000
+    with pytest.raises(ValueError):
+        sketch.add(-1.0)
+
+
+def test_quantile_sketches_merge_like_one_sketch():
+    """Test that sketches filled separately merge into the sketch of all values."""
+
+    rng = random.Random(3)
+    values = [rng.expovariate(0.1) for _ in range(5000)]
+    parts = [QuantileSketch() for _ in range(3)]
+    whole = QuantileSketch()
+    for index, value in enumerate(values):
+        parts[index % 3].add(value)
+        whole.add(value)
+
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+    assert merged.bins == whole.bins
+    assert (merged.count, merged.min, merged.max) == (whole.count, whole.min, whole.max)
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_accumulator_stats_match_the_metrics_engine():
+    """Test that streaming gives the same fields: exact counts and totals, close averages and sketched distributions."""
+
+    data = new_metrics_data()
+    accumulator = new_metrics_data(streaming=True)
+    for result in random_results(3000):
+        add_to_metrics_data(data, result)
+        add_to_metrics_data(accumulator, result)
+
+    expected = metrics_engine.calculate_stats(data)
+    stats = calculate_batch_metrics(accumulator)
+
+    assert list(stats) == list(expected)
+    assert count_metrics_images(accumulator) == count_metrics_images(data) == 3000
+    for field in EXACT_FIELDS:
+        assert stats[field] == expected[field], field
+    for field in AVERAGE_FIELDS:
+        digits = 4 if field == "Average box proportion" else 2
+        assert stats[field] == pytest.approx(expected[field], abs=10 ** -digits), field
+    assert stats["Average confidence for different labels"] == pytest.approx(expected["Average confidence for different labels"], abs=0.01)
+    for field in SKETCHED_FIELDS:
+        assert list(stats[field]) == list(expected[field]), field
+        assert sum(stats[field].values()) == sum(expected[field].values())
+        # Only values within 1% of a bin edge are split approximately between neighbouring bins
+        for key, count in stats[field].items():
+            assert count == pytest.approx(expected[field][key], abs=max(3, expected[field][key] * 0.05)), (field, key)
+
+
+def test_accumulators_merge_across_processes():
+    """Test that pickled accumulators, as returned by worker processes, merge into the whole batch."""
+
+    results = random_results(600, seed=4)
+    whole = MetricsAccumulator()
+    parts = [MetricsAccumulator() for _ in range(4)]
+    for index, result in enumerate(results):
+        whole.add(result)
+        parts[index % 4].add(result)
+
+    merged = MetricsAccumulator()
+    for part in parts:
+        merged.merge(pickle.loads(pickle.dumps(part)))
+
+    stats, expected = merged.stats(), whole.stats()
+    # Only the order the floats are summed in differs
+    for field, value in expected.items():
+        if isinstance(value, float):
+            assert stats[field] == pytest.approx(value, abs=0.01), field
+        else:
+            assert stats[field] == pytest.approx(value), field
+    assert merged.percentiles() == whole.percentiles()
+
+
+def test_accumulator_defaults_and_classification_placeholders():
+    """Test an empty accumulator and the empty box of classification results."""
+
+    assert MetricsAccumulator().stats() == metrics_engine.calculate_stats(new_metrics_data())
+
+    accumulator = MetricsAccumulator()
+    accumulator.add((["tabby"], [0.7], [""], [1.0], [2.0], [3.0], [""], (224, 224), "image_classification"))
+    stats = accumulator.stats()
+    assert stats["Average box size"] == 0
+    assert stats["Box size distribution"] == {"0-0": 0}
+    assert stats["Category distribution"] == {"tabby": 1}
+    assert stats["Average confidence for different labels"] == {"tabby": 0.7}
+
+
+def test_accumulator_round_trips_through_json():
+    """Test that the JSON form stored with a batch restores an accumulator with the same stats."""
+
+    accumulator = MetricsAccumulator()
+    for result in random_results(300, seed=5):
+        accumulator.add(result)
+
+    restored = MetricsAccumulator.from_dict(json.loads(json.dumps(accumulator.to_dict())))
+    assert restored.stats() == accumulator.stats()
+    assert restored.percentiles() == accumulator.percentiles()
+    assert MetricsAccumulator.from_dict(MetricsAccumulator().to_dict()).stats() == MetricsAccumulator().stats()
+    with pytest.raises(ValueError):
+        MetricsAccumulator.from_dict({**accumulator.to_dict(), "version": 0})
+
+
+def test_sketches_of_collected_values_equal_streaming():
+    """Test that the sketches sent for a non-streaming batch equal those of a streaming one."""
+
+    data = new_metrics_data()
+    accumulator = new_metrics_data(streaming=True)
+    for result in random_results(200, seed=6):
+        add_to_metrics_data(data, result)
+        add_to_metrics_data(accumulator, result)
+
+    assert metrics_sketches(data) == metrics_sketches(accumulator)
+
+
+def test_merged_batches_summarise_all_their_images():
+    """Test that stored batch sketches merge into the quantiles and bins of all their images."""
+
+    results = random_results(2000, seed=7)
+    batches = [MetricsAccumulator() for _ in range(5)]
+    for index, result in enumerate(results):
+        batches[index % 5].add(result)
+
+    merged = MetricsAccumulator.merged(json.loads(json.dumps(batch.to_dict())) for batch in batches)
+    assert len(merged) == 2000
+
+    inference = sorted(result[4][0] for result in results)
+    summary = merged.summary("inference", bins=4)
+    assert summary["count"] == 2000
+    assert (summary["min"], summary["max"]) == (inference[0], inference[-1])
+    assert summary["average"] == pytest.approx(statistics.mean(inference), abs=0.01)
+    assert summary["std_dev"] == pytest.approx(statistics.pstdev(inference), abs=0.01)
+    for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        assert summary[name] == pytest.approx(inference[math.ceil(fraction * 2000) - 1], rel=0.01)
+    assert len(summary["distribution"]) == 4
+    assert sum(summary["distribution"].values()) == 2000
+
+    empty = MetricsAccumulator.merged([]).summary("box_size")
+    assert empty["count"] == 0 and empty["p95"] is None and empty["distribution"] == {}
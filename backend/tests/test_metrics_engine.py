@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+import json
+import pytest
+
+import metrics
+import metrics_engine
+from metrics_benchmark import make_metrics_data
+from model_client import add_to_metrics_data, new_metrics_data
+
+
+def assert_same_stats(data):
+    reference = metrics.calculate_stats(data)
+    stats = metrics_engine.calculate_stats(data)
+    assert stats == reference
+    assert list(stats) == list(reference)
+    # Sent to the server as JSON, so no NumPy types may leak out
+    json.dumps(stats)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engine_matches_metrics_on_random_batches(seed):
+    """Test that the engine gives the same stats as the per-metric functions."""
+
+    assert_same_stats(make_metrics_data(2000, per_image=5, labels=7, seed=seed))
+
+
+def test_engine_matches_metrics_on_an_empty_batch():
+    """Test the defaults of a batch without images."""
+
+    assert_same_stats(new_metrics_data())
+
+
+def test_engine_matches_metrics_without_detections():
+    """Test a batch whose images have no detections."""
+
+    data = new_metrics_data()
+    for _ in range(3):
+        add_to_metrics_data(data, ([], [], [], [1.0], [2.0], [3.0], [], (480, 640)))
+    assert_same_stats(data)
+
+
+def test_engine_matches_metrics_on_equal_values():
+    """Test the distributions when every value is the same, so the bins have no width."""
+
+    data = new_metrics_data()
+    for _ in range(4):
+        add_to_metrics_data(data, (["can"], [0.5], [[0, 0, 10, 10]], [1.0], [12.0], [2.0], [0.1], (100, 100)))
+    assert_same_stats(data)
+
+
+def test_engine_handles_classification_placeholders():
+    """Test that the empty box and box proportion of classification results are skipped."""
+
+    data = new_metrics_data()
+    add_to_metrics_data(data, (["tabby"], [0.7], [""], [1.0], [2.0], [3.0], [""], (224, 224)))
+    add_to_metrics_data(data, (["tiger_cat"], [0.6], [""], [1.5], [2.5], [3.5], [""], (224, 224)))
+    assert_same_stats(data)
+
+    stats = metrics_engine.calculate_stats(data)
+    assert stats["Average box size"] == 0
+    assert stats["Box size distribution"] == {"0-0": 0}
+    assert stats["Category distribution"] == {"tabby": 1, "tiger_cat": 1}
+
+
+def test_engine_rounds_exact_ties_like_statistics_mean():
+    """Test that a mean on a rounding boundary is rounded from its exact value."""
+
+    data = new_metrics_data()
+    # 0.125 is exactly representable, so round() ties to even: 0.12
+    for conf in (0.1, 0.15, 0.125, 0.125):
+        add_to_metrics_data(data, (["can"], [conf], [[0, 0, 1, 1]], [0.125], [0.125], [0.125], [1.0], (1, 1)))
+    assert_same_stats(data)
+    assert metrics_engine.calculate_stats(data)["Average preprocess time"] == 0.12
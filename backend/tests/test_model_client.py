@@ -1,30 +1,39 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
 import pytest
 from unittest.mock import patch, MagicMock
 
-sys.modules["torch"] = MagicMock()
-sys.modules["torchvision"] = MagicMock()
-sys.modules["ultralytics"] = MagicMock()
-sys.modules["torch.quantization"] = MagicMock()
-sys.modules["efficientnet_pytorch"] = MagicMock()
-sys.modules["PIL"] = MagicMock()
-sys.modules["kaggle"] = MagicMock()
-sys.modules["kaggle.api"] = MagicMock()
-sys.modules["kaggle.api.kaggle_api_extended"] = MagicMock()
-
-from model_client import upload_to_azure, process_image, send_results_to_server, compute_file_hash
-
-# Mocking the Azure BlobServiceClient and YOLO model
-@patch('model_client.BlobServiceClient')
-@patch('model_client.YOLO')
-def test_upload_to_azure(mock_yolo, mock_blob_service_client):
+MOCKED_MODULES = [
+    "torch", "torchvision", "ultralytics", "torch.quantization", "efficientnet_pytorch", "PIL",
+    "kaggle", "kaggle.api", "kaggle.api.kaggle_api_extended"
+]
+real_modules = {name: sys.modules.get(name) for name in MOCKED_MODULES}
+for name in MOCKED_MODULES:
+    sys.modules[name] = MagicMock()
+
+from model_client import (
+    upload_to_azure, process_image, send_results_to_server, compute_file_hash, add_to_metrics_data, cached_result,
+    calculate_batch_metrics, count_metrics_images, model_time, new_metrics_data, result_cache_version,
+)
+
+# model_client imports these lazily, so put the real modules back for the other test files
+for name, module in real_modules.items():
+    if module is None:
+        sys.modules.pop(name, None)
+    else:
+        sys.modules[name] = module
+from blob_uploader import BlobUploader
+from stand_ins import InMemoryContainerClient
+from image_index import ImageIndex
+from result_cache import ResultCache
+
+def test_upload_to_azure():
     """Test uploading an image to Azure Blob Storage with hashing."""
 
-    # Mock the BlobClient
-    mock_blob_client = MagicMock()
-    mock_blob_service_client.from_connection_string.return_value.get_blob_client.return_value = mock_blob_client
+    container_client = InMemoryContainerClient(container_name="sweng25group06cont")
+    uploader = BlobUploader(container_client)
 
     # Path to the test image
     test_image_path = os.path.join(os.path.dirname(__file__), "test_images", "test_image.jpg")
@@ -33,49 +42,134 @@ def test_upload_to_azure(mock_yolo, mock_blob_service_client):
     expected_hash = compute_file_hash(test_image_path)
     expected_blob_name = f"{expected_hash}.jpg"  # Hash + file extension
 
-    # Mock the blob client's `exists` method to return False (blob does not exist)
-    mock_blob_client.exists.return_value = False
-
     # Test uploading the image
-    image_url = upload_to_azure(test_image_path)
+    image_url = upload_to_azure(test_image_path, uploader)
 
     # Verify the blob name is based on the hash
-    mock_blob_service_client.from_connection_string.return_value.get_blob_client.assert_called_with(
-        container="sweng25group06cont", blob=expected_blob_name
-    )
+    assert list(container_client.blobs) == [expected_blob_name]
 
     # Verify the image URL is correctly formatted
-    assert image_url.startswith("https://")
-    assert expected_blob_name in image_url
+    assert image_url == f"{container_client.url}/{expected_blob_name}"
 
     # Verify the blob was uploaded
-    mock_blob_client.upload_blob.assert_called_once()
+    assert uploader.uploaded == 1
 
-@patch('model_client.BlobServiceClient')
-@patch('model_client.YOLO')
-def test_upload_to_azure_duplicate(mock_yolo, mock_blob_service_client):
+def test_upload_to_azure_duplicate():
     """Test uploading a duplicate image to Azure Blob Storage."""
 
-    mock_blob_client = MagicMock()
-    mock_blob_service_client.from_connection_string.return_value.get_blob_client.return_value = mock_blob_client
+    container_client = InMemoryContainerClient(container_name="sweng25group06cont")
+    uploader = BlobUploader(container_client)
 
     test_image_path = os.path.join(os.path.dirname(__file__), "test_images", "test_image.jpg")
 
     expected_hash = compute_file_hash(test_image_path)
     expected_blob_name = f"{expected_hash}.jpg"  # Hash + file extension
 
-    mock_blob_client.exists.return_value = True
+    first_url = upload_to_azure(test_image_path, uploader)
+    image_url = upload_to_azure(test_image_path, uploader)
 
-    image_url = upload_to_azure(test_image_path)
+    assert image_url == first_url
+    assert expected_blob_name in image_url
 
-    mock_blob_service_client.from_connection_string.return_value.get_blob_client.assert_called_with(
-        container="sweng25group06cont", blob=expected_blob_name
-    )
+    # The second upload is rejected by the conditional create instead of overwriting
+    assert uploader.uploaded == 1
+    assert uploader.already_present == 1
+    assert len(container_client.blobs) == 1
 
-    assert image_url.startswith("https://")
-    assert expected_blob_name in image_url
+def test_upload_to_azure_skips_indexed_upload(tmp_path):
+    """Test that an image the local index records as uploaded is not sent again."""
+
+    container_client = InMemoryContainerClient(container_name="sweng25group06cont")
+    uploader = BlobUploader(container_client)
+    index = ImageIndex(str(tmp_path / "index.sqlite"))
+
+    test_image_path = os.path.join(os.path.dirname(__file__), "test_images", "test_image.jpg")
 
-    mock_blob_client.upload_blob.assert_not_called()
+    first_url = upload_to_azure(test_image_path, uploader, index)
+    image_url = upload_to_azure(test_image_path, uploader, index)
+    index.close()
+
+    assert image_url == first_url
+    assert container_client.upload_calls == 1
 
 if __name__ == "__main__":
-    pytest.main()
\ No newline at end of file
+    pytest.main()
+
+def test_run_closes_processor_and_journal_when_a_batch_fails(tmp_path):
+    """Test that a failure mid-batch still stops the processor and flushes and closes the journal."""
+
+    import model_client
+
+    folder = tmp_path / "images"
+    folder.mkdir()
+    (folder / "a.jpg").write_bytes(b"not really a jpeg")
+    processor = MagicMock(streaming_metrics=False, queue_size=4)
+    processor.process.side_effect = RuntimeError("inference failed")
+    journals = []
+
+    class RecordingJournal(model_client.BatchJournal):
+        def close(self):
+            journals.append(self)
+            super().close()
+
+    with patch.object(model_client, "ImageProcessor", return_value=processor), \
+            patch.object(model_client, "BatchJournal", RecordingJournal), \
+            patch.object(model_client, "ResultStream", MagicMock()):
+        summary = model_client.run("yolo", folder=str(folder), journal_dir=str(tmp_path / "journals"))
+
+    assert summary is None
+    processor.close.assert_called_once()
+    assert len(journals) == 1 and journals[0]._file is None
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_cache_hits_keep_the_batch_timing_averages(streaming):
+    """Test that results served from the result cache are left out of the batch's timing metrics."""
+
+    def model_result(pre, inf, post):
+        return (["can"], [0.9], [[0, 0, 10, 10]], [pre], [inf], [post], [0.25], (20, 20), "object_detection")
+
+    cached = {
+        "labels": ["can"], "confidences": [0.9], "bboxes": [[0, 0, 10, 10]], "box_proportions": [0.25], "orig_shape": [20, 20],
+    }
+    misses = [model_result(2.0, 10.0, 1.0), model_result(4.0, 30.0, 3.0)]
+
+    without_hits = new_metrics_data(streaming)
+    with_hits = new_metrics_data(streaming)
+    for result in misses:
+        add_to_metrics_data(without_hits, result)
+        add_to_metrics_data(with_hits, result)
+    for _ in range(3):
+        add_to_metrics_data(with_hits, cached_result(cached, "object_detection"))
+
+    expected, stats = calculate_batch_metrics(without_hits), calculate_batch_metrics(with_hits)
+    assert (stats["Average preprocess time"], stats["Average inference time"], stats["Average postprocess time"]) == (3.0, 20.0, 2.0)
+    for name in ("Average preprocess time", "Average inference time", "Average postprocess time", "Total time"):
+        assert stats[name] == expected[name]
+    assert count_metrics_images(with_hits) == 5
+    assert model_time(cached_result(cached, "object_detection")[4]) == 0.0
+
+
+def test_result_cache_keeps_backends_apart(tmp_path):
+    """Test that results of one backend are not served for the same weights on another."""
+
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    eager = MagicMock(weights_version="abc123", backend="torch", quantized=False)
+    exported = MagicMock(weights_version="abc123", backend="onnx", quantized=False)
+    cache.put("hash", "yolo11n.pt", result_cache_version(eager), False, {"labels": ["can"]})
+
+    assert cache.get("hash", "yolo11n.pt", result_cache_version(exported), False) is None
+    assert cache.get("hash", "yolo11n.pt", result_cache_version(eager), False) == {"labels": ["can"]}
+    cache.close()
+
+
+def test_result_cache_skips_dynamically_quantized_results(tmp_path):
+    """Test that results cached by the earlier dynamic quantization are not served as static INT8 results."""
+
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put("hash", "yolo11n.pt", "abc123", True, {"labels": ["can"]})
+    int8 = MagicMock(weights_version="abc123", backend="onnx", quantized=True)
+
+    assert result_cache_version(int8) == "abc123:onnx:int8-static"
+    assert cache.get("hash", "yolo11n.pt", result_cache_version(int8), int8.quantized) is None
+    cache.close()
@@ -3,19 +3,34 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from unittest.mock import MagicMock, patch
-with patch.dict('sys.modules', {'azure.cosmos': MagicMock()}):
-    from model_service import ModelService
-
 import pytest
+import queue
+import threading
 import grpc
-from model_service_pb2 import ResultsRequest, ResultsResponse
+from model_service_pb2 import MetricsRequest, ResultsRequest
+import neo4j_service_pb2
 import requests
+
+# Imported before patching sys.modules, which is restored afterwards, so that model_service
+# shares these modules with the tests instead of copies that are dropped from sys.modules
+import keyvault_utils
+from keyvault_utils import EnvConfigProvider
+with patch.dict('sys.modules', {'azure.cosmos': MagicMock()}):
+    from model_service import ModelService
+
 from azure.cosmos import CosmosClient
 
 
 @pytest.fixture
-def model_service():
+def model_service(monkeypatch):
     """Fixture to create a ModelService instance with a mocked Neo4jService."""
+    # Serve the Cosmos DB secrets from memory instead of Key Vault, restoring the process-wide provider afterwards
+    monkeypatch.setattr(keyvault_utils, "_provider", EnvConfigProvider(environ={
+        "COSMOS_ENDPOINT": "https://test.documents.azure.com:443/",
+        "COSMOS_KEY": "dGVzdA==",
+        "COSMOS_DATABASE_NAME": "test-db",
+        "COSMOS_CONTAINER_NAME": "test-container"
+    }))
     model_service = ModelService()
     model_service.neo4j_stub = MagicMock()
     
@@ -29,6 +44,40 @@ def model_service():
     return model_service
 
 
+class FakeNeo4jCall:
+    """Stands in for the response stream of a gRPC streaming call, recording whether it was cancelled."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.cancelled = False
+
+    def __iter__(self):
+        return self.responses
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def neo4j_call(mock_neo4j_stream):
+    """Wrap a fake StoreImageResults handler so the stub returns a cancellable call, like a real one."""
+    calls = []
+
+    def store_image_results(request_iterator):
+        calls.append(FakeNeo4jCall(mock_neo4j_stream(request_iterator)))
+        return calls[-1]
+
+    store_image_results.calls = calls
+    return store_image_results
+
+
+class FakeRpcError(grpc.RpcError):
+    def code(self):
+        return grpc.StatusCode.UNAVAILABLE
+
+    def details(self):
+        return "Neo4j went away"
+
+
 @patch("requests.get")
 def test_store_results(mock_get, model_service):
     """Test storing results in the ModelService with a mocked Neo4jService."""
@@ -40,9 +89,9 @@ def test_store_results(mock_get, model_service):
 
     def mock_neo4j_stream(request_iterator):
         for request in request_iterator:
-            yield ResultsResponse(success=True, message="Neo4j stored successfully.")
+            yield neo4j_service_pb2.StoreResultResponse(success=True)
 
-    model_service.neo4j_stub.StoreResult.side_effect = mock_neo4j_stream
+    model_service.neo4j_stub.StoreImageResults.side_effect = neo4j_call(mock_neo4j_stream)
 
     request = ResultsRequest(
         image_url="https://youraccount.blob.core.windows.net/container/yourimage.jpg",
@@ -59,7 +108,88 @@ def test_store_results(mock_get, model_service):
         assert response.success
         assert response.message in ["Results and image stored successfully.", "Partial success, some issues encountered.", "Results stored successfully."]
 
-    assert model_service.neo4j_stub.StoreResult.call_count == 2  
+    # Both detections of the image are sent to Neo4j in one message
+    assert model_service.neo4j_stub.StoreImageResults.call_count == 1
+    assert model_service.neo4j_stub.StoreResult.call_count == 0
+
+
+def test_store_results_pipelines_one_neo4j_stream(model_service):
+    """Test that every image of a client stream goes over one Neo4j stream without waiting for the previous answer."""
+
+    received = []
+
+    def mock_neo4j_stream(request_iterator):
+        # Reads every image before answering any, which only works if requests are not sent one at a time
+        received.extend(request_iterator)
+        for request in received:
+            yield neo4j_service_pb2.StoreResultResponse(success=request.image_url != "https://blob/2.jpg")
+
+    model_service.neo4j_stub.StoreImageResults.side_effect = neo4j_call(mock_neo4j_stream)
+
+    result_requests = [
+        ResultsRequest(
+            image_url=f"https://blob/{index}.jpg", class_labels=["can"] * index, confidences=[0.5] * index,
+            bbox_coordinates=["1,2,3,4"] * index, batch_id="b1", task_type="object_detection"
+        )
+        for index in range(4)
+    ]
+    responses = list(model_service.StoreResults(iter(result_requests), None))
+
+    assert [response.success for response in responses] == [True, True, False, True]
+    assert model_service.neo4j_stub.StoreImageResults.call_count == 1
+    assert [len(request.detections) for request in received] == [0, 1, 2, 3]
+    assert received[3].detections[0].bbox_coordinates == "1,2,3,4"
+    assert received[3].detections[0].class_label == "can"
+
+
+def test_store_results_stops_at_an_invalid_request(model_service):
+    """Test that the results before an invalid request are answered and the stream then fails."""
+
+    def mock_neo4j_stream(request_iterator):
+        for request in request_iterator:
+            yield neo4j_service_pb2.StoreResultResponse(success=True)
+
+    model_service.neo4j_stub.StoreImageResults.side_effect = neo4j_call(mock_neo4j_stream)
+    context = MagicMock()
+
+    result_requests = [
+        ResultsRequest(image_url="https://blob/ok.jpg", class_labels=["can"], confidences=[0.5], bbox_coordinates=["1,2,3,4"]),
+        ResultsRequest(image_url="https://blob/bad.jpg", class_labels=["can"], confidences=[0.5, 0.4], bbox_coordinates=["1,2,3,4"]),
+    ]
+    responses = list(model_service.StoreResults(iter(result_requests), context))
+
+    assert len(responses) == 1
+    context.set_code.assert_called_once_with(grpc.StatusCode.INTERNAL)
+
+
+def test_store_results_cancels_neo4j_and_stops_reading_after_an_error(model_service):
+    """Test that a Neo4j error cancels the Neo4j call, and later client results are neither forwarded nor stored."""
+
+    def mock_neo4j_stream(request_iterator):
+        next(request_iterator)
+        yield neo4j_service_pb2.StoreResultResponse(success=True)
+        raise FakeRpcError()
+
+    store_image_results = neo4j_call(mock_neo4j_stream)
+    model_service.neo4j_stub.StoreImageResults.side_effect = store_image_results
+    context = MagicMock()
+
+    feed = queue.Queue()
+    feed.put(ResultsRequest(image_url="https://blob/0.jpg", class_labels=["can"], confidences=[0.5], bbox_coordinates=["1,2,3,4"]))
+    responses = list(model_service.StoreResults(iter(feed.get, None), context))
+
+    assert len(responses) == 1
+    context.set_code.assert_called_once_with(grpc.StatusCode.UNAVAILABLE)
+    assert store_image_results.calls[0].cancelled
+
+    # A result the client sends after the handler has exited is dropped
+    feed.put(ResultsRequest(image_url="https://blob/late.jpg", class_labels=["can"], confidences=[0.5], bbox_coordinates=["1,2,3,4"]))
+    feed.put(None)
+    for thread in threading.enumerate():
+        if thread.name.startswith("store-results"):
+            thread.join(timeout=5)
+    stored = [call.kwargs["parameters"][0]["value"] for call in model_service.cosmos_container.query_items.call_args_list]
+    assert "https://blob/late.jpg" not in stored
 
 
 def test_store_metrics_in_cosmos(model_service):
@@ -140,4 +270,18 @@ def test_store_metrics_in_cosmos_error(model_service):
 
     result = model_service.store_metrics_in_cosmos(metrics_data, batch_id, task_type)
 
-    assert result is False
\ No newline at end of file
+    assert result is False
+
+def test_store_metrics_forwards_sketches(model_service):
+    """Test that the batch's mergeable sketches are passed on to the Neo4j service with its metrics."""
+
+    model_service.neo4j_stub.StoreMetrics.return_value = neo4j_service_pb2.StoreResultResponse(success=True)
+    request = MetricsRequest(batch_id="batch-1", total_images=2, sketches='{"version": 1}')
+
+    response = model_service.StoreMetrics(request, None)
+
+    assert response.success is True
+    forwarded = model_service.neo4j_stub.StoreMetrics.call_args[0][0]
+    assert forwarded.batch_id == "batch-1"
+    assert forwarded.total_images == 2
+    assert forwarded.sketches == '{"version": 1}'
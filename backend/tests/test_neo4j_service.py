@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from unittest.mock import MagicMock
+
+import neo4j_service_pb2
+from neo4j_service import Neo4jService
+
+
+def test_store_image_results_writes_each_image_with_one_detection_query():
+    """Test that an image's detections are stored with one query and an image without detections is skipped."""
+
+    driver = MagicMock()
+    session = driver.session.return_value.__enter__.return_value
+    service = Neo4jService(driver=driver)
+
+    requests = [
+        neo4j_service_pb2.ImageResults(
+            image_url="https://blob/a.jpg", batch_id="b1", task_type="object_detection",
+            detections=[
+                neo4j_service_pb2.Detection(class_label="can", confidence=0.5, bbox_coordinates="1,2,3,4"),
+                neo4j_service_pb2.Detection(class_label="bottle", confidence=0.25, bbox_coordinates="5,6,7,8"),
+            ]
+        ),
+        neo4j_service_pb2.ImageResults(image_url="https://blob/empty.jpg", batch_id="b1", task_type="object_detection"),
+    ]
+    responses = list(service.StoreImageResults(iter(requests), None))
+
+    assert [response.success for response in responses] == [True, True]
+    # Batch, image and annotation, then all detections of the first image; nothing for the empty one
+    assert session.run.call_count == 4
+    assert all(call.kwargs.get("image_url") != "https://blob/empty.jpg" for call in session.run.call_args_list)
+    detections = session.run.call_args_list[-1].kwargs["detections"]
+    assert [(row["class_label"], row["x1"], row["y2"]) for row in detections] == [("can", 1.0, 4.0), ("bottle", 5.0, 8.0)]
@@ -0,0 +1,132 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import queue
+import threading
+import time
+import pytest
+
+from pipeline import Pipeline, Stage, collect_batch
+from timing import BUCKET_BOUNDS_MS, Histogram
+
+
+def test_pipeline_runs_every_item_through_all_stages():
+    """Test that each item passes through every stage exactly once."""
+
+    collected = []
+    lock = threading.Lock()
+
+    def collect(item):
+        with lock:
+            collected.append(item)
+
+    pipeline = Pipeline([
+        Stage("double", lambda x: x * 2, workers=3, queue_size=2),
+        Stage("increment", lambda x: x + 1, workers=2, queue_size=2),
+        Stage("collect", collect, workers=1, queue_size=2),
+    ])
+    pipeline.run(range(50))
+
+    assert sorted(collected) == [x * 2 + 1 for x in range(50)]
+    stats = pipeline.stats()
+    assert stats["double"]["processed"] == 50
+    assert stats["collect"]["processed"] == 50
+    assert stats["double"]["max_queue_depth"] <= 2
+
+
+def test_pipeline_batches_items():
+    """Test that a batched stage receives lists no longer than its batch size."""
+
+    batch_sizes = []
+
+    def slow_source(x):
+        return x
+
+    def batch_stage(items):
+        batch_sizes.append(len(items))
+        time.sleep(0.01)
+        return items
+
+    pipeline = Pipeline([
+        Stage("source", slow_source, workers=2, queue_size=16),
+        Stage("batch", batch_stage, workers=1, queue_size=16, batch_size=4),
+    ])
+    pipeline.run(range(20))
+
+    assert sum(batch_sizes) == 20
+    assert max(batch_sizes) <= 4
+
+
+def test_pipeline_drops_failed_items():
+    """Test that an item whose stage raises is counted as an error and the rest still finish."""
+
+    collected = []
+
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("bad image")
+        return x
+
+    pipeline = Pipeline([
+        Stage("check", fail_on_three),
+        Stage("collect", collected.append),
+    ])
+    pipeline.run(range(5))
+
+    assert sorted(collected) == [0, 1, 2, 4]
+    assert pipeline.stats()["check"]["errors"] == 1
+
+
+def test_stage_requires_a_worker():
+    """Test that a stage cannot be created without workers."""
+
+    with pytest.raises(ValueError):
+        Stage("empty", lambda x: x, workers=0)
+
+
+def test_collect_batch_stops_at_max_size():
+    """Test that a micro-batch is returned as soon as it is full."""
+
+    source = queue.Queue()
+    for i in range(5):
+        source.put(i)
+
+    assert collect_batch(source, max_size=3, max_wait=10) == [0, 1, 2]
+    assert source.qsize() == 2
+
+
+def test_collect_batch_stops_at_latency_deadline():
+    """Test that a partial micro-batch is returned once max_wait has passed since its first item."""
+
+    source = queue.Queue()
+    source.put("first")
+
+    start = time.monotonic()
+    assert collect_batch(source, max_size=10, max_wait=0.1) == ["first"]
+    assert time.monotonic() - start < 2
+
+
+def test_collect_batch_returns_empty_on_timeout():
+    """Test that nothing is returned when no item arrives before the timeout."""
+
+    assert collect_batch(queue.Queue(), max_size=4, max_wait=1, timeout=0.05) == []
+
+
+def test_stage_reports_call_latency_percentiles():
+    """Test that each stage reports percentiles of the time spent in its function."""
+
+    pipeline = Pipeline([
+        Stage("sleep", lambda x: time.sleep(0.01) or x, workers=2, queue_size=4),
+        Stage("pass", lambda x: x, workers=1, queue_size=4),
+    ])
+    pipeline.run(range(10))
+
+    stats = pipeline.stats()
+    assert stats["sleep"]["latency_p50_ms"] >= 10
+    assert stats["sleep"]["latency_p99_ms"] >= stats["sleep"]["latency_p50_ms"]
+    assert stats["pass"]["latency_p95_ms"] < 10
+    # Latencies are counted in fixed buckets rather than kept per call
+    sleep_times = pipeline.stages[0].call_times
+    assert isinstance(sleep_times, Histogram)
+    assert sleep_times.count == 10
+    assert len(sleep_times.counts) == len(BUCKET_BOUNDS_MS) + 1
@@ -0,0 +1,47 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+import copy
+import pytest
+
+from pipeline_benchmark import compare_to_baseline, run_benchmark
+
+
+def test_benchmark_runs_the_pipeline_end_to_end():
+    """Test that every synthetic image is uploaded, stored in Cosmos DB and reaches the graph."""
+
+    report = run_benchmark(images=10, image_size=(64, 48), batch_size=4, detections=2, inference_ms=(0.0, 0.0))
+
+    assert report["stored"]["blobs"] == 10
+    assert report["stored"]["cosmos_items"] == 10
+    assert report["stored"]["graph_images"] == 10
+    assert report["images_per_sec"] > 0
+    assert report["peak_rss_mb"] > 0
+    assert report["stages"]["store_results"]["calls"] == 10
+    # One Neo4j message per image, carrying both its detections
+    assert report["stages"]["neo4j_store_image_results"]["calls"] == 10
+    for stage in ("upload", "decode", "inference", "stream"):
+        assert report["stages"][stage]["p99_ms"] >= report["stages"][stage]["p50_ms"]
+
+
+def test_compare_to_baseline_flags_regressions():
+    """Test that lower throughput and higher latency beyond the tolerance count as regressions."""
+
+    baseline = {
+        "images_per_sec": 100.0,
+        "peak_rss_mb": 200.0,
+        "stages": {"upload": {"p95_ms": 10.0}, "stream": {"p95_ms": 0.2}},
+    }
+    assert compare_to_baseline(copy.deepcopy(baseline), baseline) == []
+
+    report = copy.deepcopy(baseline)
+    report["images_per_sec"] = 80.0
+    report["stages"]["upload"]["p95_ms"] = 15.0
+    # Doubled, but by less than the minimum latency change
+    report["stages"]["stream"]["p95_ms"] = 0.4
+
+    regressions = compare_to_baseline(report, baseline)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("throughput")
+    assert regressions[1].startswith("upload")
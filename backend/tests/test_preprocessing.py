@@ -0,0 +1,138 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_handle import ImageHandle
+from models.preprocessing import IMAGENET_MEAN, IMAGENET_STD, LETTERBOX_FILL, Preprocessor, decode
+
+
+def gradient_jpeg(path, size=(2000, 1500)):
+    """Write a smooth gradient JPEG, which survives a reduced decode almost unchanged."""
+    width, height = size
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)), np.full((height, width), 128.0)], axis=2)
+    Image.fromarray(pixels.astype(np.uint8)).save(path, quality=95)
+    return str(path)
+
+
+def test_draft_decode_covers_the_target_size(tmp_path):
+    """Test that a JPEG is decoded at the smallest DCT scale covering the target, with its full size reported."""
+
+    path = gradient_jpeg(tmp_path / "large.jpg")
+
+    image, size = decode(path, (224, 224))
+    assert size == (2000, 1500)
+    # 1/8 would give 250x188, which no longer covers 224 in height
+    assert image.size == (500, 375)
+    assert image.mode == "RGB"
+
+    full, size = decode(path)
+    assert full.size == size == (2000, 1500)
+
+
+def test_draft_decode_ignores_other_formats(tmp_path):
+    """Test that formats without draft mode are decoded in full."""
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), color=(10, 20, 30)).save(buffer, format="PNG")
+
+    image, size = decode(buffer.getvalue(), (224, 224))
+    assert image.size == size == (800, 600)
+
+
+def test_batch_matches_full_resolution_preprocessing(tmp_path):
+    """Test that a draft decode gives nearly the same model input as decoding the full image."""
+
+    path = gradient_jpeg(tmp_path / "large.jpg")
+
+    drafted, sizes, times = Preprocessor(224)([path])
+    full, _, _ = Preprocessor(224, draft=False)([path])
+
+    assert drafted.shape == full.shape == (1, 3, 224, 224)
+    assert drafted.dtype == np.float32 and drafted.flags["C_CONTIGUOUS"]
+    assert sizes == [(2000, 1500)]
+    assert len(times) == 1 and times[0] > 0
+    # Within two gray levels on average, after normalization by std
+    assert np.abs(drafted - full).mean() < 2 / 255 / min(IMAGENET_STD)
+
+
+def test_batch_is_normalized_per_channel():
+    """Test that pixels are scaled to [0, 1] and normalized with the channel mean and std."""
+
+    color = (255, 128, 0)
+    batch, sizes, _ = Preprocessor(32, workers=1)([Image.new("RGB", (64, 48), color=color)])
+
+    expected = (np.array(color) / 255.0 - np.array(IMAGENET_MEAN)) / np.array(IMAGENET_STD)
+    assert sizes == [(64, 48)]
+    for channel in range(3):
+        assert np.allclose(batch[0, channel], expected[channel], atol=1e-5)
+
+
+def test_center_crop_keeps_the_middle_of_the_image():
+    """Test that the shorter side is resized to the input and the longer one cropped around the center."""
+
+    pixels = np.zeros((100, 300, 3), dtype=np.uint8)
+    pixels[:, 100:200] = 255
+    batch, _, _ = Preprocessor(50, mean=None, std=None, workers=1)([pixels])
+
+    # The white middle third fills the whole crop
+    assert batch.shape == (1, 3, 50, 50)
+    assert batch[0, :, :, 2:-2].min() > 0.99
+
+
+def test_letterbox_pads_with_gray():
+    """Test that letterboxing keeps the whole image and pads the short side like ultralytics."""
+
+    batch, _, _ = Preprocessor(64, mode="letterbox", mean=None, std=None, workers=1)([Image.new("RGB", (128, 64), color=(255, 255, 255))])
+
+    assert batch.shape == (1, 3, 64, 64)
+    assert np.allclose(batch[0, :, :16], LETTERBOX_FILL / 255.0)
+    assert np.allclose(batch[0, :, 16:48], 1.0)
+    assert np.allclose(batch[0, :, 48:], LETTERBOX_FILL / 255.0)
+
+
+def test_batch_keeps_input_order_on_the_thread_pool(tmp_path):
+    """Test that images preprocessed in parallel come back in input order, for every input type."""
+
+    path = gradient_jpeg(tmp_path / "small.jpg", size=(320, 240))
+    with open(path, "rb") as f:
+        content = f.read()
+    images = [
+        path,
+        ImageHandle(path),
+        content,
+        Image.new("RGB", (50, 40), color=(0, 0, 0)),
+        np.full((30, 60, 3), 255, dtype=np.uint8),
+    ]
+    preprocessor = Preprocessor(16, mean=None, std=None, workers=4)
+    try:
+        batch, sizes, times = preprocessor(images)
+        decoded = preprocessor.decode_batch(images)
+    finally:
+        preprocessor.close()
+
+    assert batch.shape == (5, 3, 16, 16)
+    assert sizes == [(320, 240), (320, 240), (320, 240), (50, 40), (60, 30)]
+    assert len(times) == 5
+    assert batch[3].max() == 0.0 and batch[4].min() == 1.0
+    assert [size for _, size, _ in decoded] == sizes
+
+
+def test_empty_batch():
+    """Test that an empty list gives an empty batch."""
+
+    batch, sizes, times = Preprocessor(224)([])
+    assert batch.shape == (0, 3, 224, 224)
+    assert sizes == [] and times == []
+
+
+def test_unknown_mode_is_rejected():
+    """Test that only the supported resize modes are accepted."""
+
+    with pytest.raises(ValueError):
+        Preprocessor(224, mode="stretch")
@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+
+from result_cache import ResultCache
+
+RESULT = {
+    "labels": ["dog", "cat"],
+    "confidences": [0.9, 0.8],
+    "bboxes": [[0, 0, 10, 10], [5, 5, 20, 20]],
+    "box_proportions": [0.01, 0.02],
+    "orig_shape": [480, 640],
+}
+
+
+@pytest.fixture
+def cache():
+    cache = ResultCache(":memory:", max_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_get_returns_stored_result(cache):
+    """Test that a stored result is returned for the same hash, model and weights."""
+
+    cache.put("hash1", "yolo11n", "abc", False, RESULT)
+
+    assert cache.get("hash1", "yolo11n", "abc", False) == RESULT
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_includes_model_weights_and_quantization(cache):
+    """Test that a different model, weights version or precision is a miss."""
+
+    cache.put("hash1", "yolo11n", "abc", False, RESULT)
+
+    assert cache.get("hash1", "efficientnet-b0", "abc", False) is None
+    assert cache.get("hash1", "yolo11n", "def", False) is None
+    assert cache.get("hash1", "yolo11n", "abc", True) is None
+    assert cache.stats()["misses"] == 3
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    """Test that the entry used least recently is evicted when the cache is full."""
+
+    cache.put("hash1", "yolo11n", "abc", False, RESULT)
+    cache.put("hash2", "yolo11n", "abc", False, RESULT)
+    cache.get("hash1", "yolo11n", "abc", False)
+    cache.put("hash3", "yolo11n", "abc", False, RESULT)
+
+    assert len(cache) == 2
+    assert cache.get("hash2", "yolo11n", "abc", False) is None
+    assert cache.get("hash1", "yolo11n", "abc", False) == RESULT
+    assert cache.get("hash3", "yolo11n", "abc", False) == RESULT
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_persists_between_instances(tmp_path):
+    """Test that results survive reopening the cache file."""
+
+    db_path = str(tmp_path / "cache.sqlite")
+    first = ResultCache(db_path)
+    first.put("hash1", "yolo11n", "abc", False, RESULT)
+    first.close()
+
+    second = ResultCache(db_path)
+    assert second.get("hash1", "yolo11n", "abc", False) == RESULT
+    assert len(second) == 1
+    second.close()
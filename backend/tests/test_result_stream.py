@@ -0,0 +1,106 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from concurrent import futures
+import threading
+import grpc
+import pytest
+
+import model_service_pb2
+import model_service_pb2_grpc
+from result_stream import ResultStream
+
+
+class FakeModelService(model_service_pb2_grpc.ModelServiceServicer):
+    """Answers every streamed result and records how many were in flight at once."""
+
+    def __init__(self):
+        self.received = []
+        self.lock = threading.Lock()
+
+    def StoreResults(self, request_iterator, context):
+        for request in request_iterator:
+            with self.lock:
+                self.received.append(request.image_url)
+            yield model_service_pb2.ResultsResponse(success=True, message="Results stored successfully.")
+
+
+@pytest.fixture
+def fake_server():
+    service = FakeModelService()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    model_service_pb2_grpc.add_ModelServiceServicer_to_server(service, server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    yield service, f"localhost:{port}"
+    server.stop(None)
+
+
+def test_result_stream_sends_every_result(fake_server):
+    """Test that results sent one at a time all reach the server over one stream."""
+
+    service, target = fake_server
+
+    with ResultStream(target=target, max_pending=4) as stream:
+        for i in range(20):
+            assert stream.send(model_service_pb2.ResultsRequest(image_url=f"https://example/{i}.jpg", batch_id="b1"))
+
+    assert service.received == [f"https://example/{i}.jpg" for i in range(20)]
+    assert stream.acknowledged == 20
+    assert not stream.failed
+
+
+def test_result_stream_gives_up_when_server_is_unavailable():
+    """Test that the stream stops accepting results after the retries are exhausted."""
+
+    stream = ResultStream(target="localhost:1", retries=2, delay=0, max_pending=2)
+    stream.start()
+    stream.send(model_service_pb2.ResultsRequest(image_url="https://example/0.jpg"))
+    stream.close()
+
+    assert stream.failed
+    assert stream.acknowledged == 0
+    assert not stream.send(model_service_pb2.ResultsRequest(image_url="https://example/1.jpg"))
+
+
+def test_result_stream_calls_on_ack_after_server_response(fake_server):
+    """Test that each result's on_ack callback runs once the server has answered it."""
+
+    service, target = fake_server
+    acked = []
+
+    with ResultStream(target=target, max_pending=2) as stream:
+        for i in range(5):
+            stream.send(model_service_pb2.ResultsRequest(image_url=f"https://example/{i}.jpg"), lambda i=i: acked.append(i))
+
+    assert acked == list(range(5))
+
+
+def test_result_stream_fails_when_server_stops_answering_early():
+    """Test that results left unanswered when the server ends the stream fail the stream instead of blocking send()."""
+
+    class EarlyStoppingService(model_service_pb2_grpc.ModelServiceServicer):
+        def StoreResults(self, request_iterator, context):
+            next(request_iterator)
+            yield model_service_pb2.ResultsResponse(success=True, message="Results stored successfully.")
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    model_service_pb2_grpc.add_ModelServiceServicer_to_server(EarlyStoppingService(), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    try:
+        stream = ResultStream(target=f"localhost:{port}", max_pending=2)
+        stream.start()
+        sender = threading.Thread(target=lambda: [
+            stream.send(model_service_pb2.ResultsRequest(image_url=f"https://example/{i}.jpg")) for i in range(10)
+        ], daemon=True)
+        sender.start()
+        sender.join(timeout=10)
+        assert not sender.is_alive()
+        stream.close()
+    finally:
+        server.stop(None)
+
+    assert stream.failed
+    assert stream.acknowledged == 1
+    assert not stream.send(model_service_pb2.ResultsRequest(image_url="https://example/10.jpg"))
@@ -0,0 +1,29 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import subprocess
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _run(*args):
+    # Without the Azure credentials, any Key Vault access at startup would fail
+    env = {k: v for k, v in os.environ.items() if not k.startswith("AZURE_")}
+    return subprocess.run([sys.executable, *args], cwd=BACKEND_DIR, capture_output=True, text=True, env=env)
+
+
+def test_help_needs_no_credentials():
+    """Test that --help works offline and without Azure credentials."""
+
+    completed = _run("model_client.py", "--help")
+    assert completed.returncode == 0
+    assert "--model" in completed.stdout
+
+
+def test_import_does_not_load_heavy_modules():
+    """Test that importing model_client defers the model, imaging, numpy and Azure libraries."""
+
+    heavy = ["torch", "ultralytics", "PIL", "numpy", "kaggle", "azure.storage.blob", "azure.identity", "azure.keyvault.secrets"]
+    completed = _run("-c", f"import sys, model_client; print([m for m in {heavy!r} if m in sys.modules])")
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip() == "[]"
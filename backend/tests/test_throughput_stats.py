@@ -0,0 +1,47 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import urllib.request
+import urllib.error
+import pytest
+
+from throughput_stats import ThroughputStats, percentile, start_stats_server
+
+
+def test_percentile_uses_nearest_rank():
+    """Test the nearest-rank percentile of a sorted list."""
+
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+def test_snapshot_reports_latency_in_milliseconds():
+    """Test that recorded latencies are summarised in milliseconds."""
+
+    stats = ThroughputStats()
+    for latency in (0.010, 0.020, 0.030, 0.040):
+        stats.record(latency)
+
+    snapshot = stats.snapshot()
+    assert snapshot["total"] == 4
+    assert snapshot["latency_p50_ms"] == pytest.approx(20.0)
+    assert snapshot["latency_max_ms"] == pytest.approx(40.0)
+    assert snapshot["throughput_recent"] > 0
+
+
+def test_stats_server_serves_snapshot_as_json():
+    """Test that GET /stats returns the snapshot and other paths return 404."""
+
+    server = start_stats_server(lambda: {"total": 3}, port=0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/stats") as response:
+            assert json.loads(response.read()) == {"total": 3}
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other")
+    finally:
+        server.shutdown()
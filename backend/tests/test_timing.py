@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import time
+import pytest
+
+from timing import Histogram, Timings, elapsed_ms
+
+
+def test_nested_spans_are_recorded_under_their_parent():
+    """Test that a span opened inside another one is named after both, in milliseconds."""
+
+    timings = Timings()
+    record = timings.new_record(image="a.jpg")
+    with timings.span(record, "upload"):
+        with timings.span(record, "hash"):
+            time.sleep(0.01)
+        with timings.span(record, "blob"):
+            pass
+
+    stages = record["stages_ms"]
+    assert set(stages) == {"upload", "upload/hash", "upload/blob"}
+    assert stages["upload/hash"] >= 10
+    assert stages["upload"] >= stages["upload/hash"] + stages["upload/blob"]
+    assert record["image"] == "a.jpg"
+
+
+def test_batch_spans_share_the_time_equally():
+    """Test that a span over several records gives each one an equal share."""
+
+    timings = Timings()
+    records = [timings.new_record() for _ in range(4)]
+    with timings.span(records, "inference"):
+        time.sleep(0.02)
+
+    shares = [record["stages_ms"]["inference"] for record in records]
+    assert len(set(shares)) == 1
+    assert 5 <= shares[0] < 20
+
+
+def test_disabled_timings_do_nothing():
+    """Test that disabled timings create no records and hand out a shared no-op span."""
+
+    timings = Timings(enabled=False)
+    record = timings.new_record(image="a.jpg")
+    assert record is None
+    assert timings.span(record, "upload") is timings.span([record, record], "inference")
+    with timings.span(record, "upload"):
+        pass
+    timings.add(record, "rpc", 1.0)
+    timings.finish(record)
+    assert timings.snapshot() == {}
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    """Test that percentiles are bucket upper bounds, capped at the largest value seen."""
+
+    histogram = Histogram()
+    for ms in [1.0] * 90 + [100.0] * 10:
+        histogram.add(ms)
+
+    summary = histogram.to_dict()
+    assert summary["count"] == 100
+    assert summary["mean_ms"] == pytest.approx(10.9)
+    assert 1.0 <= summary["p50_ms"] < 1.5
+    assert summary["p95_ms"] == 100.0
+    assert summary["max_ms"] == 100.0
+    assert sum(summary["buckets_ms"].values()) == 100
+
+
+def test_finished_records_are_exported(tmp_path):
+    """Test that finished records are written as JSON lines and aggregated into histograms."""
+
+    records_path = tmp_path / "timings.jsonl"
+    histograms_path = tmp_path / "timings.histograms.json"
+    timings = Timings(records_path=str(records_path), histograms_path=str(histograms_path))
+    for name in ("a.jpg", "b.jpg"):
+        record = timings.new_record(image=name)
+        start = time.perf_counter_ns()
+        timings.add(record, "rpc", elapsed_ms(start) + 2.0)
+        timings.finish(record)
+    timings.close()
+
+    lines = [json.loads(line) for line in records_path.read_text().splitlines()]
+    assert [line["image"] for line in lines] == ["a.jpg", "b.jpg"]
+    assert lines[0]["stages_ms"]["rpc"] >= 2.0
+    histograms = json.loads(histograms_path.read_text())
+    assert histograms["rpc"]["count"] == 2
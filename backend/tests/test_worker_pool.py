@@ -0,0 +1,55 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from concurrent import futures
+import pytest
+
+from models.base_model import BaseModel
+from image_handle import ImageHandle
+from worker_pool import InferenceWorkerPool
+
+TEST_IMAGE_PATH = os.path.join(os.path.dirname(__file__), "test_images", "test_image.jpg")
+
+
+class SizeModel(BaseModel):
+    """A stand-in model that reports the decoded image size and the worker's process id."""
+
+    def __init__(self):
+        self.weights = list(range(1000))
+
+    def get_task_type(self):
+        return "image_classification"
+
+    def process_image(self, image_path):
+        image = self.load_image(image_path)
+        return [str(os.getpid())], [1.0], [""], [0.0], [0.0], [0.0], [""], image.size, self.get_task_type()
+
+
+def test_worker_pool_runs_batches_in_child_processes():
+    """Test that batches are decoded and run in forked workers and results come back in order."""
+
+    pool = InferenceWorkerPool(SizeModel(), processes=2, threads_per_process=1)
+    try:
+        handles = [ImageHandle(TEST_IMAGE_PATH) for _ in range(3)]
+        with futures.ThreadPoolExecutor(max_workers=4) as executor:
+            batches = list(executor.map(pool.process_batch, [handles] * 4))
+    finally:
+        pool.close()
+
+    expected_size = handles[0].metadata()[:2]
+    worker_pids = set()
+    for results in batches:
+        assert len(results) == 3
+        for labels, _, _, _, _, _, _, orig_shape, task_type in results:
+            assert orig_shape == expected_size
+            assert task_type == "image_classification"
+            worker_pids.add(int(labels[0]))
+
+    assert os.getpid() not in worker_pids
+
+
+def test_worker_pool_requires_a_process():
+    """Test that a pool cannot be created without processes."""
+
+    with pytest.raises(ValueError):
+        InferenceWorkerPool(SizeModel(), processes=0)
@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import zipfile
+import pytest
+from PIL import Image
+
+from zip_source import iter_zip_images, list_zip_images
+
+
+@pytest.fixture
+def dataset_zip(tmp_path):
+    """A small animals10-style zip with images in class folders and a non-image file."""
+
+    zip_path = tmp_path / "dataset.zip"
+    with zipfile.ZipFile(zip_path, "w") as zip_ref:
+        zip_ref.writestr("raw-img/", "")
+        zip_ref.writestr("translate.py", "print('not an image')")
+        for i in range(10):
+            buffer = io.BytesIO()
+            Image.new("RGB", (8 + i, 8), color=(i, i, i)).save(buffer, format="PNG")
+            zip_ref.writestr(f"raw-img/class{i % 2}/image{i}.png", buffer.getvalue())
+    return str(zip_path)
+
+
+def test_list_zip_images_skips_folders_and_other_files(dataset_zip):
+    """Test that only image members are listed."""
+
+    names = list_zip_images(dataset_zip)
+
+    assert len(names) == 10
+    assert all(name.endswith(".png") for name in names)
+
+
+def test_iter_zip_images_stops_after_max_images(dataset_zip):
+    """Test that only the requested number of members are read and decoded."""
+
+    handles = list(iter_zip_images(dataset_zip, max_images=3))
+
+    assert [handle.name for handle in handles] == ["image0.png", "image1.png", "image2.png"]
+    assert handles[2].metadata() == (10, 8, "PNG")
+
+
+def test_iter_zip_images_samples_reproducibly(dataset_zip):
+    """Test that random sampling picks distinct members and honours the seed."""
+
+    first = [handle.name for handle in iter_zip_images(dataset_zip, max_images=4, sample=True, seed=7)]
+    second = [handle.name for handle in iter_zip_images(dataset_zip, max_images=4, sample=True, seed=7)]
+
+    assert first == second
+    assert len(set(first)) == 4
@@ -0,0 +1,94 @@
+import collections
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of an already sorted list, or 0.0 if it is empty."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class ThroughputStats:
+    """
+    Throughput and latency of a long-running process.
+
+    Every completed item is recorded with its latency in seconds. Totals cover the whole
+    lifetime, while the rate and latency percentiles cover only the last window seconds,
+    so they follow the current load. All latencies are reported in milliseconds.
+    """
+
+    def __init__(self, window=60.0):
+        self.window = window
+        self.started = time.monotonic()
+        self.total = 0
+        self._samples = collections.deque()
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        now = time.monotonic()
+        with self._lock:
+            self.total += 1
+            self._samples.append((now, latency))
+            self._expire(now)
+
+    def _expire(self, now):
+        while self._samples and self._samples[0][0] < now - self.window:
+            self._samples.popleft()
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            latencies = sorted(latency for _, latency in self._samples)
+            total = self.total
+        uptime = now - self.started
+        window = min(self.window, uptime) or 1e-9
+        return {
+            "uptime_s": round(uptime, 3),
+            "total": total,
+            "throughput_total": round(total / (uptime or 1e-9), 3),
+            "throughput_recent": round(len(latencies) / window, 3),
+            "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "latency_max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        }
+
+
+def start_stats_server(snapshot, port, host="127.0.0.1"):
+    """
+    Serve the dict returned by snapshot() as JSON at GET /stats on a background thread.
+    Args:
+        snapshot (callable): Returns the stats to serve.
+        port (int): Port to listen on, or 0 to pick a free one.
+        host (str): Interface to listen on.
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/stats":
+                self.send_error(404)
+                return
+            body = json.dumps(snapshot()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep request logs out of the client output
+
+    server = ThreadingHTTPServer((host, port), StatsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stats-server", daemon=True).start()
+    print(f"Serving stats at http://{host}:{server.server_address[1]}/stats")
+    return server
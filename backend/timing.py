@@ -0,0 +1,174 @@
+import bisect
+import contextlib
+import json
+import math
+import threading
+import time
+
+NS_PER_MS = 1_000_000
+
+# Upper bounds of the histogram buckets in ms, growing by a factor of sqrt(2) from 10 us to about 84 s
+BUCKET_BOUNDS_MS = tuple(0.01 * 2 ** (i / 2) for i in range(47))
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def elapsed_ms(start_ns):
+    """Return the milliseconds since start_ns, a time.perf_counter_ns() value."""
+    return (time.perf_counter_ns() - start_ns) / NS_PER_MS
+
+
+class Histogram:
+    """Counts of durations in exponentially growing buckets, with exact count, total and maximum."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket holding the nearest-rank percentile (at most the maximum)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKET_BOUNDS_MS[index], self.max_ms) if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        buckets = {}
+        for index, count in enumerate(self.counts):
+            if count:
+                key = f"<={BUCKET_BOUNDS_MS[index]:.3g}" if index < len(BUCKET_BOUNDS_MS) else f">{BUCKET_BOUNDS_MS[-1]:.3g}"
+                buckets[key] = count
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets_ms": buckets,
+        }
+
+
+class _Span:
+    __slots__ = ("timings", "records", "name", "start")
+
+    def __init__(self, timings, records, name):
+        self.timings = timings
+        self.records = records
+        self.name = name
+
+    def __enter__(self):
+        stack = self.timings._stack()
+        if stack:
+            self.name = f"{stack[-1]}/{self.name}"
+        stack.append(self.name)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Work done for a whole batch is shared equally between its images
+        ms = elapsed_ms(self.start) / len(self.records)
+        self.timings._stack().pop()
+        for record in self.records:
+            stages = record["stages_ms"]
+            stages[self.name] = stages.get(self.name, 0.0) + ms
+        return False
+
+
+class Timings:
+    """
+    Per-image timing of pipeline stages, all measured with time.perf_counter_ns() and
+    reported in milliseconds.
+
+    Each image gets a record from new_record(). Code is timed with
+    `with timings.span(record, "upload"):`, and spans opened inside another span on the
+    same thread are recorded under the outer span's name, e.g. "upload/hash". A span over
+    a list of records, e.g. a batch, gives each record an equal share. Durations measured
+    elsewhere, such as those reported by the model, are added with add(). finish() adds a
+    record to the per-stage histograms and, with a records_path, appends it as a JSON line.
+    With a histograms_path, close() writes the aggregated histograms there as JSON.
+
+    When disabled, new_record() returns None and span() a shared no-op context manager,
+    so instrumented code costs one method call per span.
+    """
+
+    def __init__(self, enabled=True, records_path=None, histograms_path=None):
+        self.enabled = enabled
+        self.records_path = records_path
+        self.histograms_path = histograms_path
+        self.histograms = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def new_record(self, **fields):
+        if not self.enabled:
+            return None
+        return dict(fields, stages_ms={})
+
+    def span(self, records, name):
+        if records is None or not self.enabled:
+            return _NULL_SPAN
+        if isinstance(records, dict):
+            records = [records]
+        records = [record for record in records if record is not None]
+        return _Span(self, records, name) if records else _NULL_SPAN
+
+    def add(self, record, name, ms):
+        if record is not None:
+            record["stages_ms"][name] = record["stages_ms"].get(name, 0.0) + ms
+
+    def finish(self, record):
+        if record is None:
+            return
+        with self._lock:
+            for name, ms in record["stages_ms"].items():
+                self.histograms.setdefault(name, Histogram()).add(ms)
+            if self.records_path:
+                if self._file is None:
+                    self._file = open(self.records_path, "a", encoding="utf-8")
+                self._file.write(json.dumps(dict(record, stages_ms={
+                    name: round(ms, 4) for name, ms in record["stages_ms"].items()
+                })) + "\n")
+
+    def snapshot(self):
+        """Return the aggregated histogram of every stage, keyed by stage name."""
+        with self._lock:
+            return {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+
+    def print_summary(self):
+        snapshot = self.snapshot()
+        if not snapshot:
+            return
+        print(f"{'stage (ms per image)':<32}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+        for name, h in snapshot.items():
+            print(f"{name:<32}{h['count']:>7}{h['mean_ms']:>10.3f}{h['p50_ms']:>10.3f}{h['p95_ms']:>10.3f}{h['p99_ms']:>10.3f}{h['max_ms']:>10.3f}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self.histograms_path and self.histograms:
+            with open(self.histograms_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, indent=2)
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+from image_handle import ImageHandle
+
+# The model the forked workers run; set in the parent before the workers are forked
+_worker_model = None
+
+
+def _init_worker(threads):
+    """Give each worker its share of the cores for PyTorch intra-op parallelism."""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _run_batch(images):
+    handles = [ImageHandle.from_bytes(data, name) for name, data in images]
+    return _worker_model.process_batch(handles)
+
+
+class InferenceWorkerPool:
+    """
+    Data-parallel inference across several processes that share one copy of the weights.
+
+    The model is loaded once in the parent, and the workers are forked from it, so the
+    weight tensors are shared copy-on-write rather than loaded again in every process.
+    Each call to process_batch runs one batch in whichever worker is free, so concurrent
+    callers shard the images across the workers. The cores are split evenly between the
+    workers unless threads_per_process is given.
+
+    The pool must be created before the parent starts other threads or gRPC channels,
+    because those do not survive a fork.
+    """
+
+    def __init__(self, model, processes, threads_per_process=None):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ValueError("Multi-process inference needs the 'fork' start method, which this platform does not support.")
+        if processes < 1:
+            raise ValueError("The inference pool needs at least one process.")
+
+        global _worker_model
+        _worker_model = model
+
+        self.processes = processes
+        self.threads_per_process = threads_per_process or max(1, (os.cpu_count() or 1) // processes)
+        context = multiprocessing.get_context("fork")
+        self._pool = context.Pool(processes, initializer=_init_worker, initargs=(self.threads_per_process,))
+        print(f"Started {processes} inference processes with {self.threads_per_process} threads each")
+
+    def process_batch(self, images):
+        """Run a batch of ImageHandles in one worker and return one result tuple per image."""
+        # Workers receive the encoded bytes and decode them themselves, in parallel
+        payload = [(handle.name, bytes(handle.data)) for handle in images]
+        return self._pool.apply(_run_batch, (payload,))
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
@@ -0,0 +1,48 @@
+import os
+import random
+import zipfile
+from image_handle import ImageHandle
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
+
+
+def list_zip_images(zip_path):
+    """Return the names of the image members of a zip file, read from its central directory only."""
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        return [
+            info.filename for info in zip_ref.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+
+
+def select_zip_images(zip_path, max_images=None, sample=False, seed=None):
+    """
+    Return the names of the image members to process: the first max_images, or with
+    sample=True, max_images members picked at random (reproducibly when a seed is given).
+    """
+    members = list_zip_images(zip_path)
+    if sample and max_images is not None and max_images < len(members):
+        members = random.Random(seed).sample(members, max_images)
+    elif max_images is not None:
+        members = members[:max_images]
+    return members
+
+
+def iter_zip_members(zip_path, members):
+    """Lazily yield (member name, ImageHandle) pairs for the given members of a zip file."""
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        for member in members:
+            yield member, ImageHandle.from_bytes(zip_ref.read(member), os.path.basename(member))
+
+
+def iter_zip_images(zip_path, max_images=None, sample=False, seed=None):
+    """
+    Lazily yield ImageHandles for the images in a zip file without extracting it.
+
+    Each member is read into memory only when the next image is requested, and iteration
+    stops after max_images. With sample=True, max_images members are picked at random
+    (reproducibly when a seed is given) instead of taking the first ones in the archive.
+    """
+    members = select_zip_images(zip_path, max_images, sample, seed)
+    for _, handle in iter_zip_members(zip_path, members):
+        yield handle